@@ -60,6 +60,7 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
 
     # My Middleware
+    'main_app.middleware.RequestMetricsMiddleware',
     'main_app.middleware.LoginCheckMiddleWare',
 ]
 
@@ -76,6 +77,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main_app.context_processors.notifications',
             ],
         },
     },
@@ -174,3 +176,65 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 if not MONGODB_URI:
     prod_db = dj_database_url.config(conn_max_age=500)
     DATABASES['default'].update(prod_db)
+
+# Worker processes used to generate independent parts of a timetable in
+# parallel (defaults to the number of CPUs)
+TIMETABLE_WORKERS = int(os.environ['TIMETABLE_WORKERS']) if os.environ.get('TIMETABLE_WORKERS') else None
+
+# Seconds the admin dashboard aggregates stay cached before being recomputed
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 300))
+
+# Seconds a rendered timetable grid stays cached (main_app.timetable_cache).
+# Grids are keyed on a version row in the database, so edits made by any
+# process are picked up on the next request regardless of this timeout.
+TIMETABLE_CACHE_TIMEOUT = int(os.environ.get('TIMETABLE_CACHE_TIMEOUT', 3600))
+
+# Seconds a published MCQ test snapshot (questions and answer key) stays cached
+MCQ_SNAPSHOT_TIMEOUT = int(os.environ.get('MCQ_SNAPSHOT_TIMEOUT', 86400))
+# Seconds a queued grading run waits so a burst of MCQ submissions is graded together
+MCQ_GRADING_DELAY = int(os.environ.get('MCQ_GRADING_DELAY', 2))
+# Seconds the per-test item analysis state stays cached between visits
+MCQ_ANALYSIS_TIMEOUT = int(os.environ.get('MCQ_ANALYSIS_TIMEOUT', 3600))
+
+# Grade sheets (main_app.results): maximum marks and weight of each
+# StudentResult component in the total, grade bands as (minimum percentage,
+# grade, grade point), and the pass rule. XLSX downloads need openpyxl.
+RESULT_MAX_MARKS = {'test1': 40, 'test2': 40, 'quiz': 20, 'experiential': 20, 'see': 60}
+RESULT_WEIGHTS = {'test1': 1, 'test2': 1, 'quiz': 1, 'experiential': 1, 'see': 1}
+RESULT_GRADES = [(90, 'O', 10), (80, 'A+', 9), (70, 'A', 8), (60, 'B+', 7), (55, 'B', 6), (50, 'C', 5), (40, 'P', 4)]
+RESULT_PASS_PERCENT = float(os.environ.get('RESULT_PASS_PERCENT', 40))
+RESULT_MIN_SEE_PERCENT = float(os.environ.get('RESULT_MIN_SEE_PERCENT', 35))
+
+# Per-request metrics (see main_app.middleware.RequestMetricsMiddleware):
+# requests slower than REQUEST_METRICS_SLOW_MS are logged with their SQL,
+# and the admin metrics page keeps the last REQUEST_METRICS_WINDOW requests per view
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', '1') == '1'
+REQUEST_METRICS_SLOW_MS = int(os.environ.get('REQUEST_METRICS_SLOW_MS', 500))
+REQUEST_METRICS_WINDOW = int(os.environ.get('REQUEST_METRICS_WINDOW', 500))
+
+# FCM push delivery (main_app.push.PushSender): background threads, bounded
+# queue of batches, tokens per FCM call, retries and per-call timeouts (seconds)
+NOTIFICATION_PUSH_WORKERS = int(os.environ.get('NOTIFICATION_PUSH_WORKERS', 2))
+FCM_URL = os.environ.get('FCM_URL', 'https://fcm.googleapis.com/fcm/send')
+FCM_SERVER_KEY = os.environ.get(
+    'FCM_SERVER_KEY',
+    'AAAA3Bm8j_M:APA91bElZlOLetwV696SoEtgzpJr2qbxBfxVBfDWFiopBWzfCfzQp2nRyC7_A2mlukZEHV4g1AmyC6P_HonvSkY2'
+    'YyliKt5tT3fe_1lrKod2Daigzhb2xnYQMxUWjCAIQcUexAMPZePB',
+)
+FCM_QUEUE_SIZE = int(os.environ.get('FCM_QUEUE_SIZE', 1000))
+FCM_BATCH_SIZE = int(os.environ.get('FCM_BATCH_SIZE', 500))
+FCM_MAX_RETRIES = int(os.environ.get('FCM_MAX_RETRIES', 3))
+FCM_CONNECT_TIMEOUT = float(os.environ.get('FCM_CONNECT_TIMEOUT', 3.05))
+FCM_READ_TIMEOUT = float(os.environ.get('FCM_READ_TIMEOUT', 10))
+
+# Background jobs (main_app.jobs), run by `manage.py run_worker`. JOBS_EAGER
+# runs them inside the request instead, for development without a worker.
+JOBS_EAGER = os.environ.get('JOBS_EAGER', '0') == '1'
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 2))
+JOBS_RETRY_BACKOFF = int(os.environ.get('JOBS_RETRY_BACKOFF', 30))
+JOBS_STALE_AFTER = int(os.environ.get('JOBS_STALE_AFTER', 3600))
+
+# Notification inbox: rows per page, and age (days) after which
+# `manage.py archive_notifications` moves notifications to the archive table
+NOTIFICATIONS_PER_PAGE = int(os.environ.get('NOTIFICATIONS_PER_PAGE', 25))
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 180))
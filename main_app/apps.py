@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class MainAppConfig(AppConfig):
     name = 'main_app'
+
+    def ready(self):
+        # Connect the timetable grid cache invalidation and attendance
+        # summary signals
+        from . import attendance, timetable_cache  # noqa: F401
@@ -0,0 +1,254 @@
+"""
+Bulk attendance writes used by the staff attendance endpoints.
+
+A class is marked with a fixed number of queries however many students it
+has: students are validated with one ``in_bulk`` lookup and reports are
+written with ``bulk_create`` inside a single transaction. The same
+transaction adjusts the per-student ``StudentSubjectAttendanceSummary``
+counters that the dashboards read. Deleting an ``Attendance`` (with its
+reports) or a single ``AttendanceReport`` takes the reports off the
+counters through ``pre_delete``/``post_delete`` receivers; students,
+subjects and sessions take their summary rows with them by CASCADE.
+"""
+import json
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import Attendance, AttendanceReport, Student, StudentSubjectAttendanceSummary
+
+
+def parse_statuses(payload: str) -> Dict[int, bool]:
+    """
+    Parse the posted ``[{"id": .., "status": 0|1}, ...]`` list into
+    ``{id: present}``. A repeated id keeps its last status.
+    """
+    try:
+        rows = json.loads(payload or "[]")
+        return {int(row["id"]): bool(int(row.get("status") or 0)) for row in rows}
+    except (TypeError, ValueError, KeyError) as e:
+        raise ValidationError(f"Invalid attendance data: {e}")
+
+
+def _apply_summary_deltas(attendance: Attendance, deltas: Dict[int, Tuple[int, int]]) -> None:
+    """
+    Add ``{student_id: (present, absent)}`` deltas to the summary rows of
+    the attendance's subject and session, creating missing rows first.
+    Counters never go below zero.
+    """
+    deltas = {student_id: d for student_id, d in deltas.items() if d != (0, 0)}
+    if not deltas:
+        return
+    key = {"subject_id": attendance.subject_id, "session_id": attendance.session_id}
+    StudentSubjectAttendanceSummary.objects.bulk_create(
+        [
+            StudentSubjectAttendanceSummary(student_id=student_id, **key)
+            for student_id, (present, absent) in deltas.items() if present > 0 or absent > 0
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    rows = list(
+        StudentSubjectAttendanceSummary.objects.select_for_update().filter(student_id__in=list(deltas), **key)
+    )
+    for row in rows:
+        present, absent = deltas[row.student_id]
+        row.present = max(0, row.present + present)
+        row.absent = max(0, row.absent + absent)
+        row.total = row.present + row.absent
+    StudentSubjectAttendanceSummary.objects.bulk_update(rows, ["present", "absent", "total"], batch_size=500)
+
+
+def _status_delta(old: Optional[bool], new: bool) -> Tuple[int, int]:
+    """Counter change when a report goes from ``old`` (None: no report) to ``new``."""
+    present = int(new) - (1 if old is True else 0)
+    absent = int(not new) - (1 if old is False else 0)
+    return present, absent
+
+
+def _sync_reports(attendance: Attendance, statuses: Dict[int, bool]) -> Dict[str, int]:
+    """
+    Make the reports of ``attendance`` match ``{student_id: present}``:
+    missing reports are bulk-created, changed ones bulk-updated.
+    """
+    existing = {
+        report.student_id: report
+        for report in AttendanceReport.objects.filter(attendance=attendance).only("id", "student_id", "status")
+    }
+    new_reports = [
+        AttendanceReport(student_id=student_id, attendance=attendance, status=present)
+        for student_id, present in statuses.items()
+        if student_id not in existing
+    ]
+    changed = []
+    for student_id, present in statuses.items():
+        report = existing.get(student_id)
+        if report is not None and report.status != present:
+            report.status = present
+            changed.append(report)
+    if new_reports:
+        AttendanceReport.objects.bulk_create(new_reports, batch_size=500)
+    if changed:
+        AttendanceReport.objects.bulk_update(changed, ["status"], batch_size=500)
+    deltas = {report.student_id: _status_delta(None, report.status) for report in new_reports}
+    deltas.update({report.student_id: _status_delta(not report.status, report.status) for report in changed})
+    _apply_summary_deltas(attendance, deltas)
+    return {"created": len(new_reports), "updated": len(changed)}
+
+
+def record_attendance(session, subject, date, statuses: Dict[int, bool], token: Optional[str] = None) -> dict:
+    """
+    Save attendance for ``subject`` on ``date`` from ``{student_id: present}``.
+
+    Each submission records a new class, so two classes of a subject on one
+    day stay apart. ``token`` identifies one form submission: posting it
+    again reuses the ``Attendance`` row it created (unique per token) and
+    only touches reports whose status differs, so a double submit is
+    harmless. Raises ``ValidationError`` for unknown student ids, or a
+    token already used for another class, without writing anything.
+    Returns a summary dict.
+    """
+    students = Student.objects.in_bulk(list(statuses))
+    unknown = sorted(set(statuses) - set(students))
+    if unknown:
+        raise ValidationError(f"Unknown student id(s): {', '.join(map(str, unknown))}")
+
+    with transaction.atomic():
+        duplicate = False
+        if token:
+            # A concurrent post of the same token fails the unique insert
+            # and get_or_create returns the other request's row
+            attendance, created = Attendance.objects.get_or_create(
+                submission_token=token, defaults={"session": session, "subject": subject, "date": date},
+            )
+            duplicate = not created
+            if duplicate:
+                # Wait for the request that created it, then compare with its reports
+                attendance = Attendance.objects.select_for_update().get(pk=attendance.pk)
+                if (attendance.session_id, attendance.subject_id, str(attendance.date)) != (
+                        session.id, subject.id, str(date)):
+                    raise ValidationError("This attendance form was already submitted for another class")
+        else:
+            attendance = Attendance.objects.create(session=session, subject=subject, date=date)
+        counts = _sync_reports(attendance, statuses)
+
+    present = sum(1 for value in statuses.values() if value)
+    return {
+        "status": "OK",
+        "attendance_id": attendance.id,
+        "duplicate": duplicate,
+        "present": present,
+        "absent": len(statuses) - present,
+        **counts,
+    }
+
+
+def update_attendance_statuses(attendance: Attendance, statuses: Dict[int, bool]) -> dict:
+    """
+    Apply edited statuses to an existing ``Attendance`` row.
+
+    ``statuses`` is keyed by the students' user (admin) ids as posted by the
+    update page. All reports are loaded in one query and only those whose
+    status actually changed are written, with one ``bulk_update``. Raises
+    ``ValidationError`` when an id has no report for this attendance.
+    """
+    with transaction.atomic():
+        reports = {
+            report.student.admin_id: report
+            for report in AttendanceReport.objects.filter(attendance=attendance)
+            .select_related("student")
+            .only("id", "status", "student_id", "student__admin_id")
+        }
+        unknown = sorted(set(statuses) - set(reports))
+        if unknown:
+            raise ValidationError(f"No attendance report for user id(s): {', '.join(map(str, unknown))}")
+        changed = []
+        for admin_id, present in statuses.items():
+            report = reports[admin_id]
+            if report.status != present:
+                report.status = present
+                changed.append(report)
+        if changed:
+            AttendanceReport.objects.bulk_update(changed, ["status"], batch_size=500)
+            _apply_summary_deltas(attendance, {
+                report.student_id: _status_delta(not report.status, report.status) for report in changed
+            })
+    return {"status": "OK", "attendance_id": attendance.id, "changed": len(changed)}
+
+
+def rebuild_summaries(student_ids: Iterable[int] = None) -> int:
+    """
+    Recompute summary rows from ``AttendanceReport`` with one grouped query
+    (optionally only for ``student_ids``). Returns the number of rows written.
+    """
+    reports = AttendanceReport.objects.all()
+    summaries = StudentSubjectAttendanceSummary.objects.all()
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        reports = reports.filter(student_id__in=student_ids)
+        summaries = summaries.filter(student_id__in=student_ids)
+    grouped = (
+        reports.values("student_id", "attendance__subject_id", "attendance__session_id")
+        .annotate(present=Count("id", filter=Q(status=True)), total=Count("id"))
+        .order_by()
+    )
+    rows = [
+        StudentSubjectAttendanceSummary(
+            student_id=row["student_id"],
+            subject_id=row["attendance__subject_id"],
+            session_id=row["attendance__session_id"],
+            present=row["present"],
+            absent=row["total"] - row["present"],
+            total=row["total"],
+        )
+        for row in grouped.iterator()
+    ]
+    with transaction.atomic():
+        summaries.delete()
+        StudentSubjectAttendanceSummary.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+# Deletions ----------------------------------------------------------------
+
+# Attendance rows being deleted in this thread, whose reports were already
+# taken off the counters in one pass by ``_attendance_deleting``
+_deleting = threading.local()
+
+
+def _deleting_ids() -> set:
+    if not hasattr(_deleting, "ids"):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+@receiver(pre_delete, sender=Attendance)
+def _attendance_deleting(sender, instance, **kwargs):
+    deltas: Dict[int, Tuple[int, int]] = {}
+    reports = AttendanceReport.objects.filter(attendance=instance).values_list("student_id", "status")
+    for student_id, status in reports:
+        present, absent = deltas.get(student_id, (0, 0))
+        deltas[student_id] = (present - int(status), absent - int(not status))
+    _apply_summary_deltas(instance, deltas)
+    _deleting_ids().add(instance.pk)
+
+
+@receiver(post_delete, sender=Attendance)
+def _attendance_deleted(sender, instance, **kwargs):
+    _deleting_ids().discard(instance.pk)
+
+
+@receiver(post_delete, sender=AttendanceReport)
+def _report_deleted(sender, instance, **kwargs):
+    if instance.attendance_id in _deleting_ids():
+        return
+    attendance = Attendance.objects.filter(pk=instance.attendance_id).only("subject_id", "session_id").first()
+    if attendance is not None:
+        _apply_summary_deltas(attendance, {
+            instance.student_id: (-int(instance.status), -int(not instance.status)),
+        })
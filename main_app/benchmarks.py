@@ -0,0 +1,197 @@
+"""
+Load benchmarks for the main pages.
+
+``benchmark_views`` requests each view ``iterations`` times as the right
+kind of user through the Django test client and reports latency
+percentiles and query counts per view. ``submission_burst`` replays the end
+of an exam over HTTP: many students open and submit the same MCQ test at
+once from a thread pool, against a running server.
+
+Both expect a dataset from ``synthetic.generate_institution`` and write to
+the database, so run them against a throwaway database; the
+``benchmark_views`` and ``benchmark_submissions`` commands do that.
+"""
+import json
+import math
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .grading import get_snapshot
+from .models import CustomUser, Session, Student, Subject, TimetableEntry
+
+VIEWS = ("admin_home", "staff_home", "student_home", "manage_timetable", "save_attendance",
+         "generate_for_session")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def latency_stats(timings) -> dict:
+    """Percentiles, mean and max of a non-empty list of milliseconds."""
+    return {
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "p99_ms": round(percentile(timings, 99), 2),
+        "mean_ms": round(statistics.mean(timings), 2),
+        "max_ms": round(max(timings), 2),
+    }
+
+
+def _client_for(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def _hod():
+    user = CustomUser.objects.filter(user_type="1").order_by("id").first()
+    if user is None:
+        user = CustomUser.objects.create_user(
+            email="benchmark-hod@synthetic.local", password=None, user_type=1, gender="M",
+            address="Synthetic", profile_pic="blank-profile-picture-973460_640.webp",
+        )
+    return user
+
+
+def _requests(session):
+    """``{view: (request(iteration) -> response, untimed setup or None)}`` for each view."""
+    hod = _client_for(_hod())
+    subject = Subject.objects.filter(courses__isnull=False).select_related("staff__admin").order_by("id").first()
+    staff = _client_for(subject.staff.admin)
+    student = Student.objects.filter(course__in=subject.courses.all()).select_related("admin").order_by("id").first()
+    roster = list(Student.objects.filter(course__in=subject.courses.all()).values_list("id", flat=True))
+
+    def save_attendance(i):
+        return staff.post(reverse("save_attendance"), {
+            "student_ids": json.dumps([{"id": sid, "status": int((sid + i) % 5 != 0)} for sid in roster]),
+            "date": f"2000-01-{(i % 28) + 1:02d}",
+            "subject": subject.id,
+            "session": session.id,
+        })
+
+    def clear_timetable():
+        TimetableEntry.objects.filter(session=session).delete()
+
+    student_client = _client_for(student.admin)
+    return {
+        "admin_home": (lambda i: hod.get(reverse("admin_home")), None),
+        "staff_home": (lambda i: staff.get(reverse("staff_home")), None),
+        "student_home": (lambda i: student_client.get(reverse("student_home")), None),
+        "manage_timetable": (lambda i: hod.get(reverse("manage_timetable")), None),
+        "save_attendance": (save_attendance, None),
+        "generate_for_session": (
+            lambda i: hod.post(reverse("manage_timetable"), {"auto_generate": "1", "engine": "greedy"}),
+            clear_timetable,
+        ),
+    }
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage", JOBS_EAGER=True)
+def benchmark_views(iterations=20, views=VIEWS, session=None) -> dict:
+    """
+    Time ``iterations`` requests per view. Returns ``{view: stats}`` with
+    p50/p95/p99/mean/max latency in milliseconds, the median query count
+    and the status codes seen. ``generate_for_session`` is driven through
+    the one-click generate action of ``manage_timetable`` with jobs run
+    eagerly; the session's timetable is cleared (untimed) before each run.
+    """
+    session = session or Session.objects.order_by("-end_year").first()
+    plans = _requests(session)
+    results = {}
+    for view in views:
+        run, setup = plans[view]
+        timings, queries, statuses = [], [], set()
+        for i in range(iterations):
+            if setup:
+                setup()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = run(i)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(ctx.captured_queries))
+            statuses.add(response.status_code)
+        results[view] = {
+            "iterations": iterations,
+            **latency_stats(timings),
+            "queries": int(statistics.median(queries)),
+            "status": sorted(statuses),
+        }
+    return results
+
+
+def submission_burst(base_url: str, test, students, workers: int = 50, duplicate_every: int = 10,
+                     timeout: float = 60) -> dict:
+    """
+    Have every student in ``students`` open ``test`` and submit random
+    answers over HTTP from ``workers`` threads against the server at
+    ``base_url``. Every ``duplicate_every``-th student posts twice, like a
+    double click. Returns latency stats for opening and submitting, the
+    status codes seen, errors and the overall submission throughput.
+    """
+    snapshot = get_snapshot(test)
+    url = base_url + reverse("student_take_test", args=[test.id])
+    rng = random.Random(0)
+    plans = []
+    for n, student in enumerate(students):
+        login = Client()
+        login.force_login(student.admin)
+        answers = {f"q_{q}": str(rng.choice(sorted(options))) for q, options in snapshot["key"].items()}
+        plans.append((login.cookies[settings.SESSION_COOKIE_NAME].value, answers,
+                      2 if duplicate_every and n % duplicate_every == 0 else 1))
+
+    def take(plan):
+        cookie, answers, posts = plan
+        result = {"open_ms": None, "submit_ms": [], "status": [], "error": None}
+        with requests.Session() as http:
+            http.cookies.set(settings.SESSION_COOKIE_NAME, cookie)
+            try:
+                started = time.perf_counter()
+                response = http.get(url, timeout=timeout)
+                result["open_ms"] = (time.perf_counter() - started) * 1000
+                result["status"].append(response.status_code)
+                token = http.cookies.get(settings.CSRF_COOKIE_NAME)
+                for _ in range(posts):
+                    started = time.perf_counter()
+                    response = http.post(url, data=answers, headers={"X-CSRFToken": token},
+                                         allow_redirects=False, timeout=timeout)
+                    result["submit_ms"].append((time.perf_counter() - started) * 1000)
+                    result["status"].append(response.status_code)
+            except requests.RequestException as e:
+                result["error"] = str(e)
+        return result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(take, plans))
+    elapsed = time.perf_counter() - started
+
+    opens = [r["open_ms"] for r in results if r["open_ms"] is not None]
+    submits = [ms for r in results for ms in r["submit_ms"]]
+    statuses = {}
+    for r in results:
+        for status in r["status"]:
+            statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "students": len(plans),
+        "workers": workers,
+        "posts": len(submits),
+        "elapsed_s": round(elapsed, 2),
+        "submissions_per_s": round(len(submits) / elapsed, 1) if elapsed else None,
+        "open": latency_stats(opens) if opens else None,
+        "submit": latency_stats(submits) if submits else None,
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": [r["error"] for r in results if r["error"]][:10],
+        "error_count": sum(1 for r in results if r["error"]),
+    }
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
+
+def notifications(request):
+    """``unread_notifications`` for the sidebar badge, computed only if a template uses it."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+
+    def count():
+        from .notifications import unread_count
+
+        return unread_count(user)
+
+    return {"unread_notifications": SimpleLazyObject(count)}
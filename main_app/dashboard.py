@@ -0,0 +1,150 @@
+"""
+Precomputed aggregates for the dashboards.
+
+Every number on the admin dashboard comes from a handful of grouped
+``values``/``annotate`` queries instead of one query per subject, course or
+student. The result is cached per day (key ``dashboard:admin:<date>``) and
+recomputed when the cache entry expires, or on demand with
+``python manage.py refresh_dashboard``.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Attendance,
+    Course,
+    FeedbackStaff,
+    FeedbackStudent,
+    LeaveReportStaff,
+    LeaveReportStudent,
+    NotificationStaff,
+    NotificationStudent,
+    Staff,
+    Student,
+    StudentSubjectAttendanceSummary,
+    Subject,
+)
+from .timeseries import bucket_counts
+
+
+def _cache_key(day) -> str:
+    return f"dashboard:admin:{day.isoformat()}"
+
+
+def _cache_timeout() -> int:
+    return int(getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300))
+
+
+def _count_subquery(model, field: str) -> Subquery:
+    """Rows of ``model`` whose ``field`` is the outer row, as a scalar subquery."""
+    return Subquery(
+        model.objects.filter(**{field: OuterRef("pk")}).order_by().values(field)
+        .annotate(n=Count("pk")).values("n"),
+        output_field=IntegerField(),
+    )
+
+
+def compute_admin_aggregates(today=None) -> dict:
+    """Compute the admin dashboard numbers with grouped queries."""
+    today = today or timezone.localdate()
+
+    # Each subject's attendance count comes from a correlated subquery:
+    # counting it in the same join as the students would build
+    # attendance x students rows per subject before DISTINCT
+    subjects = list(
+        Subject.objects.order_by("id")
+        .annotate(
+            attendance_count=Coalesce(_count_subquery(Attendance, "subject"), 0),
+            student_count=Count("courses__student", distinct=True),
+        )
+        .values_list("name", "attendance_count", "student_count")
+    )
+    courses = list(
+        Course.objects.order_by("id")
+        .annotate(
+            subject_count=Coalesce(_count_subquery(Subject.courses.through, "course"), 0),
+            student_count=Count("student"),
+        )
+        .values_list("name", "subject_count", "student_count")
+    )
+
+    # Per-student present/absent counters and approved leaves, one query each
+    reports = {
+        row["student_id"]: row
+        for row in StudentSubjectAttendanceSummary.objects.values("student_id").annotate(
+            present=Sum("present"),
+            absent=Sum("absent"),
+        )
+    }
+    leaves = dict(
+        LeaveReportStudent.objects.filter(status=1)
+        .values("student_id")
+        .annotate(n=Count("id"))
+        .values_list("student_id", "n")
+    )
+    students = list(Student.objects.order_by("id").values_list("id", "admin__first_name"))
+
+    # Trend charts: one grouped query per series
+    notif_staff = bucket_counts(NotificationStaff.objects.all(), "created_at", days=7, end=today)
+    notif_student = bucket_counts(NotificationStudent.objects.all(), "created_at", days=7, end=today)
+    attendance = bucket_counts(Attendance.objects.all(), "date", days=14, end=today)
+    fb_student = bucket_counts(FeedbackStudent.objects.all(), "created_at", days=14, end=today)
+    fb_staff = bucket_counts(FeedbackStaff.objects.all(), "created_at", days=14, end=today)
+    month = (today - timedelta(days=29), today)
+
+    return {
+        "total_students": len(students),
+        "total_staff": Staff.objects.count(),
+        "total_course": len(courses),
+        "total_subject": len(subjects),
+        "subject_list": [name for name, _, _ in subjects],
+        "attendance_list": [count for _, count, _ in subjects],
+        "student_count_list_in_subject": [count for _, _, count in subjects],
+        "course_name_list": [name for name, _, _ in courses],
+        "subject_count_list": [count for _, count, _ in courses],
+        "student_count_list_in_course": [count for _, _, count in courses],
+        "student_name_list": [first_name for _, first_name in students],
+        "student_attendance_present_list": [
+            reports.get(student_id, {}).get("present", 0) for student_id, _ in students
+        ],
+        "student_attendance_leave_list": [
+            reports.get(student_id, {}).get("absent", 0) + leaves.get(student_id, 0)
+            for student_id, _ in students
+        ],
+        "notif_labels": notif_staff.labels,
+        "notif_counts": [a + b for a, b in zip(notif_staff.counts, notif_student.counts)],
+        "att_labels": attendance.labels,
+        "att_counts": attendance.counts,
+        "fb_labels": fb_student.labels,
+        "fb_student": fb_student.counts,
+        "fb_staff": fb_staff.counts,
+        "leave_comp_json": json.dumps({
+            "student": LeaveReportStudent.objects.filter(created_at__date__range=month).count(),
+            "staff": LeaveReportStaff.objects.filter(created_at__date__range=month).count(),
+        }),
+    }
+
+
+def admin_aggregates(today=None) -> dict:
+    """Cached admin dashboard numbers for ``today`` (computed on a miss)."""
+    today = today or timezone.localdate()
+    key = _cache_key(today)
+    data = cache.get(key)
+    if data is None:
+        data = compute_admin_aggregates(today)
+        cache.set(key, data, _cache_timeout())
+    return data
+
+
+def refresh_admin_aggregates(today=None) -> dict:
+    """Recompute and store today's aggregates regardless of the cache."""
+    today = today or timezone.localdate()
+    data = compute_admin_aggregates(today)
+    cache.set(_cache_key(today), data, _cache_timeout())
+    return data
@@ -0,0 +1,201 @@
+"""
+MCQ grading against an in-memory answer key.
+
+``AnswerKey`` maps each question to its options, so grading a submission
+is a dict lookup per question.
+
+Submitting a test only appends the posted answers to
+``MCQSubmissionInbox`` (``receive_submission``) and makes sure a
+``mcq.grade_inbox`` job is queued. The job grades the inbox in batches
+(``grade_inbox``): each batch writes its ``MCQSubmission`` and
+``MCQAnswer`` rows with a few bulk queries in one transaction, so a burst
+of submissions at the end of an exam costs the request one insert each.
+The inbox is unique per (test, student), which makes repeated posts of the
+same submission harmless.
+
+The questions, options and answer key of a test are serialized once into
+an immutable snapshot cached under the test's ``snapshot_version``.
+Editing a test (adding a question, toggling it active) calls
+``publish_snapshot``, which bumps the version and caches the new snapshot,
+so when a scheduled test opens every student is served from the cache.
+"""
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, MCQAnswer, MCQOption, MCQQuestion, MCQSubmission, MCQSubmissionInbox, MCQTest
+
+GRADE_JOB = "mcq.grade_inbox"
+
+
+class AnswerKey:
+    def __init__(self, options: Dict[int, Dict[int, bool]]):
+        # question id -> {option id: is_correct}
+        self.options = options
+
+    @classmethod
+    def from_questions(cls, questions: Iterable) -> "AnswerKey":
+        """Key for ``MCQQuestion`` objects with their ``options`` prefetched."""
+        return cls({q.id: {o.id: o.is_correct for o in q.options.all()} for q in questions})
+
+    def __len__(self) -> int:
+        return len(self.options)
+
+    def grade(self, data: Mapping) -> Tuple[int, List[Tuple[int, int]]]:
+        """
+        Score the answers in ``data`` (``q_<question id>`` -> option id, as
+        posted by the take-test form). Returns the score and the
+        ``(question id, option id)`` pairs to store; unanswered questions
+        and options that do not belong to their question are skipped.
+        """
+        score, picks = 0, []
+        for question_id, options in self.options.items():
+            try:
+                option_id = int(data.get(f"q_{question_id}") or 0)
+            except (TypeError, ValueError):
+                continue
+            if option_id in options:
+                picks.append((question_id, option_id))
+                score += options[option_id]
+        return score, picks
+
+
+# Snapshots ----------------------------------------------------------------
+
+def _snapshot_key(test_id: int, version: int) -> str:
+    return f"mcq:snapshot:{test_id}:{version}"
+
+
+def _snapshot_timeout() -> int:
+    return int(getattr(settings, "MCQ_SNAPSHOT_TIMEOUT", 86400))
+
+
+def build_snapshot(test: MCQTest) -> dict:
+    """
+    ``{"version", "questions": [{"id", "text", "options": [{"id", "text"}]}],
+    "key": {question id: {option id: is_correct}}}`` with two queries,
+    questions and options in id order.
+    """
+    questions = list(MCQQuestion.objects.filter(test=test).order_by("id").values("id", "text"))
+    by_question = {q["id"]: [] for q in questions}
+    key = {q["id"]: {} for q in questions}
+    for option_id, question_id, text, is_correct in (
+        MCQOption.objects.filter(question__test=test).order_by("id")
+        .values_list("id", "question_id", "text", "is_correct")
+    ):
+        by_question[question_id].append({"id": option_id, "text": text})
+        key[question_id][option_id] = is_correct
+    return {
+        "version": test.snapshot_version,
+        "questions": [dict(q, options=by_question[q["id"]]) for q in questions],
+        "key": key,
+    }
+
+
+def get_snapshot(test: MCQTest) -> dict:
+    """The cached snapshot of ``test`` at its current version, built on a miss."""
+    cache_key = _snapshot_key(test.pk, test.snapshot_version)
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        snapshot = build_snapshot(test)
+        cache.set(cache_key, snapshot, _snapshot_timeout())
+    return snapshot
+
+
+def publish_snapshot(test: MCQTest) -> dict:
+    """Start a new snapshot version of ``test`` after an edit and cache it."""
+    MCQTest.objects.filter(pk=test.pk).update(snapshot_version=F("snapshot_version") + 1)
+    test.refresh_from_db(fields=["snapshot_version"])
+    old_key = _snapshot_key(test.pk, test.snapshot_version - 1)
+    cache.delete(old_key)
+    snapshot = build_snapshot(test)
+    # Cache only once the edit is visible to other requests
+    transaction.on_commit(lambda: cache.set(_snapshot_key(test.pk, snapshot["version"]), snapshot,
+                                            _snapshot_timeout()))
+    return snapshot
+
+
+def snapshot_answer_key(snapshot: dict) -> AnswerKey:
+    return AnswerKey(snapshot["key"])
+
+
+# Submission inbox ---------------------------------------------------------
+
+def receive_submission(test: MCQTest, student, snapshot: dict, data: Mapping) -> None:
+    """
+    Store the answers in ``data`` for the snapshot's questions and queue
+    grading. A second submission of the same test by the same student is
+    ignored.
+    """
+    answers = {}
+    for question_id in snapshot["key"]:
+        value = data.get(f"q_{question_id}")
+        if value:
+            answers[f"q_{question_id}"] = str(value)[:20]
+    MCQSubmissionInbox.objects.bulk_create(
+        [MCQSubmissionInbox(test=test, student=student, answers=answers)], ignore_conflicts=True
+    )
+    schedule_grading()
+
+
+def schedule_grading() -> None:
+    """Queue a grading run unless one is already waiting; a burst shares the same run."""
+    from .jobs import enqueue
+
+    if not Job.objects.filter(name=GRADE_JOB, status=Job.STATUS_QUEUED).exists():
+        delay = getattr(settings, "MCQ_GRADING_DELAY", 2)
+        enqueue(GRADE_JOB, run_at=timezone.now() + timedelta(seconds=delay))
+
+
+def grade_inbox(batch_size: int = 500, progress: Optional[Callable[[int, str], None]] = None) -> dict:
+    """
+    Grade every ungraded inbox row, ``batch_size`` rows per transaction.
+    Rows whose student already has a submission for the test are only
+    marked graded. Returns the number of submissions written and skipped.
+    """
+    graded = skipped = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                MCQSubmissionInbox.objects.filter(graded_at__isnull=True).order_by("id")
+                .values_list("id", "test_id", "student_id", "answers")[:batch_size]
+            )
+            if not rows:
+                break
+            tests = MCQTest.objects.in_bulk({test_id for _, test_id, _, _ in rows})
+            keys = {test_id: snapshot_answer_key(get_snapshot(test)) for test_id, test in tests.items()}
+            students = {student_id for _, _, student_id, _ in rows}
+            existing = set(
+                MCQSubmission.objects.filter(test_id__in=keys, student_id__in=students)
+                .values_list("test_id", "student_id")
+            )
+            results = {}
+            for _, test_id, student_id, answers in rows:
+                if test_id in keys and (test_id, student_id) not in existing:
+                    results[(test_id, student_id)] = keys[test_id].grade(answers)
+            MCQSubmission.objects.bulk_create([
+                MCQSubmission(test_id=test_id, student_id=student_id, score=score)
+                for (test_id, student_id), (score, _) in results.items()
+            ], batch_size=500, ignore_conflicts=True)
+            # bulk_create does not return primary keys on every backend
+            submission_ids = {
+                (test_id, student_id): pk
+                for pk, test_id, student_id in MCQSubmission.objects.filter(
+                    test_id__in=keys, student_id__in=students
+                ).values_list("id", "test_id", "student_id")
+            }
+            MCQAnswer.objects.bulk_create([
+                MCQAnswer(submission_id=submission_ids[pair], question_id=question_id, selected_option_id=option_id)
+                for pair, (_, picks) in results.items() for question_id, option_id in picks
+            ], batch_size=1000, ignore_conflicts=True)
+            MCQSubmissionInbox.objects.filter(id__in=[row[0] for row in rows]).update(graded_at=timezone.now())
+        graded += len(results)
+        skipped += len(rows) - len(results)
+        if progress:
+            progress(0, f"Graded {graded} submission(s)")
+    return {"graded": graded, "skipped": skipped}
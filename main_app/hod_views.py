@@ -1,11 +1,9 @@
 import json
-import requests
 from django.contrib import messages
 from django.core.files.storage import FileSystemStorage
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import (HttpResponse, HttpResponseRedirect,
                               get_object_or_404, redirect, render)
-from django.templatetags.static import static
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import UpdateView
@@ -16,68 +14,14 @@ from datetime import timedelta
 
 from .forms import *
 from .models import *
+from .notifications import notify, notify_later
 
 
 def admin_home(request):
-    total_staff = Staff.objects.all().count()
-    total_students = Student.objects.all().count()
-    subjects = Subject.objects.all()
-    total_subject = subjects.count()
-    total_course = Course.objects.all().count()
-    attendance_list = Attendance.objects.filter(subject__in=subjects)
-    total_attendance = attendance_list.count()
-    attendance_list = []
-    subject_list = []
-    for subject in subjects:
-        attendance_count = Attendance.objects.filter(subject=subject).count()
-        subject_list.append(subject.name[:7])
-        attendance_list.append(attendance_count)
-
-    # Total Subjects and students in Each Course
-    course_all = Course.objects.all()
-    course_name_list = []
-    subject_count_list = []
-    student_count_list_in_course = []
-
-    for course in course_all:
-        subjects = Subject.objects.filter(courses=course).count()
-        students = Student.objects.filter(course_id=course.id).count()
-        course_name_list.append(course.name)
-        subject_count_list.append(subjects)
-        student_count_list_in_course.append(students)
-    
-    subject_all = Subject.objects.all()
-    subject_list = []
-    student_count_list_in_subject = []
-    for subject in subject_all:
-        # Count students across all courses where this subject is offered
-        student_count = Student.objects.filter(course__in=subject.courses.all()).count()
-        subject_list.append(subject.name)
-        student_count_list_in_subject.append(student_count)
-
-
-    # For Students
-    student_attendance_present_list=[]
-    student_attendance_leave_list=[]
-    student_name_list=[]
-
-    students = Student.objects.all()
-    for student in students:
-        
-        attendance = AttendanceReport.objects.filter(student_id=student.id, status=True).count()
-        absent = AttendanceReport.objects.filter(student_id=student.id, status=False).count()
-        leave = LeaveReportStudent.objects.filter(student_id=student.id, status=1).count()
-        student_attendance_present_list.append(attendance)
-        student_attendance_leave_list.append(leave+absent)
-        student_name_list.append(student.admin.first_name)
-
-    # Notifications aggregates
-    now = timezone.now()
-    days = [now - timedelta(days=i) for i in range(6, -1, -1)]
-    notif_labels = [d.strftime("%b %d") for d in days]
-    staff_counts = [NotificationStaff.objects.filter(created_at__date=d.date()).count() for d in days]
-    student_counts = [NotificationStudent.objects.filter(created_at__date=d.date()).count() for d in days]
-    notif_counts = [staff_counts[i] + student_counts[i] for i in range(len(days))]
+    from .dashboard import admin_aggregates
+
+    # Counts and charts come from the cached dashboard aggregates; only the
+    # recent notifications list is read live
     recent_staff = list(NotificationStaff.objects.all().order_by('-created_at')[:10])
     recent_student = list(NotificationStudent.objects.all().order_by('-created_at')[:10])
     recent_combined = sorted(
@@ -86,46 +30,11 @@ def admin_home(request):
         key=lambda x: x['created_at'], reverse=True
     )[:10]
 
-    # Additional charts: attendance trend (14 days), feedback trend (stacked), leave composition (30 days)
-    days14 = [timezone.now().date() - timedelta(days=i) for i in range(13, -1, -1)]
-    att_labels = [d.strftime("%b %d") for d in days14]
-    att_counts = [Attendance.objects.filter(date=d).count() for d in days14]
-
-    days14_dt = [timezone.now() - timedelta(days=i) for i in range(13, -1, -1)]
-    fb_labels = [d.strftime("%b %d") for d in days14_dt]
-    fb_student = [FeedbackStudent.objects.filter(created_at__date=d.date()).count() for d in days14_dt]
-    fb_staff = [FeedbackStaff.objects.filter(created_at__date=d.date()).count() for d in days14_dt]
-
-    days30_dt = [timezone.now() - timedelta(days=i) for i in range(29, -1, -1)]
-    leave_student_30 = LeaveReportStudent.objects.filter(created_at__date__in=[d.date() for d in days30_dt]).count()
-    leave_staff_30 = LeaveReportStaff.objects.filter(created_at__date__in=[d.date() for d in days30_dt]).count()
-    leave_comp_json = json.dumps({"student": leave_student_30, "staff": leave_staff_30})
-
     context = {
         'page_title': "Administrative Dashboard",
-        'total_students': total_students,
-        'total_staff': total_staff,
-        'total_course': total_course,
-        'total_subject': total_subject,
-        'subject_list': subject_list,
-        'attendance_list': attendance_list,
-        'student_attendance_present_list': student_attendance_present_list,
-        'student_attendance_leave_list': student_attendance_leave_list,
-        "student_name_list": student_name_list,
-        "student_count_list_in_subject": student_count_list_in_subject,
-        "student_count_list_in_course": student_count_list_in_course,
-        "course_name_list": course_name_list,
-        "notif_labels": notif_labels,
-        "notif_counts": notif_counts,
         "recent_notifications": recent_combined,
-        "att_labels": att_labels,
-        "att_counts": att_counts,
-        "fb_labels": fb_labels,
-        "fb_student": fb_student,
-        "fb_staff": fb_staff,
-        "leave_comp_json": leave_comp_json,
-
     }
+    context.update(admin_aggregates())
     return render(request, 'hod_template/home_content.html', context)
 
 
@@ -643,6 +552,38 @@ def admin_view_attendance(request):
     return render(request, "hod_template/admin_view_attendance.html", context)
 
 
+def admin_grade_sheet(request):
+    from .results import HEADER, course_results, export_response, grade_sheet, sheet_rows
+
+    context = {
+        'page_title': 'Grade Sheet',
+        'courses': Course.objects.all(),
+        'sessions': Session.objects.all(),
+    }
+    course_id = request.GET.get('course')
+    session_id = request.GET.get('session') or None
+    if course_id:
+        course = get_object_or_404(Course, id=course_id)
+        session = get_object_or_404(Session, id=session_id) if session_id else None
+        sheet = grade_sheet(course_results(course.id, session_id))
+        filename = f"grades-{course.name}" + (f"-{session.id}" if session else "")
+        try:
+            response = export_response(sheet, request.GET.get('format'), filename)
+        except ImportError:
+            response = None
+            messages.warning(request, "XLSX export needs openpyxl installed; download the CSV instead")
+        if response is not None:
+            return response
+        context.update({
+            'course': course,
+            'session': session,
+            'sheet': sheet,
+            'header': HEADER,
+            'rows': list(sheet_rows(sheet)),
+        })
+    return render(request, "hod_template/admin_grade_sheet.html", context)
+
+
 def manage_timetable(request):
     page_title = "Manage Timetable"
     room_form = RoomForm(prefix="room")
@@ -688,6 +629,53 @@ def manage_timetable(request):
             deleted_count, _ = TimetableEntry.objects.filter(session=session).delete()
             messages.warning(request, f"Erased {deleted_count} timetable entr{'y' if deleted_count == 1 else 'ies'} for session {session}.")
             return redirect("manage_timetable")
+        elif request.POST.get("repair_entries"):
+            # Move only the entries that no longer fit; everything else stays put
+            session_id = request.POST.get("repair_session_id")
+            session = None
+            if session_id:
+                try:
+                    session = Session.objects.get(id=int(session_id))
+                except (Session.DoesNotExist, ValueError):
+                    session = None
+            if session is None:
+                session = Session.objects.order_by('-end_year').first()
+            if session is None:
+                messages.error(request, "No session found. Please create a session first.")
+                return redirect("manage_timetable")
+
+            from .scheduling import ChangeSet, repair_session
+
+            changes = ChangeSet()
+            vacate_room_id = request.POST.get("vacate_room_id")
+            if vacate_room_id:
+                try:
+                    changes.removed_rooms.add(int(vacate_room_id))
+                except ValueError:
+                    pass
+            diff = repair_session(session, changes)
+            moved, removed, unplaced = diff["moved"], diff["removed"], diff["unplaced"]
+            if not (moved or removed or unplaced or diff["created"]):
+                messages.success(request, f"Timetable for session {session} is already valid; nothing changed.")
+            else:
+                messages.success(
+                    request,
+                    f"Repaired session {session}: moved {len(moved)}, removed {len(removed)}, "
+                    f"added {diff['created']}, kept {diff['kept']} unchanged."
+                )
+            for change in moved[:10]:
+                messages.info(
+                    request,
+                    f"{change['label']}: {change['from']['day']} P{change['from']['period']} → "
+                    f"{change['to']['day']} P{change['to']['period']} ({change['reason'].replace('_', ' ')})"
+                )
+            if unplaced:
+                messages.warning(
+                    request,
+                    f"{len(unplaced)} entr{'y' if len(unplaced) == 1 else 'ies'} had no free slot left and "
+                    "were removed: " + ", ".join(c["label"] for c in unplaced[:10])
+                )
+            return redirect("manage_timetable")
         elif request.POST.get("auto_generate"):
             # One-click auto-generate using scheduling heuristic
             session = Session.objects.order_by('-end_year').first()
@@ -695,20 +683,19 @@ def manage_timetable(request):
                 messages.error(request, "No session found. Please create a session first.")
                 return redirect("manage_timetable")
 
-            from .scheduling import generate_for_session
-
-            summary = generate_for_session(session)
-            created = summary.get("created", 0)
-            skipped = summary.get("skipped", 0)
-            errors = summary.get("errors", [])
-            if created > 0:
-                messages.success(request, f"Auto-generated {created} timetable entr{'y' if created == 1 else 'ies'} across all subjects.")
-            else:
-                messages.warning(request, "No entries generated. Ensure subjects have credits and free slots exist.")
-            if skipped > 0:
-                messages.info(request, f"Skipped {skipped} slot{'s' if skipped != 1 else ''} due to conflicts or validation.")
-            if errors:
-                messages.warning(request, f"{len(errors)} validation issues encountered during generation.")
+            from .jobs import enqueue
+            from .scheduling import ENGINE_CHOICES, ENGINE_GREEDY
+
+            engine = request.POST.get("engine") or ENGINE_GREEDY
+            if engine not in dict(ENGINE_CHOICES):
+                engine = ENGINE_GREEDY
+            # Generation can take a while on large institutions; the worker runs it
+            job = enqueue("timetable.generate", {"session_id": session.id, "engine": engine}, user=request.user)
+            messages.info(
+                request,
+                f"Timetable generation ({dict(ENGINE_CHOICES)[engine]}) queued as job #{job.id}; "
+                "its progress is shown under Auto Generate."
+            )
             return redirect("manage_timetable")
 
     entries = TimetableEntry.objects.select_related("session", "course", "section", "subject", "staff", "room").order_by(
@@ -789,6 +776,8 @@ def manage_timetable(request):
     from .models import Room
     rooms = Room.objects.all().order_by("name")
 
+    from .scheduling import ENGINE_CHOICES
+
     context = {
         "page_title": page_title,
         "room_form": room_form,
@@ -797,6 +786,8 @@ def manage_timetable(request):
         "sessions": sessions,
         "audit": audit,
         "rooms": rooms,
+        "engine_choices": ENGINE_CHOICES,
+        "timetable_jobs": Job.objects.filter(name="timetable.generate").order_by("-id")[:5],
     }
     return render(request, "hod_template/manage_timetable.html", context)
 
@@ -831,7 +822,7 @@ def update_extra_request_status(request, request_id: int):
     req.save()
     # Notify staff
     note = f"Your extra class request for {req.subject} ({req.session}) is {new_status}."
-    NotificationStaff.objects.create(staff=req.staff, message=note)
+    notify([req.staff], note)
     TimetableAuditLog.objects.create(
         actor=request.user,
         action="extra_request",
@@ -937,44 +928,23 @@ def admin_reset_maintenance(request):
 
     if request.method == "POST":
         action = request.POST.get("action")
-        try:
-            with transaction.atomic():
-                if action == "reset_unavailability":
-                    deleted, _ = unavail_qs.delete()
-                    messages.success(request, f"Reset {deleted} unavailability records" + (f" for session {selected_session}" if selected_session else ""))
-                elif action == "reset_extra_slots":
-                    deleted, _ = extra_slots_qs.delete()
-                    messages.success(request, f"Reset {deleted} extra slots" + (f" for session {selected_session}" if selected_session else ""))
-                elif action == "reset_extra_requests":
-                    deleted, _ = extra_requests_qs.delete()
-                    messages.success(request, f"Reset {deleted} extra class requests" + (f" for session {selected_session}" if selected_session else ""))
-                elif action == "reset_extra_schedules":
-                    deleted, _ = extra_schedules_qs.delete()
-                    messages.success(request, f"Reset {deleted} extra class schedules" + (f" for session {selected_session}" if selected_session else ""))
-                elif action == "reset_all":
-                    d1, _ = unavail_qs.delete()
-                    d2, _ = extra_slots_qs.delete()
-                    d3, _ = extra_requests_qs.delete()
-                    d4, _ = extra_schedules_qs.delete()
-                    messages.success(request, (
-                        f"Reset all: {d1} unavailability, {d2} extra slots, {d3} requests, {d4} schedules"
-                        + (f" for session {selected_session}" if selected_session else "")
-                    ))
-                else:
-                    messages.error(request, "Invalid action")
-                    return redirect(reverse("admin_reset_maintenance"))
-
-                # Audit
-                try:
-                    TimetableAuditLog.objects.create(
-                        actor=request.user,
-                        action="admin_reset",
-                        details=f"action={action} session={selected_session or 'all'}",
-                    )
-                except Exception:
-                    pass
-        except Exception as e:
-            messages.error(request, f"Could not perform reset: {e}")
+        if action not in ("reset_unavailability", "reset_extra_slots", "reset_extra_requests",
+                          "reset_extra_schedules", "reset_all"):
+            messages.error(request, "Invalid action")
+            return redirect(reverse("admin_reset_maintenance"))
+        from .jobs import enqueue
+
+        # Mass deletes run on the job worker; the audit log entry is written there
+        job = enqueue("maintenance.reset", {
+            "action": action,
+            "session_id": selected_session.id if selected_session else None,
+            "actor_id": request.user.id,
+        }, user=request.user)
+        messages.success(request, (
+            f"Reset queued as job #{job.id}"
+            + (f" for session {selected_session}" if selected_session else "")
+            + ". Counts update once it has run."
+        ))
         return redirect(reverse("admin_reset_maintenance") + (f"?session_id={session_id}" if session_id else ""))
 
     context = {
@@ -1010,24 +980,14 @@ def admin_schedule_extra_class(request):
                 sched.full_clean()
                 sched.save()
                 # Notify the assigned staff
-                NotificationStaff.objects.create(
-                    staff=sched.staff,
-                    message=f"Extra class scheduled: {sched.subject} on {sched.start_datetime}"
-                )
-                # Broadcast to all staff in the course
+                notify([sched.staff], f"Extra class scheduled: {sched.subject} on {sched.start_datetime}")
+                # Broadcast to all staff and students in the course from the job worker
                 try:
-                    course_staff = Staff.objects.filter(course=sched.course).exclude(id=sched.staff_id)
                     msg_staff = f"Extra class scheduled for {sched.course.name}: {sched.subject.name} on {sched.start_datetime}"
-                    for s in course_staff:
-                        NotificationStaff.objects.create(staff=s, message=msg_staff)
-                except Exception:
-                    pass
-                # Notify students in the course
-                try:
-                    students = Student.objects.filter(course=sched.course)
+                    notify_later("staff", msg_staff, course_id=sched.course_id, exclude_ids=[sched.staff_id],
+                                 user=request.user)
                     msg_student = f"Extra class scheduled: {sched.subject.name} on {sched.start_datetime}"
-                    for stu in students:
-                        NotificationStudent.objects.create(student=stu, message=msg_student)
+                    notify_later("student", msg_student, course_id=sched.course_id, user=request.user)
                 except Exception:
                     pass
                 TimetableAuditLog.objects.create(
@@ -1098,25 +1058,20 @@ def update_extra_class_status(request, schedule_id: int):
     sched.save()
     # Notify requesting staff
     note = f"Your extra class for {sched.subject} on {sched.start_datetime} is {new_status}."
-    NotificationStaff.objects.create(staff=sched.staff, message=note)
+    notify([sched.staff], note)
     # If scheduled or cancelled, notify course teachers and students
     try:
         if new_status in ["scheduled", "approved"]:
             # Teachers in course
-            others = Staff.objects.filter(course=sched.course).exclude(id=sched.staff_id)
             msg_staff = f"Extra class {new_status}: {sched.subject.name} on {sched.start_datetime}"
-            for s in others:
-                NotificationStaff.objects.create(staff=s, message=msg_staff)
+            notify_later("staff", msg_staff, course_id=sched.course_id, exclude_ids=[sched.staff_id],
+                         user=request.user)
         if new_status == "scheduled":
-            students = Student.objects.filter(course=sched.course)
             msg_student = f"Extra class scheduled: {sched.subject.name} on {sched.start_datetime}"
-            for stu in students:
-                NotificationStudent.objects.create(student=stu, message=msg_student)
+            notify_later("student", msg_student, course_id=sched.course_id, user=request.user)
         if new_status == "cancelled":
-            students = Student.objects.filter(course=sched.course)
             msg_student = f"Extra class cancelled: {sched.subject.name} on {sched.start_datetime}"
-            for stu in students:
-                NotificationStudent.objects.create(student=stu, message=msg_student)
+            notify_later("student", msg_student, course_id=sched.course_id, user=request.user)
     except Exception:
         pass
     TimetableAuditLog.objects.create(
@@ -1250,22 +1205,7 @@ def send_student_notification(request):
     message = request.POST.get('message')
     student = get_object_or_404(Student, admin_id=id)
     try:
-        url = "https://fcm.googleapis.com/fcm/send"
-        body = {
-            'notification': {
-                'title': "Student Management System",
-                'body': message,
-                'click_action': reverse('student_view_notification'),
-                'icon': static('dist/img/AdminLTELogo.png')
-            },
-            'to': student.admin.fcm_token
-        }
-        headers = {'Authorization':
-                   'key=AAAA3Bm8j_M:APA91bElZlOLetwV696SoEtgzpJr2qbxBfxVBfDWFiopBWzfCfzQp2nRyC7_A2mlukZEHV4g1AmyC6P_HonvSkY2YyliKt5tT3fe_1lrKod2Daigzhb2xnYQMxUWjCAIQcUexAMPZePB',
-                   'Content-Type': 'application/json'}
-        data = requests.post(url, data=json.dumps(body), headers=headers)
-        notification = NotificationStudent(student=student, message=message)
-        notification.save()
+        notify([student], message)
         return HttpResponse("True")
     except Exception as e:
         return HttpResponse("False")
@@ -1277,22 +1217,7 @@ def send_staff_notification(request):
     message = request.POST.get('message')
     staff = get_object_or_404(Staff, admin_id=id)
     try:
-        url = "https://fcm.googleapis.com/fcm/send"
-        body = {
-            'notification': {
-                'title': "Student Management System",
-                'body': message,
-                'click_action': reverse('staff_view_notification'),
-                'icon': static('dist/img/AdminLTELogo.png')
-            },
-            'to': staff.admin.fcm_token
-        }
-        headers = {'Authorization':
-                   'key=AAAA3Bm8j_M:APA91bElZlOLetwV696SoEtgzpJr2qbxBfxVBfDWFiopBWzfCfzQp2nRyC7_A2mlukZEHV4g1AmyC6P_HonvSkY2YyliKt5tT3fe_1lrKod2Daigzhb2xnYQMxUWjCAIQcUexAMPZePB',
-                   'Content-Type': 'application/json'}
-        data = requests.post(url, data=json.dumps(body), headers=headers)
-        notification = NotificationStaff(staff=staff, message=message)
-        notification.save()
+        notify([staff], message)
         return HttpResponse("True")
     except Exception as e:
         return HttpResponse("False")
@@ -1339,3 +1264,19 @@ def delete_session(request, session_id):
         messages.error(
             request, "There are students assigned to this session. Please move them to another session.")
     return redirect(reverse('manage_session'))
+
+
+def request_metrics(request):
+    """Per-view latency percentiles, query counts and sizes over the in-memory window."""
+    from .request_metrics import store
+
+    if request.method == "POST" and request.POST.get("action") == "clear":
+        store.clear()
+        messages.success(request, "Request metrics cleared.")
+        return redirect("request_metrics")
+    context = {
+        "page_title": "Request Metrics",
+        "rows": store.summary(),
+        "window": store.window,
+    }
+    return render(request, "hod_template/request_metrics.html", context)
@@ -0,0 +1,170 @@
+"""
+Item analysis of MCQ tests.
+
+For a test, ``analyse_test`` reports the score distribution and
+percentiles, each question's difficulty (p-value: the share of students
+who answered it correctly), its discrimination (the point-biserial
+correlation between answering it correctly and the score on the rest of
+the test) and how often each option was picked.
+
+Submissions are loaded as two flat arrays (submission scores, and the
+submission/option pair of every answer) and turned into a students x
+questions correctness matrix with NumPy; options map to questions through
+the test's cached snapshot, so no join is needed. The matrix and option
+counts are cached per test together with the last submission id seen, so
+later calls only load the submissions that arrived since. Editing the
+test (a new snapshot version) starts over.
+"""
+from typing import Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .grading import get_snapshot
+from .models import MCQAnswer, MCQSubmission, MCQTest
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _cache_key(test_id: int) -> str:
+    return f"mcq:analysis:{test_id}"
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "MCQ_ANALYSIS_TIMEOUT", 3600))
+
+
+def _option_index(snapshot: dict):
+    """Sorted option ids with each option's question column and correctness."""
+    rows = sorted(
+        (option_id, column, is_correct)
+        for column, options in enumerate(snapshot["key"].values())
+        for option_id, is_correct in options.items()
+    )
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    columns = np.array([r[1] for r in rows], dtype=np.int64)
+    correct = np.array([r[2] for r in rows], dtype=bool)
+    return ids, columns, correct
+
+
+def _empty_state(snapshot: dict) -> dict:
+    n_questions = len(snapshot["key"])
+    n_options = sum(len(options) for options in snapshot["key"].values())
+    return {
+        "version": snapshot["version"],
+        "last_id": 0,
+        "scores": np.zeros(0, dtype=np.int64),
+        "correct": np.zeros((0, n_questions), dtype=bool),
+        "option_counts": np.zeros(n_options, dtype=np.int64),
+        "answered": np.zeros(n_questions, dtype=np.int64),
+    }
+
+
+def _add_submissions(state: dict, test: MCQTest, snapshot: dict) -> dict:
+    """Load submissions newer than ``state["last_id"]`` into ``state``."""
+    submissions = np.array(
+        MCQSubmission.objects.filter(test=test, id__gt=state["last_id"]).order_by("id").values_list("id", "score"),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    if not len(submissions):
+        return state
+    answers = np.array(
+        MCQAnswer.objects.filter(
+            submission__test=test, submission_id__gt=state["last_id"], submission_id__lte=submissions[-1, 0]
+        ).values_list("submission_id", "selected_option_id"),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+    option_ids, option_columns, option_correct = _option_index(snapshot)
+    n_questions = len(snapshot["key"])
+    correct = np.zeros((len(submissions), n_questions), dtype=bool)
+    counts = np.zeros(len(option_ids), dtype=np.int64)
+    answered = np.zeros(n_questions, dtype=np.int64)
+    if len(answers) and len(option_ids):
+        rows = np.searchsorted(submissions[:, 0], answers[:, 0])
+        options = np.minimum(np.searchsorted(option_ids, answers[:, 1]), len(option_ids) - 1)
+        # Answers to options that are no longer part of the test are ignored
+        known = option_ids[options] == answers[:, 1]
+        rows, options = rows[known], options[known]
+        hits = option_correct[options]
+        correct[rows[hits], option_columns[options[hits]]] = True
+        counts = np.bincount(options, minlength=len(option_ids))
+        answered = np.bincount(option_columns[options], minlength=n_questions)
+
+    return dict(
+        state,
+        last_id=int(submissions[-1, 0]),
+        scores=np.concatenate([state["scores"], submissions[:, 1]]),
+        correct=np.vstack([state["correct"], correct]),
+        option_counts=state["option_counts"] + counts,
+        answered=state["answered"] + answered,
+    )
+
+
+def _discrimination(correct: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """Point-biserial correlation of each item with the rest score (total minus the item)."""
+    items = correct.astype(float)
+    rest = scores[:, None] - items
+    items_c = items - items.mean(axis=0)
+    rest_c = rest - rest.mean(axis=0)
+    denominator = np.sqrt((items_c ** 2).sum(axis=0) * (rest_c ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, (items_c * rest_c).sum(axis=0) / denominator, np.nan)
+
+
+def _round(value, digits=3) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def summarize(state: dict, snapshot: dict) -> dict:
+    """Report for the template from a loaded ``state``."""
+    scores, correct = state["scores"], state["correct"]
+    n, n_questions = len(scores), len(snapshot["key"])
+    report = {"submissions": n, "questions": n_questions, "distribution": [], "percentiles": {}, "items": []}
+    if n:
+        report.update(
+            mean=_round(scores.mean(), 2),
+            std=_round(scores.std(), 2),
+            min=int(scores.min()),
+            max=int(scores.max()),
+            percentiles={p: _round(v, 2) for p, v in zip(PERCENTILES, np.percentile(scores, PERCENTILES))},
+            distribution=np.bincount(scores, minlength=n_questions + 1).tolist(),
+        )
+    difficulty = correct.mean(axis=0) if n else np.full(n_questions, np.nan)
+    discrimination = _discrimination(correct, scores) if n > 1 else np.full(n_questions, np.nan)
+
+    option_ids, _, _ = _option_index(snapshot)
+    position = {int(option_id): i for i, option_id in enumerate(option_ids)}
+    for column, question in enumerate(snapshot["questions"]):
+        key = snapshot["key"][question["id"]]
+        options = []
+        for option in question["options"]:
+            picked = int(state["option_counts"][position[option["id"]]])
+            options.append({
+                "text": option["text"],
+                "correct": key[option["id"]],
+                "count": picked,
+                "share": _round(picked / n, 3) if n else None,
+            })
+        report["items"].append({
+            "number": column + 1,
+            "text": question["text"],
+            "difficulty": _round(difficulty[column]),
+            "discrimination": _round(discrimination[column]),
+            "omitted": n - int(state["answered"][column]),
+            "options": options,
+        })
+    return report
+
+
+def analyse_test(test: MCQTest) -> dict:
+    """Item analysis of ``test``, loading only submissions newer than the cached state."""
+    snapshot = get_snapshot(test)
+    state = cache.get(_cache_key(test.pk))
+    if state is None or state["version"] != snapshot["version"]:
+        state = _empty_state(snapshot)
+    updated = _add_submissions(state, test, snapshot)
+    if updated is not state or state["last_id"] == 0:
+        cache.set(_cache_key(test.pk), updated, _timeout())
+    return summarize(updated, snapshot)
@@ -0,0 +1,252 @@
+"""
+Database-backed background jobs.
+
+Handlers register under a name with ``@job("name")`` and receive a
+``JobContext`` plus the job's JSON payload as keyword arguments; whatever
+they return is stored as the job's result. ``enqueue`` writes a ``Job``
+row and returns at once; ``manage.py run_worker`` claims and runs them.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+supports it, so several workers never pick the same job. On SQLite, which
+has neither, a claim first updates the single ``JobLock`` row, taking the
+database write lock for the rest of the claim transaction.
+
+A failing job is retried with exponential backoff until ``max_attempts``;
+a job left ``running`` for ``JOBS_STALE_AFTER`` seconds by a worker that
+died or hung counts as a failed attempt too. With ``JOBS_EAGER = True`` jobs run inline
+inside ``enqueue`` (handy for development without a worker).
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Job, JobLock
+
+logger = logging.getLogger(__name__)
+
+REGISTRY: Dict[str, Callable] = {}
+LOCK_NAME = "jobs"
+
+
+def job(name: str):
+    """Register the decorated function as the handler for jobs called ``name``."""
+    def register(fn):
+        REGISTRY[name] = fn
+        return fn
+    return register
+
+
+class JobContext:
+    def __init__(self, job: Job):
+        self.job = job
+
+    def progress(self, percent: int, message: str = "") -> None:
+        """
+        Record progress (0-100) so the status endpoint can show it. Call it
+        outside the handler's own transactions: an update made inside one
+        is only visible once it commits.
+        """
+        percent = max(0, min(100, int(percent)))
+        Job.objects.filter(pk=self.job.pk).update(progress=percent, progress_message=message[:255])
+        self.job.progress, self.job.progress_message = percent, message[:255]
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+
+def enqueue(name: str, payload: Optional[dict] = None, run_at=None, user=None, max_attempts: int = 3) -> Job:
+    """Queue a job; raises ``KeyError`` for an unknown handler name."""
+    if name not in REGISTRY:
+        raise KeyError(f"No job handler registered for {name!r}")
+    created = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    if getattr(settings, "JOBS_EAGER", False):
+        created.status = Job.STATUS_RUNNING
+        created.attempts = 1
+        created.locked_by = "eager"
+        created.locked_at = timezone.now()
+        created.save(update_fields=["status", "attempts", "locked_by", "locked_at"])
+        run_job(created)
+    return created
+
+
+def claim_next(worker: str) -> Optional[Job]:
+    """Mark the next due job as running for ``worker`` and return it (None when idle)."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now).order_by("run_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            claimed = due.select_for_update(skip_locked=True).first()
+        else:
+            JobLock.objects.get_or_create(name=LOCK_NAME)
+            JobLock.objects.filter(name=LOCK_NAME).update(touched_at=now)
+            claimed = due.first()
+        if claimed is None:
+            return None
+        claimed.status = Job.STATUS_RUNNING
+        claimed.attempts += 1
+        claimed.locked_by = worker
+        claimed.locked_at = now
+        claimed.save(update_fields=["status", "attempts", "locked_by", "locked_at"])
+    return claimed
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=getattr(settings, "JOBS_RETRY_BACKOFF", 30) * 2 ** (attempts - 1))
+
+
+def run_job(claimed: Job) -> Job:
+    """Run a claimed job and store its outcome."""
+    handler = REGISTRY.get(claimed.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler registered for {claimed.name!r}")
+        result = handler(JobContext(claimed), **claimed.payload)
+    except Exception:
+        claimed.error = traceback.format_exc()
+        logger.exception("Job %s failed (attempt %s/%s)", claimed, claimed.attempts, claimed.max_attempts)
+        if handler is not None and claimed.attempts < claimed.max_attempts:
+            claimed.status = Job.STATUS_QUEUED
+            claimed.run_at = timezone.now() + _retry_delay(claimed.attempts)
+        else:
+            claimed.status = Job.STATUS_FAILED
+            claimed.finished_at = timezone.now()
+    else:
+        claimed.status = Job.STATUS_DONE
+        claimed.result = result
+        claimed.error = ""
+        claimed.progress = 100
+        claimed.finished_at = timezone.now()
+    claimed.locked_by = ""
+    claimed.save(update_fields=[
+        "status", "result", "error", "progress", "run_at", "finished_at", "locked_by",
+    ])
+    return claimed
+
+
+def requeue_stale(max_age: Optional[int] = None) -> int:
+    """
+    Treat jobs whose worker has held them longer than ``max_age`` seconds
+    as failed attempts, like ``run_job`` does: re-queue them with backoff,
+    or mark them failed once they have used ``max_attempts``. Returns the
+    number re-queued.
+    """
+    max_age = max_age or getattr(settings, "JOBS_STALE_AFTER", 3600)
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=now - timedelta(seconds=max_age))
+    requeued = 0
+    for stale_job in stale.only("id", "name", "attempts", "max_attempts", "locked_at"):
+        error = (f"Worker held the job for more than {max_age}s "
+                 f"(attempt {stale_job.attempts}/{stale_job.max_attempts})")
+        # Only if no worker finished or re-claimed it since it was read
+        held = Job.objects.filter(pk=stale_job.pk, status=Job.STATUS_RUNNING, locked_at=stale_job.locked_at)
+        if stale_job.attempts < stale_job.max_attempts:
+            requeued += held.update(status=Job.STATUS_QUEUED, run_at=now + _retry_delay(stale_job.attempts),
+                                    error=error, locked_by="", locked_at=None)
+        elif held.update(status=Job.STATUS_FAILED, finished_at=now, error=error, locked_by="", locked_at=None):
+            logger.error("Job %s failed: %s", stale_job, error)
+    return requeued
+
+
+def run_pending(worker: Optional[str] = None, limit: Optional[int] = None) -> int:
+    """Run due jobs until none are left (or ``limit`` ran). Returns the number run."""
+    worker = worker or worker_name()
+    ran = 0
+    while limit is None or ran < limit:
+        claimed = claim_next(worker)
+        if claimed is None:
+            break
+        run_job(claimed)
+        ran += 1
+    return ran
+
+
+def job_status(job_obj: Job) -> dict:
+    """JSON-ready view of a job for the status endpoint."""
+    return {
+        "id": job_obj.pk,
+        "name": job_obj.name,
+        "status": job_obj.status,
+        "progress": job_obj.progress,
+        "message": job_obj.progress_message,
+        "attempts": job_obj.attempts,
+        "result": job_obj.result,
+        "error": job_obj.error.strip().splitlines()[-1] if job_obj.error else "",
+        "created_at": job_obj.created_at.isoformat(),
+        "finished_at": job_obj.finished_at.isoformat() if job_obj.finished_at else None,
+    }
+
+
+# Handlers -----------------------------------------------------------------
+
+@job("timetable.generate")
+def generate_timetable(ctx: JobContext, session_id: int, engine: str = "greedy", seed: Optional[int] = None) -> dict:
+    from .models import Session
+    from .scheduling import generate_for_session
+
+    session = Session.objects.get(pk=session_id)
+    summary = generate_for_session(session, seed=seed, engine=engine, progress=ctx.progress)
+    summary["errors"] = summary["errors"][:50]
+    return summary
+
+
+@job("notifications.notify")
+def notify_recipients(ctx: JobContext, target: str, message: str, course_id: Optional[int] = None,
+                      ids=None, exclude_ids=None) -> dict:
+    from .notifications import notify, recipients_queryset
+
+    return {"notified": notify(recipients_queryset(target, course_id, ids, exclude_ids), message)}
+
+
+@job("maintenance.reset")
+def reset_maintenance(ctx: JobContext, action: str, session_id: Optional[int] = None,
+                      actor_id: Optional[int] = None) -> dict:
+    from .models import (
+        ExtraClassAvailability, ExtraClassRequest, ExtraClassSchedule, StaffUnavailability, TimetableAuditLog,
+    )
+
+    targets = {
+        "reset_unavailability": ["unavailability"],
+        "reset_extra_slots": ["extra_slots"],
+        "reset_extra_requests": ["extra_requests"],
+        "reset_extra_schedules": ["extra_schedules"],
+        "reset_all": ["unavailability", "extra_slots", "extra_requests", "extra_schedules"],
+    }[action]
+    models = {
+        "unavailability": StaffUnavailability,
+        "extra_slots": ExtraClassAvailability,
+        "extra_requests": ExtraClassRequest,
+        "extra_schedules": ExtraClassSchedule,
+    }
+    deleted = {}
+    ctx.progress(10, f"Resetting {', '.join(targets)}")
+    with transaction.atomic():
+        for key in targets:
+            qs = models[key].objects.all()
+            if session_id:
+                qs = qs.filter(session_id=session_id)
+            deleted[key], _ = qs.delete()
+        TimetableAuditLog.objects.create(
+            actor_id=actor_id, action="admin_reset", details=f"action={action} session={session_id or 'all'}",
+        )
+    return deleted
+
+
+@job("mcq.grade_inbox")
+def grade_submissions(ctx: JobContext, batch_size: int = 500) -> dict:
+    from .grading import grade_inbox
+
+    return grade_inbox(batch_size, progress=ctx.progress)
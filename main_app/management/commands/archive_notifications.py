@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main_app.notifications import archive_notifications
+
+
+class Command(BaseCommand):
+    help = "Move staff and student notifications older than the retention period to the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help="Archive notifications older than this many days "
+                                 "(default NOTIFICATION_RETENTION_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows moved per transaction.")
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        moved = archive_notifications(before, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            "Archived " + ", ".join(f"{n} {name}" for name, n in moved.items())
+            + f" created before {before:%Y-%m-%d}."
+        ))
@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.testcases import LiveServerThread, _StaticFilesHandler
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from main_app.benchmarks import submission_burst
+from main_app.grading import GRADE_JOB
+from main_app.jobs import run_pending
+from main_app.models import Job, MCQSubmission, MCQSubmissionInbox, MCQTest, Student
+from main_app.synthetic import InstitutionSpec, generate_institution
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate the end of an exam in a throwaway test database: every student opens and submits "
+        "the same MCQ test at once over HTTP against a live test server, then the queued grading "
+        "job runs. Prints ingestion latency, throughput and grading time as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=50, help="Concurrent client threads.")
+        parser.add_argument("--questions", type=int, default=20)
+        parser.add_argument("--duplicate-every", type=int, default=10,
+                            help="Every Nth student submits twice (0 disables).")
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        if options["students"] < 1 or options["workers"] < 1:
+            raise CommandError("--students and --workers must be at least 1")
+
+        # One log line per request would drown the report
+        logging.getLogger("main_app.request_metrics").setLevel(logging.ERROR)
+        setup_test_environment()
+        tmpdir = tempfile.mkdtemp()
+        if connection.vendor == "sqlite":
+            # Server threads need their own connections, which an in-memory database cannot share
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "benchmark.sqlite3")
+            connection.settings_dict["OPTIONS"]["timeout"] = 60
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0)
+        server = None
+        try:
+            generate_institution(InstitutionSpec(
+                courses=1, sections_per_course=4, staff=2, students=options["students"], subjects_per_course=1,
+                rooms=2, weeks=1, notifications_per_user=0, mcq_tests_per_subject=1,
+                questions_per_test=options["questions"], mcq_participation=0,
+            ))
+            test = MCQTest.objects.order_by("id").first()
+            students = list(Student.objects.filter(course__subjects=test.subject).select_related("admin"))
+
+            server = LiveServerThread("localhost", _StaticFilesHandler)
+            server.daemon = True
+            server.start()
+            server.is_ready.wait()
+            if server.error:
+                raise server.error
+            burst = submission_burst(f"http://localhost:{server.port}", test, students,
+                                     options["workers"], options["duplicate_every"])
+
+            # Run the grading job now instead of waiting for MCQ_GRADING_DELAY
+            queued_jobs = Job.objects.filter(name=GRADE_JOB).count()
+            Job.objects.filter(name=GRADE_JOB, status=Job.STATUS_QUEUED).update(run_at=timezone.now())
+            started = time.perf_counter()
+            run_pending()
+            report = {
+                "ingest": burst,
+                "grading": {
+                    "jobs_queued": queued_jobs,
+                    "seconds": round(time.perf_counter() - started, 2),
+                    "inbox_rows": MCQSubmissionInbox.objects.filter(test=test).count(),
+                    "submissions": MCQSubmission.objects.filter(test=test).count(),
+                    "ungraded": MCQSubmissionInbox.objects.filter(graded_at__isnull=True).count(),
+                },
+            }
+        finally:
+            if server is not None:
+                server.terminate()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
+        self.stdout.write(output)
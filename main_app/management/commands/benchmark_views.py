@@ -0,0 +1,52 @@
+import json
+import time
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from main_app.benchmarks import VIEWS, benchmark_views
+from main_app.synthetic import InstitutionSpec, generate_institution
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic institution in a throwaway test database, request the main views "
+        "through the test client and print latency percentiles and query counts as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--view", action="append", dest="views", choices=VIEWS,
+                            help="Only benchmark this view (repeatable)")
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+        for field in fields(InstitutionSpec):
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default),
+                                default=field.default)
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        spec = InstitutionSpec(**{field.name: options[field.name] for field in fields(InstitutionSpec)})
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            started = time.perf_counter()
+            dataset = generate_institution(spec)
+            dataset["generated_in_s"] = round(time.perf_counter() - started, 2)
+            report = {
+                "dataset": dataset,
+                "views": benchmark_views(options["iterations"], options["views"] or VIEWS),
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
+        self.stdout.write(output)
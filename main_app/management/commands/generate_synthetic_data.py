@@ -0,0 +1,20 @@
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand
+
+from main_app.synthetic import InstitutionSpec, generate_institution
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate a synthetic institution (reproducible with --seed) for load testing."
+
+    def add_arguments(self, parser):
+        for field in fields(InstitutionSpec):
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default),
+                                default=field.default, help=f"default: {field.default}")
+
+    def handle(self, *args, **options):
+        spec = InstitutionSpec(**{field.name: options[field.name] for field in fields(InstitutionSpec)})
+        counts = generate_institution(spec)
+        summary = ", ".join(f"{key}={value}" for key, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated synthetic data: {summary}"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main_app.attendance import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-student attendance counters from the attendance reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--student", type=int, action="append", dest="students",
+                            help="Only rebuild this student id (repeatable)")
+
+    def handle(self, *args, **options):
+        written = rebuild_summaries(options["students"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} attendance summary row(s)."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from main_app.dashboard import refresh_admin_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute the cached admin dashboard aggregates (run periodically, e.g. from cron)."
+
+    def handle(self, *args, **options):
+        data = refresh_admin_aggregates()
+        self.stdout.write(self.style.SUCCESS(
+            f"Dashboard refreshed: {data['total_students']} students, {data['total_subject']} subjects."
+        ))
@@ -0,0 +1,50 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main_app.jobs import requeue_stale, run_pending, worker_name
+
+logger = logging.getLogger("main_app.jobs")
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (timetable generation, notification fan-out, resets)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run the jobs that are due, then exit.")
+        parser.add_argument("--sleep", type=float, default=None,
+                            help="Seconds to wait when the queue is empty (default JOBS_POLL_INTERVAL).")
+        parser.add_argument("--max-jobs", type=int, default=None, help="Exit after running this many jobs.")
+
+    def handle(self, *args, **options):
+        sleep = options["sleep"] if options["sleep"] is not None else settings.JOBS_POLL_INTERVAL
+        remaining = options["max_jobs"]
+        worker = worker_name()
+        self.stdout.write(f"Worker {worker} started")
+        while remaining is None or remaining > 0:
+            # Drop connections that broke or outlived CONN_MAX_AGE, as Django does between requests
+            close_old_connections()
+            try:
+                requeued = requeue_stale()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale job(s)"))
+                ran = run_pending(worker, limit=remaining)
+            except Exception:
+                # A dropped connection or a lock timeout must not kill the worker
+                if options["once"]:
+                    raise
+                logger.exception("Worker %s: polling the job queue failed", worker)
+                close_old_connections()
+                time.sleep(sleep)
+                continue
+            if ran:
+                self.stdout.write(f"Ran {ran} job(s)")
+            if remaining is not None:
+                remaining -= ran
+            if options["once"]:
+                break
+            if not ran:
+                time.sleep(sleep)
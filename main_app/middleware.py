@@ -1,7 +1,17 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
 from django.utils.deprecation import MiddlewareMixin
 from django.urls import reverse
 from django.shortcuts import redirect
 
+from .request_metrics import QueryRecorder, RequestSample, store
+
+metrics_logger = logging.getLogger("main_app.request_metrics")
+
 
 class LoginCheckMiddleWare(MiddlewareMixin):
     def process_view(self, request, view_func, view_args, view_kwargs):
@@ -24,3 +34,63 @@ class LoginCheckMiddleWare(MiddlewareMixin):
                 pass
             else:
                 return redirect(reverse('login_page'))
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure every request: wall time, DB query count and time, duplicated
+    queries and response size. Each request is logged as one JSON line on
+    the ``main_app.request_metrics`` logger and added to the in-memory
+    window shown on the admin request metrics page. Requests slower than
+    ``REQUEST_METRICS_SLOW_MS`` are logged as warnings with their SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "REQUEST_METRICS_ENABLED", True)
+        self.slow_ms = getattr(settings, "REQUEST_METRICS_SLOW_MS", 500)
+        store.window = getattr(settings, "REQUEST_METRICS_WINDOW", 500)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        sample = RequestSample(
+            view=match.view_name if match and match.view_name else "unresolved",
+            method=request.method,
+            status=response.status_code,
+            duration_ms=duration_ms,
+            queries=recorder.count,
+            db_ms=recorder.db_ms,
+            duplicates=recorder.duplicates,
+            response_bytes=None if response.streaming else len(response.content),
+            at=time.time(),
+        )
+        store.record(sample)
+        self._log(request, sample, recorder)
+        return response
+
+    def _log(self, request, sample, recorder):
+        record = {
+            "view": sample.view,
+            "path": request.path,
+            "method": sample.method,
+            "status": sample.status,
+            "duration_ms": round(sample.duration_ms, 2),
+            "queries": sample.queries,
+            "db_ms": round(sample.db_ms, 2),
+            "duplicates": sample.duplicates,
+            "response_bytes": sample.response_bytes,
+        }
+        if sample.duration_ms >= self.slow_ms:
+            record["repeated"] = recorder.most_repeated()
+            record["sql"] = recorder.sql[:200]
+            metrics_logger.warning(json.dumps(record))
+        else:
+            metrics_logger.info(json.dumps(record))
@@ -0,0 +1,54 @@
+# Generated by Django 3.1.1 on 2026-10-18 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_summaries(apps, schema_editor):
+    # Same grouped query as attendance.rebuild_summaries, on the historical models
+    AttendanceReport = apps.get_model('main_app', 'AttendanceReport')
+    Summary = apps.get_model('main_app', 'StudentSubjectAttendanceSummary')
+    grouped = (
+        AttendanceReport.objects.values('student_id', 'attendance__subject_id', 'attendance__session_id')
+        .annotate(present=models.Count('id', filter=models.Q(status=True)), total=models.Count('id'))
+        .order_by()
+    )
+    Summary.objects.bulk_create([
+        Summary(
+            student_id=row['student_id'],
+            subject_id=row['attendance__subject_id'],
+            session_id=row['attendance__session_id'],
+            present=row['present'],
+            absent=row['total'] - row['present'],
+            total=row['total'],
+        )
+        for row in grouped.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0015_studentresult_components'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSubjectAttendanceSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main_app.session')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main_app.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main_app.subject')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='studentsubjectattendancesummary',
+            constraint=models.UniqueConstraint(fields=('student', 'subject', 'session'), name='uniq_attendance_summary'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.1.1 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0016_studentsubjectattendancesummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['subject', 'date'], name='attendance_subject_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancereport',
+            index=models.Index(fields=['student', 'status'], name='attreport_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mcqtest',
+            index=models.Index(fields=['is_active', 'scheduled_at'], name='mcqtest_active_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationstaff',
+            index=models.Index(fields=['staff', 'created_at'], name='notifstaff_staff_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationstudent',
+            index=models.Index(fields=['student', 'created_at'], name='notifstud_student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staffunavailability',
+            index=models.Index(fields=['staff', 'session', 'day'], name='unavail_staff_session_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetableentry',
+            index=models.Index(fields=['session', 'subject', 'section'], name='tt_session_subject_sec_idx'),
+        ),
+    ]
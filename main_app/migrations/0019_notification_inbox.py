@@ -0,0 +1,59 @@
+# Generated by Django 3.1.1 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0018_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='notificationstaff',
+            name='notifstaff_staff_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notificationstudent',
+            name='notifstud_student_created_idx',
+        ),
+        migrations.AddField(
+            model_name='notificationstaff',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationstudent',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notificationstaff',
+            index=models.Index(fields=['staff', 'created_at', 'id'], name='notifstaff_staff_ca_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationstudent',
+            index=models.Index(fields=['student', 'created_at', 'id'], name='notifstud_student_ca_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationarchive',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchive',
+            index=models.Index(fields=['user', 'created_at'], name='notifarch_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0019_notification_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mcqtest',
+            name='snapshot_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
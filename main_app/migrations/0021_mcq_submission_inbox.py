@@ -0,0 +1,33 @@
+# Generated by Django 3.1.1 on 2026-10-18 20:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0020_mcqtest_snapshot_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MCQSubmissionInbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('graded_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main_app.student')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main_app.mcqtest')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='mcqsubmissioninbox',
+            index=models.Index(fields=['graded_at', 'id'], name='mcqinbox_graded_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mcqsubmissioninbox',
+            constraint=models.UniqueConstraint(fields=('test', 'student'), name='uniq_test_student_inbox'),
+        ),
+    ]
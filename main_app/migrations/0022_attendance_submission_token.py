@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0021_mcq_submission_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='submission_token',
+            field=models.CharField(blank=True, editable=False, max_length=36, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.1 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+def backfill_unread(apps, schema_editor):
+    CustomUser = apps.get_model('main_app', 'CustomUser')
+    for model_name, field in (('NotificationStaff', 'staff'), ('NotificationStudent', 'student')):
+        model = apps.get_model('main_app', model_name)
+        unread = (
+            model.objects.filter(read_at__isnull=True).values(f'{field}__admin_id')
+            .annotate(n=models.Count('id')).order_by().values_list(f'{field}__admin_id', 'n')
+        )
+        for user_id, count in unread.iterator():
+            CustomUser.objects.filter(pk=user_id).update(unread_notifications=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0023_timetable_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread, migrations.RunPython.noop),
+    ]
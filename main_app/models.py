@@ -6,6 +6,7 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from datetime import datetime,timedelta
+from django.utils import timezone
 
 
 
@@ -52,6 +53,8 @@ class CustomUser(AbstractUser):
     profile_pic = models.ImageField()
     address = models.TextField()
     fcm_token = models.TextField(default="")  # For firebase notifications
+    # Unread staff/student notifications, kept in step by main_app.notifications
+    unread_notifications = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     USERNAME_FIELD = "email"
@@ -161,9 +164,17 @@ class Attendance(models.Model):
     session = models.ForeignKey(Session, on_delete=models.DO_NOTHING)
     subject = models.ForeignKey(Subject, on_delete=models.DO_NOTHING)
     date = models.DateField()
+    # Sent by the take-attendance form; a repeated post with the same token
+    # updates this row instead of recording the class twice
+    submission_token = models.CharField(max_length=36, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["subject", "date"], name="attendance_subject_date_idx"),
+        ]
+
 
 class AttendanceReport(models.Model):
     student = models.ForeignKey(Student, on_delete=models.DO_NOTHING)
@@ -172,6 +183,38 @@ class AttendanceReport(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "status"], name="attreport_student_status_idx"),
+        ]
+
+
+class StudentSubjectAttendanceSummary(models.Model):
+    """Running attendance counters per student, subject and session.
+
+    Kept in step by ``attendance.py`` whenever attendance is saved,
+    updated or deleted; rebuild with ``manage.py rebuild_attendance_summary``.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    session = models.ForeignKey(Session, on_delete=models.CASCADE)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject", "session"],
+                name="uniq_attendance_summary",
+            ),
+        ]
+
+    @property
+    def percent_present(self):
+        return self.present * 100 // self.total if self.total else 0
+
 
 class LeaveReportStudent(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -213,6 +256,13 @@ class NotificationStaff(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Serves the inbox's keyset pagination on (created_at, id)
+            models.Index(fields=["staff", "created_at", "id"], name="notifstaff_staff_ca_id_idx"),
+        ]
 
 
 class NotificationStudent(models.Model):
@@ -220,6 +270,26 @@ class NotificationStudent(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Serves the inbox's keyset pagination on (created_at, id)
+            models.Index(fields=["student", "created_at", "id"], name="notifstud_student_ca_id_idx"),
+        ]
+
+
+class NotificationArchive(models.Model):
+    """Old staff/student notifications moved out of the inbox tables by ``archive_notifications``."""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="notifarch_user_created_idx"),
+        ]
 
 
 class StudentResult(models.Model):
@@ -306,6 +376,10 @@ class TimetableEntry(models.Model):
                 name="uniq_section_slot",
             ),
         ]
+        indexes = [
+            # Credits and per-day checks, audit coverage
+            models.Index(fields=["session", "subject", "section"], name="tt_session_subject_sec_idx"),
+        ]
 
     SLOT_LABELS = {
         1: "9-10",
@@ -326,270 +400,33 @@ class TimetableEntry(models.Model):
         kind = " [Lab]" if self.is_lab else ""
         return f"{self.get_day_display()} {label}{span}: {self.course} - {self.subject} ({self.room}){kind}"
 
-    def _find_free_room_for(self, day: str, start_period: int, duration: int):
-        """Return a free room for the given day/period span or None."""
-        try:
-            from .models import Room, TimetableEntry
-            for room in Room.objects.all():
-                clash = False
-                for p in range(int(start_period), int(start_period) + int(duration)):
-                    if TimetableEntry.objects.filter(
-                        session_id=self.session_id,
-                        day=day,
-                        period_number=p,
-                        room_id=room.id,
-                    ).exists():
-                        clash = True
-                        break
-                if not clash:
-                    return room
-        except Exception:
-            return None
-        return None
+    def suggest_alternatives(self, limit: int = 5):
+        """Ranked free slots for this entry as dicts (day, period, room_id, score, ...)."""
+        from .scheduling import SessionSnapshot
+        return SessionSnapshot(self.session_id).free_slots.suggest(self, limit=limit)
 
     def _suggest_alternatives_message(self, limit: int = 5) -> str:
         """Suggest alternative day/period slots where staff, section/course, and room are free."""
-        try:
-            suggestions = []
-            duration = int(self.duration_periods or 1)
-            days = [c[0] for c in self.DAY_CHOICES]
-            from .models import TimetableEntry, StaffUnavailability
-            for day in days:
-                max_start = 6 - duration + 1
-                for start_p in range(1, max_start + 1):
-                    end_p = start_p + duration - 1
-                    # Skip original requested slot to avoid echoing the conflict
-                    if day == self.day and start_p == int(self.period_number):
-                        continue
-                    # Staff unavailability check
-                    unavail = StaffUnavailability.objects.filter(
-                        staff_id=self.staff_id,
-                        session_id=self.session_id,
-                        day=day,
-                    )
-                    unavailable_here = False
-                    for ua in unavail:
-                        covered = set(range(ua.period_number, ua.period_number + int(ua.duration_periods)))
-                        if set(range(start_p, end_p + 1)) & covered:
-                            unavailable_here = True
-                            break
-                    if unavailable_here:
-                        continue
-                    # Staff/section/course conflict check across spanned periods
-                    staff_ok = True
-                    section_ok = True
-                    course_ok = True
-                    for p in range(start_p, end_p + 1):
-                        if TimetableEntry.objects.filter(
-                            session_id=self.session_id,
-                            day=day,
-                            period_number=p,
-                            staff_id=self.staff_id,
-                        ).exists():
-                            staff_ok = False
-                            break
-                        if self.section_id and TimetableEntry.objects.filter(
-                            session_id=self.session_id,
-                            day=day,
-                            period_number=p,
-                            section_id=self.section_id,
-                        ).exists():
-                            section_ok = False
-                            break
-                        if TimetableEntry.objects.filter(
-                            session_id=self.session_id,
-                            day=day,
-                            period_number=p,
-                            course_id=self.course_id,
-                        ).exists():
-                            course_ok = False
-                            break
-                    if not (staff_ok and section_ok and course_ok):
-                        continue
-                    # Room availability
-                    room = self._find_free_room_for(day, start_p, duration)
-                    if room is None:
-                        continue
-                    suggestions.append(f"{day} P{start_p}")
-                    if len(suggestions) >= limit:
-                        break
-                if len(suggestions) >= limit:
-                    break
-            if suggestions:
-                return "Suggested alternatives: " + ", ".join(suggestions)
-        except Exception:
-            pass
-        return "No suitable alternative slots found in this week."
+        from .scheduling import format_suggestions
+        return format_suggestions(self.suggest_alternatives(limit=limit))
 
     def clean(self):
-        # Ensure subject belongs to course and staff teaches subject
-        if not self.subject.courses.filter(id=self.course_id).exists():
-            raise ValidationError("Subject is not offered for the selected course")
-        # Validate section association if provided
-        if self.section_id:
-            if self.section.course_id != self.course_id:
-                raise ValidationError("Selected section does not belong to the chosen course")
-            if not self.subject.sections.filter(id=self.section_id).exists():
-                raise ValidationError("Subject is not offered for the selected section")
-        if self.subject.staff_id != self.staff_id:
-            raise ValidationError("Selected staff is not assigned to the subject")
-
-        # Period range and duration validations
-        if not (1 <= int(self.period_number) <= 6):
-            raise ValidationError("period_number must be between 1 and 6")
+        # Subject/course/section/staff consistency, period range, staff
+        # unavailability, weekly credits, one class per subject per day,
+        # staff/room/section clashes and no consecutive periods for a subject.
+        # Checked against a preloaded snapshot of the session; see
+        # scheduling.validate_entries for batches.
+        from .scheduling import validate_entries
+        errors = validate_entries(self.session_id, [self])[0]
+        if errors:
+            raise ValidationError(errors[0]["message"])
 
-        if int(self.duration_periods) < 1:
-            raise ValidationError("duration_periods must be at least 1")
 
-        if self.is_lab and int(self.duration_periods) != 2:
-            raise ValidationError("Lab sessions must span exactly 2 consecutive periods")
+class TimetableVersion(models.Model):
+    """Single row counting timetable changes; cached timetable grids are keyed on it."""
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
 
-        end_period = int(self.period_number) + int(self.duration_periods) - 1
-        if end_period > 6:
-            raise ValidationError("Session extends beyond the last available period")
-
-        # Block if staff marked unavailable for this weekly slot (day + period span)
-        try:
-            from .models import StaffUnavailability
-            unav_qs = StaffUnavailability.objects.filter(
-                staff_id=self.staff_id,
-                session_id=self.session_id,
-                day=self.day,
-            )
-            for ua in unav_qs:
-                covered = set(range(ua.period_number, ua.period_number + int(ua.duration_periods)))
-                if set(range(int(self.period_number), end_period + 1)) & covered:
-                    raise ValidationError(
-                        "Teacher is marked unavailable in the selected time range. "
-                        + self._suggest_alternatives_message()
-                    )
-        except ValidationError:
-            raise
-        except Exception:
-            # Non-fatal: keep scheduling if unavailability lookup fails
-            pass
-
-        # If this slot originates from a published extra slot due to unavailability,
-        # relax certain per-day subject restrictions to allow make-up/extra classes.
-        try:
-            extra_slot_exists = ExtraClassAvailability.objects.filter(
-                session_id=self.session_id,
-                day=self.day,
-                period_number=self.period_number,
-                course_id=self.course_id,
-            ).exists()
-        except Exception:
-            extra_slot_exists = False
-
-        # Enforce weekly credits cap per subject-section (or per subject-course when no section)
-        credits = int(getattr(self.subject, "credits", 0) or 0)
-        if credits > 0:
-            existing_qs = TimetableEntry.objects.filter(
-                session_id=self.session_id,
-                subject_id=self.subject_id,
-            )
-            if self.section_id:
-                existing_qs = existing_qs.filter(section_id=self.section_id)
-            else:
-                existing_qs = existing_qs.filter(course_id=self.course_id, section__isnull=True)
-            # Exclude self for updates
-            existing_qs = existing_qs.exclude(pk=self.pk)
-            if existing_qs.count() >= credits:
-                raise ValidationError(
-                    "Weekly credits limit reached for this subject"
-                    + ("/section" if self.section_id else "")
-                )
-
-        # Prevent scheduling same subject more than once per section/day (or course/day when no section),
-        # except when filling an ExtraClassAvailability slot (make-up/extra class).
-        if not extra_slot_exists:
-            per_day_qs = TimetableEntry.objects.filter(
-                session_id=self.session_id,
-                day=self.day,
-                subject_id=self.subject_id,
-            )
-            if self.section_id:
-                per_day_qs = per_day_qs.filter(section_id=self.section_id)
-            else:
-                per_day_qs = per_day_qs.filter(course_id=self.course_id, section__isnull=True)
-            if per_day_qs.exclude(pk=self.pk).exists():
-                raise ValidationError(
-                    "Subject already scheduled for this section on the selected day"
-                    if self.section_id
-                    else "Subject already scheduled for this course on the selected day"
-                )
-
-        # Prevent conflicts across spanned periods for staff, room, and section (or course when no section)
-            for p in range(int(self.period_number), end_period + 1):
-                if TimetableEntry.objects.filter(
-                    session_id=self.session_id,
-                    day=self.day,
-                    period_number=p,
-                    staff_id=self.staff_id,
-                ).exclude(pk=self.pk).exists():
-                    raise ValidationError(
-                        "Teacher has another class in the selected time range. "
-                        + self._suggest_alternatives_message()
-                    )
-
-                if TimetableEntry.objects.filter(
-                    session_id=self.session_id,
-                    day=self.day,
-                    period_number=p,
-                    room_id=self.room_id,
-                ).exclude(pk=self.pk).exists():
-                    raise ValidationError(
-                        "Room is occupied in the selected time range. "
-                        + self._suggest_alternatives_message()
-                    )
-
-                section_or_course_qs = TimetableEntry.objects.filter(
-                    session_id=self.session_id,
-                    day=self.day,
-                    period_number=p,
-                )
-                if self.section_id:
-                    section_or_course_qs = section_or_course_qs.filter(section_id=self.section_id)
-                else:
-                    section_or_course_qs = section_or_course_qs.filter(course_id=self.course_id, section__isnull=True)
-                if section_or_course_qs.exclude(pk=self.pk).exists():
-                    raise ValidationError(
-                        (
-                            "Section already has another class in the selected time range. "
-                            if self.section_id
-                            else "Course already has another class in the selected time range. "
-                        )
-                        + self._suggest_alternatives_message()
-                    )
-
-        # No consecutive classes for the same subject (ensure a gap)
-        # Disallow immediately adjacent periods before or after this entry's spanned range
-        adjacent_periods = []
-        start_p = int(self.period_number)
-        end_p = int(end_period)
-        if start_p - 1 >= 1:
-            adjacent_periods.append(start_p - 1)
-        if end_p + 1 <= 6:
-            adjacent_periods.append(end_p + 1)
-        if adjacent_periods:
-            # Skip adjacency restriction when filling an ExtraClassAvailability slot
-            if not extra_slot_exists:
-                adjacent_qs = TimetableEntry.objects.filter(
-                    session_id=self.session_id,
-                    day=self.day,
-                    subject_id=self.subject_id,
-                    period_number__in=adjacent_periods,
-                )
-                if self.section_id:
-                    adjacent_qs = adjacent_qs.filter(section_id=self.section_id)
-                else:
-                    adjacent_qs = adjacent_qs.filter(course_id=self.course_id, section__isnull=True)
-                if adjacent_qs.exclude(pk=self.pk).exists():
-                    raise ValidationError("No consecutive periods allowed for the same subject")
-
-        # Weekly credits policy: enforce based on class count (not duration)
-        # This aligns with the requirement "3 credits => 3 classes per week".
-        # A separate cap above already blocks any attempt beyond credits.
 
 class ExtraClassSchedule(models.Model):
     STATUS_CHOICES = [
@@ -723,6 +560,11 @@ class StaffUnavailability(models.Model):
     exception_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["staff", "session", "day"], name="unavail_staff_session_day_idx"),
+        ]
+
     def __str__(self):
         return f"{self.staff} unavailable {self.day} P{self.period_number} ({self.duration_periods}p)"
 
@@ -817,9 +659,16 @@ class MCQTest(models.Model):
     is_active = models.BooleanField(default=True)
     # When set, the test becomes available to students at/after this time
     scheduled_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every edit; names the cached question/answer-key snapshot (see grading.py)
+    snapshot_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["is_active", "scheduled_at"], name="mcqtest_active_sched_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.subject.name}"
 
@@ -864,6 +713,27 @@ class MCQAnswer(models.Model):
         ]
 
 
+class MCQSubmissionInbox(models.Model):
+    """
+    Raw answers as posted when a test is submitted, graded later in batches.
+    One row per (test, student) acts as the idempotency key: repeated posts
+    are dropped on insert.
+    """
+    test = models.ForeignKey(MCQTest, on_delete=models.CASCADE)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    answers = models.JSONField()  # {"q_<question id>": "<option id>"}
+    received_at = models.DateTimeField(auto_now_add=True)
+    graded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["test", "student"], name="uniq_test_student_inbox"),
+        ]
+        indexes = [
+            models.Index(fields=["graded_at", "id"], name="mcqinbox_graded_id_idx"),
+        ]
+
+
 # Proctor and Fee Payment models
 
 class ProctorAssignment(models.Model):
@@ -914,3 +784,49 @@ class FeePayment(models.Model):
 
     def __str__(self):
         return f"{self.student} - {self.session} ({self.status})"
+
+
+# Background jobs
+
+class Job(models.Model):
+    """Unit of background work, run by ``manage.py run_worker`` (see ``jobs.py``)."""
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    progress = models.PositiveSmallIntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class JobLock(models.Model):
+    """Single-row lock serialising job claims on databases without SKIP LOCKED (SQLite)."""
+    name = models.CharField(max_length=32, unique=True)
+    touched_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,235 @@
+"""
+Fan-out notifications for staff and students.
+
+``notify`` stores one ``NotificationStaff``/``NotificationStudent`` row per
+recipient with a single ``bulk_create`` per recipient type and hands the
+push messages to the background ``PushSender`` once the surrounding
+transaction commits, so the request never waits on FCM.
+
+The inbox pages read a user's notifications newest first with keyset
+pagination on ``(created_at, id)``, so a page costs the same however many
+rows the user has. Each user's unread count is kept on
+``CustomUser.unread_notifications``: ``notify``, ``mark_read`` and
+``archive_notifications`` adjust it in the transaction that changes the
+rows, so the badge costs no query and is right in every process.
+``recount_unread`` rebuilds it from the inbox tables.
+``archive_notifications`` moves old rows to ``NotificationArchive``.
+"""
+import base64
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet
+from django.db.models.functions import Greatest
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CustomUser, NotificationArchive, NotificationStaff, NotificationStudent, Staff, Student
+from .push import get_sender
+
+# Recipient model -> (notification model, its FK field, page the push opens)
+_TARGETS = {
+    Staff: (NotificationStaff, "staff_id", "staff_view_notification"),
+    Student: (NotificationStudent, "student_id", "student_view_notification"),
+}
+
+# user_type -> (notification model, FK to the recipient)
+_INBOXES = {
+    "2": (NotificationStaff, "staff"),
+    "3": (NotificationStudent, "student"),
+}
+
+
+def _add_unread(changes: Dict[int, int]) -> None:
+    """Add ``{user_id: change}`` to the users' unread counters, never going below zero."""
+    users_by_change = defaultdict(list)
+    for user_id, change in changes.items():
+        if change:
+            users_by_change[change].append(user_id)
+    for change, user_ids in users_by_change.items():
+        CustomUser.objects.filter(pk__in=user_ids).update(
+            unread_notifications=Greatest(F("unread_notifications") + change, 0)
+        )
+
+
+def recount_unread(user_ids: Iterable[int] = None) -> int:
+    """
+    Recompute the unread counters from the inbox tables with one grouped
+    query per table (optionally only for ``user_ids``). Returns the number
+    of users updated.
+    """
+    users = CustomUser.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        users = users.filter(pk__in=user_ids)
+    counts = Counter()
+    for model, field in _INBOXES.values():
+        unread = model.objects.filter(read_at__isnull=True)
+        if user_ids is not None:
+            unread = unread.filter(**{f"{field}__admin_id__in": user_ids})
+        counts.update(dict(
+            unread.values(f"{field}__admin_id").annotate(n=Count("id")).order_by()
+            .values_list(f"{field}__admin_id", "n")
+        ))
+    with transaction.atomic():
+        updated = users.exclude(pk__in=list(counts)).update(unread_notifications=0)
+        users_by_count = defaultdict(list)
+        for user_id, count in counts.items():
+            users_by_count[count].append(user_id)
+        for count, ids in users_by_count.items():
+            updated += CustomUser.objects.filter(pk__in=ids).update(unread_notifications=count)
+    return updated
+
+
+def queue_push(tokens: List[str], message: str, click_action: str) -> None:
+    """Hand the pushes to the background sender after the current transaction commits."""
+    if tokens:
+        transaction.on_commit(lambda: get_sender().send(
+            tokens, message, click_action, icon=static("dist/img/AdminLTELogo.png")
+        ))
+
+
+def notify(recipients: Union[QuerySet, Iterable[Union[Staff, Student]]], message: str) -> int:
+    """
+    Notify ``recipients`` (a ``Staff``/``Student`` queryset, or any iterable
+    of such instances, possibly mixed) with ``message``. Returns the number
+    of notification rows written. The recipients' FCM tokens are read in the
+    same query as their ids, so the cost does not depend on their number.
+    """
+    if isinstance(recipients, QuerySet):
+        selections = {recipients.model: recipients}
+    else:
+        ids = {}
+        for recipient in recipients:
+            if recipient is not None:
+                ids.setdefault(type(recipient), []).append(recipient.pk)
+        selections = {model: model.objects.filter(pk__in=pks) for model, pks in ids.items()}
+
+    written = 0
+    for model, queryset in selections.items():
+        notification_model, field, page = _TARGETS[model]
+        rows = list(queryset.order_by().values_list("id", "admin_id", "admin__fcm_token"))
+        with transaction.atomic():
+            notification_model.objects.bulk_create(
+                [notification_model(**{field: pk}, message=message) for pk, _, _ in rows], batch_size=500
+            )
+            CustomUser.objects.filter(pk__in=[user_id for _, user_id, _ in rows]).update(
+                unread_notifications=F("unread_notifications") + 1
+            )
+        written += len(rows)
+        queue_push([token for _, _, token in rows if token], message, reverse(page))
+    return written
+
+
+def recipients_queryset(target: str, course_id: Optional[int] = None, ids=None, exclude_ids=None) -> QuerySet:
+    """``Staff``/``Student`` (``target`` "staff" or "student") filtered by course, ids and exclusions."""
+    model = {"staff": Staff, "student": Student}[target]
+    queryset = model.objects.all()
+    if course_id is not None:
+        queryset = queryset.filter(course_id=course_id)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if exclude_ids:
+        queryset = queryset.exclude(pk__in=[pk for pk in exclude_ids if pk is not None])
+    return queryset
+
+
+def notify_later(target: str, message: str, course_id: Optional[int] = None, ids=None, exclude_ids=None,
+                 user=None):
+    """
+    Queue a ``notify`` for a whole course (or an id list) as a background
+    job, for fan-outs large enough to be felt by the request. Returns the job.
+    """
+    from .jobs import enqueue
+
+    return enqueue("notifications.notify", {
+        "target": target,
+        "message": message,
+        "course_id": course_id,
+        "ids": list(ids) if ids is not None else None,
+        "exclude_ids": list(exclude_ids) if exclude_ids else None,
+    }, user=user)
+
+
+def unread_count(user) -> int:
+    """Unread notifications of a staff or student ``user`` (0 for anyone else), from its counter."""
+    if str(user.user_type) not in _INBOXES:
+        return 0
+    return user.unread_notifications
+
+
+def encode_cursor(notification) -> str:
+    raw = f"{notification.created_at.isoformat()}|{notification.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple]:
+    """``(created_at, id)`` from ``encode_cursor``, or None when missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        created_at = parse_datetime(created_at)
+        return (created_at, int(pk)) if created_at else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def inbox_page(queryset: QuerySet, cursor: Optional[str] = None, per_page: int = 25) -> Tuple[list, Optional[str]]:
+    """
+    One page of ``queryset`` newest first, starting after ``cursor``.
+    Returns the rows and the cursor of the next (older) page, or None on
+    the last page.
+    """
+    queryset = queryset.order_by("-created_at", "-id")
+    after = decode_cursor(cursor)
+    if after:
+        created_at, pk = after
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    rows = list(queryset[:per_page + 1])
+    if len(rows) > per_page:
+        return rows[:per_page], encode_cursor(rows[per_page - 1])
+    return rows, None
+
+
+def mark_read(queryset: QuerySet, user_id: int, ids=None) -> int:
+    """Mark ``user_id``'s unread notifications in ``queryset`` (or only ``ids``) as read."""
+    queryset = queryset.filter(read_at__isnull=True)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    with transaction.atomic():
+        marked = queryset.update(read_at=timezone.now())
+        _add_unread({user_id: -marked})
+    return marked
+
+
+def archive_notifications(before, batch_size: int = 1000) -> dict:
+    """
+    Move staff and student notifications created before ``before`` to
+    ``NotificationArchive``, ``batch_size`` rows per transaction. Returns
+    the number of rows moved per table.
+    """
+    moved = {}
+    for model, field in _INBOXES.values():
+        moved[model.__name__] = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    model.objects.select_for_update(of=("self",)).filter(created_at__lt=before).order_by("id")
+                    .values_list("id", f"{field}__admin_id", "message", "created_at", "read_at")[:batch_size]
+                )
+                if not rows:
+                    break
+                NotificationArchive.objects.bulk_create([
+                    NotificationArchive(user_id=user_id, message=message, created_at=created_at, read_at=read_at)
+                    for _, user_id, message, created_at, read_at in rows
+                ], batch_size=500)
+                model.objects.filter(id__in=[row[0] for row in rows]).delete()
+                unread = Counter(user_id for _, user_id, _, _, read_at in rows if read_at is None)
+                _add_unread({user_id: -count for user_id, count in unread.items()})
+            moved[model.__name__] += len(rows)
+    return moved
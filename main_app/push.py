@@ -0,0 +1,146 @@
+"""
+FCM push delivery off the request path.
+
+``PushSender`` keeps one ``requests.Session`` (a pooled keep-alive
+connection to FCM) and a bounded queue drained by a few daemon threads.
+``send`` splits the device tokens into batches of ``batch_size`` (one FCM
+call per batch via ``registration_ids``) and only enqueues them: it never
+blocks the caller, and drops the batch with a warning when the queue is
+full. Each call has a connect/read timeout, and connection errors, 429 and
+5xx responses are retried with exponential backoff.
+
+The module-level sender is built lazily from the ``FCM_*`` settings by
+``get_sender``.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PushSender:
+    def __init__(self, url: str, server_key: str, timeout=(3.05, 10), batch_size: int = 500,
+                 max_retries: int = 3, backoff: float = 0.5, queue_size: int = 1000, workers: int = 2,
+                 session: Optional[requests.Session] = None):
+        self.url = url
+        self.server_key = server_key
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.workers = workers
+        self.session = session or self._make_session(workers)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.sent = self.failed = self.dropped = 0
+
+    def _count(self, field: str, n: int) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    @staticmethod
+    def _make_session(workers: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _start(self) -> None:
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for n in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"push-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def send(self, tokens: Sequence[str], message: str, click_action: str = "", icon: str = "",
+             title: str = "Student Management System") -> int:
+        """Queue ``message`` for ``tokens``; returns the number of batches queued."""
+        tokens = [token for token in tokens if token]
+        if not tokens:
+            return 0
+        self._start()
+        notification = {"title": title, "body": message, "click_action": click_action, "icon": icon}
+        queued = 0
+        for start in range(0, len(tokens), self.batch_size):
+            batch = tokens[start:start + self.batch_size]
+            try:
+                self._queue.put_nowait((batch, notification))
+                queued += 1
+            except queue.Full:
+                self._count("dropped", len(batch))
+                logger.warning("Push queue full, dropped %s device(s)", len(batch))
+        return queued
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued batch has been handled (for tests and shutdown)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            batch, notification = self._queue.get()
+            try:
+                self.deliver(batch, notification)
+            except Exception:
+                logger.exception("Push delivery crashed")
+            finally:
+                self._queue.task_done()
+
+    def deliver(self, tokens: List[str], notification: dict) -> bool:
+        """Send one batch synchronously, retrying transient failures."""
+        body = {"notification": notification, "registration_ids": tokens}
+        headers = {"Authorization": f"key={self.server_key}", "Content-Type": "application/json"}
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, json=body, headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    ok = response.status_code < 400
+                    self._count("sent" if ok else "failed", len(tokens))
+                    if not ok:
+                        logger.warning("FCM rejected push (%s): %s", response.status_code, response.text[:200])
+                    return ok
+                reason = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                reason = str(e)
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt))
+        self._count("failed", len(tokens))
+        logger.warning("Push to %s device(s) failed after %s attempts: %s", len(tokens), self.max_retries + 1, reason)
+        return False
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_sender() -> PushSender:
+    """Process-wide sender configured from settings."""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = PushSender(
+                url=settings.FCM_URL,
+                server_key=settings.FCM_SERVER_KEY,
+                timeout=(settings.FCM_CONNECT_TIMEOUT, settings.FCM_READ_TIMEOUT),
+                batch_size=settings.FCM_BATCH_SIZE,
+                max_retries=settings.FCM_MAX_RETRIES,
+                queue_size=settings.FCM_QUEUE_SIZE,
+                workers=settings.NOTIFICATION_PUSH_WORKERS,
+            )
+        return _sender
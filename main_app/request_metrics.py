@@ -0,0 +1,115 @@
+"""
+In-process request metrics collected by ``RequestMetricsMiddleware``.
+
+Each request produces one sample: wall time, number of DB queries, time
+spent in the DB, duplicated queries (the same SQL run more than once in a
+request, the usual sign of an N+1 loop) and response size. Samples are kept
+per view name in a bounded deque, so memory stays flat and the summary
+always describes the most recent ``REQUEST_METRICS_WINDOW`` requests of each
+view. The store lives in the worker process; with several workers each one
+reports its own window.
+"""
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, NamedTuple, Optional
+
+
+class RequestSample(NamedTuple):
+    view: str
+    method: str
+    status: int
+    duration_ms: float
+    queries: int
+    db_ms: float
+    duplicates: int
+    response_bytes: Optional[int]
+    at: float
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` callable that times and remembers each query."""
+
+    def __init__(self, keep_sql: bool = True):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.db_ms = 0.0
+        self.sql: List[str] = []
+        self._templates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.db_ms += elapsed
+            self._templates[sql] += 1
+            if self.keep_sql:
+                self.sql.append(f"{elapsed:.2f}ms {sql}")
+
+    @property
+    def duplicates(self) -> int:
+        """Queries whose SQL (ignoring parameters) already ran earlier in the request."""
+        return sum(n - 1 for n in self._templates.values() if n > 1)
+
+    def most_repeated(self, limit: int = 5) -> List[dict]:
+        return [
+            {"sql": sql, "count": n}
+            for sql, n in self._templates.most_common(limit) if n > 1
+        ]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * pct // 100) - 1)  # nearest rank
+    return ordered[int(index)]
+
+
+class MetricsStore:
+    """Thread-safe rolling window of ``RequestSample`` per view."""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, sample: RequestSample) -> None:
+        with self._lock:
+            samples = self._samples.get(sample.view)
+            if samples is None or samples.maxlen != self.window:
+                samples = self._samples[sample.view] = deque(samples or (), maxlen=self.window)
+            samples.append(sample)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self) -> List[dict]:
+        """Per-view latency percentiles and averages, slowest p95 first."""
+        with self._lock:
+            snapshot = {view: list(samples) for view, samples in self._samples.items()}
+        rows = []
+        for view, samples in snapshot.items():
+            durations = [s.duration_ms for s in samples]
+            sizes = [s.response_bytes for s in samples if s.response_bytes is not None]
+            rows.append({
+                "view": view,
+                "count": len(samples),
+                "p50_ms": round(_percentile(durations, 50), 2),
+                "p95_ms": round(_percentile(durations, 95), 2),
+                "p99_ms": round(_percentile(durations, 99), 2),
+                "max_ms": round(max(durations), 2),
+                "avg_queries": round(sum(s.queries for s in samples) / len(samples), 1),
+                "max_queries": max(s.queries for s in samples),
+                "avg_db_ms": round(sum(s.db_ms for s in samples) / len(samples), 2),
+                "avg_duplicates": round(sum(s.duplicates for s in samples) / len(samples), 1),
+                "avg_kb": round(sum(sizes) / len(sizes) / 1024, 1) if sizes else None,
+                "errors": sum(1 for s in samples if s.status >= 500),
+            })
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows
+
+
+store = MetricsStore()
@@ -0,0 +1,219 @@
+"""
+Vectorized results for ``StudentResult``.
+
+``grade_sheet`` loads every result of a (subject, session) or of a whole
+course with one query into a students x components NumPy array and
+computes, for all rows at once, the weighted total and percentage, grade
+and grade point, pass/fail, and the rank within the subject. Per-subject
+class statistics (mean, standard deviation, range, pass rate and
+component averages) come from grouped ``bincount`` sums, so a course-wide
+sheet costs the same passes as a single subject.
+
+Component maximums and weights, grade boundaries and pass rules are read
+from the ``RESULT_*`` settings. ``sheet_rows`` yields the sheet as plain
+rows, which ``csv_response`` streams and ``xlsx_response`` writes with
+openpyxl when it is installed.
+"""
+import csv
+from io import BytesIO
+from typing import Iterator
+
+import numpy as np
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.text import slugify
+
+from .models import StudentResult
+
+COMPONENTS = ("test1", "test2", "quiz", "experiential", "see")
+COMPONENT_LABELS = ("Test 1", "Test 2", "Quiz", "Experiential", "SEE")
+
+DEFAULT_MAX_MARKS = {"test1": 40, "test2": 40, "quiz": 20, "experiential": 20, "see": 60}
+# (minimum percentage, grade, grade point), highest first; anything below is "F"
+DEFAULT_GRADES = [(90, "O", 10), (80, "A+", 9), (70, "A", 8), (60, "B+", 7), (55, "B", 6), (50, "C", 5), (40, "P", 4)]
+
+HEADER = ["Student", "Email", "Section", "Subject", *COMPONENT_LABELS, "Total", "Percent", "Grade",
+          "Grade Point", "Result", "Rank"]
+
+
+def _config():
+    max_marks = dict(DEFAULT_MAX_MARKS, **getattr(settings, "RESULT_MAX_MARKS", {}))
+    weights = dict.fromkeys(COMPONENTS, 1.0)
+    weights.update(getattr(settings, "RESULT_WEIGHTS", {}))
+    grades = sorted(getattr(settings, "RESULT_GRADES", DEFAULT_GRADES))
+    return {
+        "max_marks": np.array([max_marks[c] for c in COMPONENTS], dtype=float),
+        "weights": np.array([weights[c] for c in COMPONENTS], dtype=float),
+        "thresholds": np.array([g[0] for g in grades], dtype=float),
+        "letters": np.array(["F"] + [g[1] for g in grades]),
+        "points": np.array([0] + [g[2] for g in grades], dtype=float),
+        "pass_percent": float(getattr(settings, "RESULT_PASS_PERCENT", 40)),
+        "min_see_percent": float(getattr(settings, "RESULT_MIN_SEE_PERCENT", 35)),
+    }
+
+
+def subject_results(subject_id: int, session_id: int) -> QuerySet:
+    return StudentResult.objects.filter(subject_id=subject_id, student__session_id=session_id)
+
+
+def course_results(course_id: int, session_id=None) -> QuerySet:
+    queryset = StudentResult.objects.filter(student__course_id=course_id)
+    if session_id:
+        queryset = queryset.filter(student__session_id=session_id)
+    return queryset
+
+
+def _group_ranks(groups: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    """Competition rank (1, 2, 2, 4) of each total within its group, highest first."""
+    n = len(totals)
+    if not n:
+        return np.zeros(0, dtype=np.int64)
+    order = np.lexsort((-totals, groups))
+    g, t = groups[order], totals[order]
+    positions = np.arange(n)
+    new_group = np.r_[True, g[1:] != g[:-1]]
+    new_run = new_group | np.r_[True, t[1:] != t[:-1]]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    run_start = np.maximum.accumulate(np.where(new_run, positions, 0))
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = run_start - group_start + 1
+    return ranks
+
+
+def _round(values, digits=2):
+    return np.round(values.astype(float), digits)
+
+
+def grade_sheet(queryset: QuerySet) -> dict:
+    """
+    Results in ``queryset`` with totals, grades, ranks and per-subject
+    statistics. Row arrays share the order of ``students`` (by subject,
+    then student name).
+    """
+    config = _config()
+    rows = list(
+        queryset.order_by("subject__name", "subject_id", "student__admin__last_name",
+                          "student__admin__first_name", "id")
+        .values_list("student__admin__first_name", "student__admin__last_name", "student__admin__email",
+                     "student__section__name", "subject_id", "subject__name", *COMPONENTS)
+    )
+    students = [
+        {"name": f"{last} {first}".strip(), "email": email, "section": section or "", "subject": subject}
+        for first, last, email, section, _, subject, *_ in rows
+    ]
+    marks = np.array([row[6:] for row in rows], dtype=float).reshape(-1, len(COMPONENTS))
+    subject_ids = np.array([row[4] for row in rows], dtype=np.int64)
+
+    totals = marks @ config["weights"]
+    max_total = float(config["max_marks"] @ config["weights"])
+    percent = 100 * totals / max_total if max_total else np.zeros(len(rows))
+    see_percent = 100 * marks[:, COMPONENTS.index("see")] / config["max_marks"][COMPONENTS.index("see")]
+    passed = (percent >= config["pass_percent"]) & (see_percent >= config["min_see_percent"])
+    band = np.searchsorted(config["thresholds"], percent, side="right")
+    band = np.where(passed, band, 0)
+
+    subjects = []
+    ids, first, inverse = np.unique(subject_ids, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(ids))
+    if len(ids):
+        mean = np.bincount(inverse, totals) / counts
+        variance = np.maximum(np.bincount(inverse, totals ** 2) / counts - mean ** 2, 0)
+        low = np.full(len(ids), np.inf)
+        high = np.full(len(ids), -np.inf)
+        np.minimum.at(low, inverse, totals)
+        np.maximum.at(high, inverse, totals)
+        pass_rate = np.bincount(inverse, passed) / counts
+        averages = np.stack([np.bincount(inverse, marks[:, c]) for c in range(len(COMPONENTS))], axis=1)
+        averages /= counts[:, None]
+        # In sheet order (by subject name) rather than by id
+        for i in np.argsort(first):
+            subject_id = ids[i]
+            subjects.append({
+                "id": int(subject_id),
+                "name": students[first[i]]["subject"],
+                "count": int(counts[i]),
+                "mean": round(float(mean[i]), 2),
+                "std": round(float(np.sqrt(variance[i])), 2),
+                "min": round(float(low[i]), 2),
+                "max": round(float(high[i]), 2),
+                "pass_rate": round(float(pass_rate[i]), 3),
+                "components": dict(zip(COMPONENT_LABELS, _round(averages[i]).tolist())),
+            })
+
+    return {
+        "students": students,
+        "marks": marks,
+        "total": _round(totals),
+        "percent": _round(percent),
+        "grade": config["letters"][band],
+        "points": config["points"][band],
+        "passed": passed,
+        "rank": _group_ranks(subject_ids, totals),
+        "max_total": max_total,
+        "subjects": subjects,
+    }
+
+
+def sheet_rows(sheet: dict) -> Iterator[list]:
+    """The sheet as ``HEADER``-ordered rows of plain Python values."""
+    marks = sheet["marks"].tolist()
+    columns = zip(sheet["total"].tolist(), sheet["percent"].tolist(), sheet["grade"].tolist(),
+                  sheet["points"].tolist(), sheet["passed"].tolist(), sheet["rank"].tolist())
+    for student, row_marks, (total, percent, grade, points, passed, rank) in zip(sheet["students"], marks, columns):
+        yield [student["name"], student["email"], student["section"], student["subject"], *row_marks,
+               total, percent, grade, points, "Pass" if passed else "Fail", rank]
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line for ``StreamingHttpResponse``."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(sheet: dict, filename: str) -> StreamingHttpResponse:
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(HEADER)
+        for row in sheet_rows(sheet):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(sheet: dict, filename: str) -> HttpResponse:
+    """Workbook with the grade sheet and a subject summary; raises ``ImportError`` without openpyxl."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    grades = workbook.create_sheet("Grade Sheet")
+    grades.append(HEADER)
+    for row in sheet_rows(sheet):
+        grades.append(row)
+    summary = workbook.create_sheet("Summary")
+    summary.append(["Subject", "Students", "Mean", "Std Dev", "Min", "Max", "Pass Rate",
+                    *(f"Avg {label}" for label in COMPONENT_LABELS)])
+    for subject in sheet["subjects"]:
+        summary.append([subject["name"], subject["count"], subject["mean"], subject["std"], subject["min"],
+                        subject["max"], subject["pass_rate"], *subject["components"].values()])
+    buffer = BytesIO()
+    workbook.save(buffer)
+    response = HttpResponse(
+        buffer.getvalue(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
+    return response
+
+
+def export_response(sheet: dict, fmt: str, filename: str):
+    """Download of ``sheet`` as ``fmt`` ("csv" or "xlsx"); None for any other format."""
+    filename = slugify(filename) or "grades"
+    if fmt == "csv":
+        return csv_response(sheet, filename)
+    if fmt == "xlsx":
+        return xlsx_response(sheet, filename)
+    return None
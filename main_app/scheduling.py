@@ -1,167 +1,689 @@
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import random
+import time
 
-from django.db import transaction
-from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
 
 from .models import (
     TimetableEntry,
     Session,
+    Section,
     Room,
+    Student,
     Subject,
     StaffUnavailability,
+    ExtraClassAvailability,
+)
+from .timetable_cache import timetable_changed
+from .timetable_grid import (
+    DAY_INDEX,
+    PERIODS_PER_DAY,
+    Occupancy,
+    group_key,
+    span_mask,
+)
+from .timetable_solver import (
+    ENGINE_CP,
+    ENGINE_GREEDY,
+    Demand,
+    nearest_slots,
+    place_greedy,
+    solve_partitioned,
 )
 
 
-DAYS = [choice[0] for choice in TimetableEntry._meta.get_field("day").choices]
+ENGINE_CHOICES = [
+    (ENGINE_GREEDY, "Greedy heuristic (fast)"),
+    (ENGINE_CP, "Constraint solver (best coverage)"),
+]
 
 
-def _find_free_room(session: Session, day: str, period: int) -> Optional[Room]:
-    # Iterate rooms in random order to avoid always picking the first room
-    rooms = list(Room.objects.all())
-    random.shuffle(rooms)
-    for room in rooms:
-        if not TimetableEntry.objects.filter(session=session, day=day, period_number=period, room=room).exists():
-            return room
-    return None
+def _is_lab_name(name: str) -> bool:
+    name = (name or "").lower()
+    return "lab" in name or "practical" in name
 
 
-def _is_lab_subject(subject: Subject) -> bool:
-    name = (subject.name or "").lower()
-    return "lab" in name or "practical" in name
+def _load_occupancy(session: Session) -> Tuple[Occupancy, Dict[tuple, int]]:
+    """
+    Load the session's timetable and staff unavailability into bitsets.
+    Returns the occupancy and the number of existing classes per (subject, group).
+    Two queries regardless of how many entries exist.
+    """
+    occupancy = Occupancy()
+    counts: Dict[tuple, int] = {}
+    rows = TimetableEntry.objects.filter(session=session).values_list(
+        "staff_id", "room_id", "course_id", "section_id", "subject_id",
+        "day", "period_number", "duration_periods",
+    )
+    for staff_id, room_id, course_id, section_id, subject_id, day, period, duration in rows:
+        if day not in DAY_INDEX or not (1 <= int(period) <= PERIODS_PER_DAY):
+            continue
+        duration = max(1, min(int(duration or 1), PERIODS_PER_DAY - int(period) + 1))
+        group = group_key(course_id, section_id)
+        occupancy.book(staff_id, room_id, group, subject_id, day, period, duration)
+        counts[(subject_id, group)] = counts.get((subject_id, group), 0) + 1
+
+    unavailability = StaffUnavailability.objects.filter(session=session).values_list(
+        "staff_id", "day", "period_number", "duration_periods"
+    )
+    for staff_id, day, period, duration in unavailability:
+        occupancy.block_staff(staff_id, day, period, duration or 1)
+    return occupancy, counts
 
 
-def generate_for_session(session: Session) -> dict:
+def _build_problem(session: Session, rng: random.Random):
     """
-    Greedy heuristic generator that schedules subjects up to their weekly credits.
-    Respects:
-    - No consecutive classes for the same subject (enforced by TimetableEntry.clean)
-    - Max one class per subject per day (enforced by TimetableEntry.clean)
-    - Labs scheduled as 2-hour blocks when detected
-    - Avoids staff/course/room conflicts
-    Returns summary dict with counts.
+    Read everything generation needs in a fixed number of queries.
+    Returns (demands, occupancy, rooms, required) where ``rooms`` is a list of
+    (room_id, capacity) and ``required`` the total weekly classes owed by all
+    subject/section offerings (for coverage reporting).
     """
     # Randomize subject order to avoid linear filling across subjects
     subjects = list(
-        Subject.objects.select_related("staff").prefetch_related("courses", "sections").all()
+        Subject.objects.select_related("staff").prefetch_related("courses", "sections").order_by("id")
+    )
+    rng.shuffle(subjects)
+    occupancy, counts = _load_occupancy(session)
+    rooms = list(Room.objects.order_by("id").values_list("id", "capacity"))
+    section_sizes = dict(
+        Student.objects.filter(section__isnull=False)
+        .values("section_id")
+        .annotate(n=Count("id"))
+        .values_list("section_id", "n")
     )
-    random.shuffle(subjects)
-    total_created = 0
-    total_skipped = 0
-    errors: List[str] = []
 
+    demands: List[Demand] = []
+    required = 0
     for subject in subjects:
         credits = int(getattr(subject, "credits", 0) or 0)
         if credits <= 0:
             continue
-
+        is_lab = _is_lab_name(subject.name)
+        subject_sections = list(subject.sections.all())
         # Schedule per course offering
-        subject_courses = list(subject.courses.all())
-        if not subject_courses:
-            continue
+        for course in subject.courses.all():
+            # Only sections of this course the subject is offered in; without
+            # section assignments nothing is scheduled, to keep timetables section-based
+            for section in [s for s in subject_sections if s.course_id == course.id]:
+                group = group_key(course.id, section.id)
+                required += credits
+                demands.append(Demand(
+                    subject_id=subject.id,
+                    course_id=course.id,
+                    section_id=section.id,
+                    staff_id=subject.staff_id,
+                    group=group,
+                    units=max(0, credits - counts.get((subject.id, group), 0)),
+                    duration=2 if is_lab else 1,
+                    is_lab=is_lab,
+                    size=section_sizes.get(section.id, 0),
+                    label=f"{subject.name} ({course.name} / {section.name})",
+                ))
+    return demands, occupancy, rooms, required
 
-        is_lab = _is_lab_subject(subject)
-        duration = 2 if is_lab else 1
 
-        # Randomize day order so classes distribute across the week non-linearly
-        day_order = DAYS[:]
-        random.shuffle(day_order)
+class SessionSnapshot:
+    """
+    Everything entry validation needs for one session, loaded up front.
 
-        for course in subject_courses:
-            # Determine sections of this course this subject is offered in
-            sections_for_course = list(subject.sections.filter(course=course))
-            if not sections_for_course:
-                # If no section assignments, skip scheduling for this course to ensure section-based timetables
-                continue
+    Slot indexes map a (resource, day, period) key to the ids of the entries
+    covering it, so an entry being edited can be excluded from its own checks.
+    """
+
+    def __init__(self, session, subject_ids=(), section_ids=()):
+        self.session_id = getattr(session, "pk", session)
+        self.staff_slots: Dict[tuple, Set] = {}
+        self.room_slots: Dict[tuple, Set] = {}
+        self.group_slots: Dict[tuple, Set] = {}
+        self.subject_slots: Dict[tuple, Set] = {}
+        self.subject_days: Dict[tuple, Set] = {}
+        self.subject_counts: Dict[tuple, Set] = {}
+        # Bitsets of the same entries plus unavailability, for free-slot lookups
+        self.occupancy = Occupancy()
+        self._new = 0
+        self._free_slots = None
+
+        rows = TimetableEntry.objects.filter(session_id=self.session_id).values_list(
+            "id", "staff_id", "room_id", "course_id", "section_id", "subject_id",
+            "day", "period_number", "duration_periods",
+        )
+        for entry_id, staff_id, room_id, course_id, section_id, subject_id, day, period, duration in rows:
+            self._add(entry_id, staff_id, room_id, group_key(course_id, section_id), subject_id,
+                      day, period, duration)
+        for staff_id, day, period, duration in StaffUnavailability.objects.filter(
+            session_id=self.session_id
+        ).values_list("staff_id", "day", "period_number", "duration_periods"):
+            self.occupancy.block_staff(staff_id, day, period, duration or 1)
+        self.extra_slots = set(
+            ExtraClassAvailability.objects.filter(session_id=self.session_id).values_list(
+                "day", "period_number", "course_id"
+            )
+        )
+
+        subject_ids = {i for i in subject_ids if i}
+        self.subjects = {
+            subject_id: (staff_id, int(credits or 0))
+            for subject_id, staff_id, credits in Subject.objects.filter(id__in=subject_ids).values_list(
+                "id", "staff_id", "credits"
+            )
+        }
+        self.subject_courses = set(
+            Subject.courses.through.objects.filter(subject_id__in=subject_ids).values_list("subject_id", "course_id")
+        )
+        self.subject_sections = set(
+            Subject.sections.through.objects.filter(subject_id__in=subject_ids).values_list("subject_id", "section_id")
+        )
+        self.section_courses = dict(
+            Section.objects.filter(id__in={i for i in section_ids if i}).values_list("id", "course_id")
+        )
+
+    def _add(self, entry_id, staff_id, room_id, group, subject_id, day, period, duration) -> None:
+        period, duration = int(period), max(1, int(duration or 1))
+        if day in DAY_INDEX and 1 <= period <= PERIODS_PER_DAY:
+            self.occupancy.book(staff_id, room_id, group, subject_id, day, period,
+                                min(duration, PERIODS_PER_DAY - period + 1))
+            self._free_slots = None
+        for p in range(period, period + duration):
+            self.staff_slots.setdefault((staff_id, day, p), set()).add(entry_id)
+            self.room_slots.setdefault((room_id, day, p), set()).add(entry_id)
+            self.group_slots.setdefault((group, day, p), set()).add(entry_id)
+            self.subject_slots.setdefault((subject_id, group, day, p), set()).add(entry_id)
+        self.subject_days.setdefault((subject_id, group, day), set()).add(entry_id)
+        self.subject_counts.setdefault((subject_id, group), set()).add(entry_id)
 
-            for section in sections_for_course:
-                existing = TimetableEntry.objects.filter(
-                    session=session, subject=subject, course=course, section=section
-                ).count()
-                remaining = max(0, credits - existing)
-                if remaining == 0:
+    def add(self, entry: TimetableEntry) -> None:
+        """Record an accepted entry so later entries in the batch see it."""
+        entry_id = entry.pk
+        if entry_id is None:
+            self._new += 1
+            entry_id = ("new", self._new)
+        self._add(entry_id, entry.staff_id, entry.room_id, group_key(entry.course_id, entry.section_id),
+                  entry.subject_id, entry.day, entry.period_number, entry.duration_periods)
+
+    @staticmethod
+    def taken(index: Dict[tuple, Set], key: tuple, pk) -> bool:
+        return bool(index.get(key, set()) - {pk})
+
+    @property
+    def free_slots(self) -> "FreeSlotIndex":
+        """Free-slot index over this snapshot, built on first use."""
+        if self._free_slots is None:
+            self._free_slots = FreeSlotIndex(self.occupancy, Room.objects.order_by("id").values_list("id", flat=True))
+        return self._free_slots
+
+
+class FreeSlotIndex:
+    """
+    Free rooms per (day, period) for one session, computed in one pass over
+    the occupancy bitsets. Staff and section freeness are bit tests on the
+    same occupancy, so ranking suggestions for an entry runs no queries.
+    """
+
+    def __init__(self, occupancy: Occupancy, room_ids):
+        self.occupancy = occupancy
+        self.room_ids = list(room_ids)
+        # Bit position -> rooms free in that single period
+        self.free_rooms: Dict[int, List[int]] = {
+            bit: [room_id for room_id in self.room_ids if not occupancy.room.get(room_id, 0) >> bit & 1]
+            for bit in range(len(DAY_INDEX) * PERIODS_PER_DAY)
+        }
+
+    def _room_for(self, day: str, period: int, duration: int, prefer: Optional[int]) -> Optional[int]:
+        base = DAY_INDEX[day] * PERIODS_PER_DAY + period - 1
+        free = set(self.free_rooms[base])
+        for bit in range(base + 1, base + duration):
+            free &= set(self.free_rooms[bit])
+        if prefer in free:
+            return prefer
+        return next((room_id for room_id in self.room_ids if room_id in free), None)
+
+    def suggest(self, entry: TimetableEntry, limit: int = 5) -> List[dict]:
+        """
+        Alternative starts for ``entry`` where the teacher, the section (and
+        course-wide classes) and a room are all free, best first. Score is
+        the distance from the requested slot in periods (a day counts as a
+        full day of periods) plus one when the room has to change.
+        """
+        duration = max(1, int(entry.duration_periods or 1))
+        group = group_key(entry.course_id, entry.section_id)
+        course_group = group_key(entry.course_id, None)
+        origin_day = DAY_INDEX.get(entry.day, 0)
+        origin_period = int(entry.period_number or 1)
+        found = []
+        for day in DAY_INDEX:
+            for period in range(1, PERIODS_PER_DAY - duration + 2):
+                if day == entry.day and period == origin_period:
                     continue
+                mask = span_mask(day, period, duration)
+                if (self.occupancy.staff_unavailable(entry.staff_id, mask)
+                        or self.occupancy.staff_busy(entry.staff_id, mask)
+                        or self.occupancy.group_busy(group, mask)
+                        or self.occupancy.group_busy(course_group, mask)):
+                    continue
+                room_id = self._room_for(day, period, duration, entry.room_id)
+                if room_id is None:
+                    continue
+                room_changed = room_id != entry.room_id
+                distance = abs(DAY_INDEX[day] - origin_day) * PERIODS_PER_DAY + abs(period - origin_period)
+                found.append({
+                    "day": day,
+                    "period": period,
+                    "room_id": room_id,
+                    "room_changed": room_changed,
+                    "distance": distance,
+                    "score": distance + int(room_changed),
+                })
+        found.sort(key=lambda s: (s["score"], DAY_INDEX[s["day"]], s["period"]))
+        return found[:limit]
+
+
+def format_suggestions(suggestions: List[dict]) -> str:
+    """Human-readable form used in validation messages."""
+    if suggestions:
+        return "Suggested alternatives: " + ", ".join(f"{s['day']} P{s['period']}" for s in suggestions)
+    return "No suitable alternative slots found in this week."
+
+
+def _error(code: str, message: str, **extra) -> dict:
+    return {"code": code, "message": message, **extra}
+
+
+def _entry_errors(entry: TimetableEntry, snapshot: SessionSnapshot, suggest: bool) -> List[dict]:
+    """Errors for one entry, in the order ``TimetableEntry.clean`` reports them."""
+    pk = entry.pk
+    subject = snapshot.subjects.get(entry.subject_id)
+    if (entry.subject_id, entry.course_id) not in snapshot.subject_courses:
+        return [_error("subject_course", "Subject is not offered for the selected course")]
+    if entry.section_id:
+        if snapshot.section_courses.get(entry.section_id) != entry.course_id:
+            return [_error("section_course", "Selected section does not belong to the chosen course")]
+        if (entry.subject_id, entry.section_id) not in snapshot.subject_sections:
+            return [_error("subject_section", "Subject is not offered for the selected section")]
+    if subject is None or subject[0] != entry.staff_id:
+        return [_error("staff_subject", "Selected staff is not assigned to the subject")]
+
+    period = int(entry.period_number)
+    duration = int(entry.duration_periods)
+    if not (1 <= period <= PERIODS_PER_DAY):
+        return [_error("period_range", "period_number must be between 1 and 6")]
+    if duration < 1:
+        return [_error("duration", "duration_periods must be at least 1")]
+    if entry.is_lab and duration != 2:
+        return [_error("lab_duration", "Lab sessions must span exactly 2 consecutive periods")]
+    end_period = period + duration - 1
+    if end_period > PERIODS_PER_DAY or entry.day not in DAY_INDEX:
+        return [_error("beyond_last_period", "Session extends beyond the last available period")]
+
+    suggestions: List[dict] = []
+
+    def alternatives() -> str:
+        if not suggest:
+            return ""
+        if not suggestions:
+            suggestions.extend(snapshot.free_slots.suggest(entry))
+        return format_suggestions(suggestions)
+
+    errors = []
+    day = entry.day
+    group = group_key(entry.course_id, entry.section_id)
+    span = range(period, end_period + 1)
+    if snapshot.occupancy.staff_unavailable(entry.staff_id, span_mask(day, period, duration)):
+        errors.append(_error(
+            "staff_unavailable",
+            "Teacher is marked unavailable in the selected time range. " + alternatives(),
+            suggestions=suggestions,
+        ))
+
+    # Filling a published extra slot relaxes the per-day, clash and adjacency rules
+    extra_slot = (day, period, entry.course_id) in snapshot.extra_slots
+
+    credits = subject[1]
+    if credits > 0 and len(snapshot.subject_counts.get((entry.subject_id, group), set()) - {pk}) >= credits:
+        errors.append(_error(
+            "credits",
+            "Weekly credits limit reached for this subject" + ("/section" if entry.section_id else ""),
+        ))
 
-                created_for_subject_section = 0
-                for day in day_order:
-                    if created_for_subject_section >= remaining:
-                        break
-
-                    # Iterate possible periods; for lab need P1..P5 for 2-block
-                    max_start = 5 if is_lab else 6
-                    # Randomize period order so we don't always fill mornings first
-                    period_order = list(range(1, max_start + 1))
-                    random.shuffle(period_order)
-                    for period in period_order:
-                        if created_for_subject_section >= remaining:
-                            break
-
-                        # Skip if staff or section busy at starting slot; subsequent conflicts checked by clean
-                        if TimetableEntry.objects.filter(
-                            session=session, day=day, period_number=period, staff=subject.staff
-                        ).exists():
-                            total_skipped += 1
-                            continue
-                        if TimetableEntry.objects.filter(
-                            session=session, day=day, period_number=period, section=section
-                        ).exists():
-                            total_skipped += 1
-                            continue
-
-                        # Skip if staff marked unavailable for this slot (respect duration)
-                        duration_span = 2 if is_lab else 1
-                        unavail = StaffUnavailability.objects.filter(
-                            staff=subject.staff,
-                            session=session,
-                            day=day,
-                        )
-                        unavailable_here = False
-                        for ua in unavail:
-                            covered = set(range(ua.period_number, ua.period_number + int(ua.duration_periods)))
-                            if set(range(period, period + duration_span)) & covered:
-                                unavailable_here = True
-                                break
-                        if unavailable_here:
-                            total_skipped += 1
-                            continue
-
-                        room = _find_free_room(session, day, period)
-                        if room is None:
-                            total_skipped += 1
-                            continue
-
-                        entry = TimetableEntry(
-                            session=session,
-                            course=course,
-                            section=section,
-                            subject=subject,
-                            staff=subject.staff,
-                            room=room,
-                            day=day,
-                            period_number=period,
-                            is_lab=is_lab,
-                            duration_periods=duration,
-                        )
-
-                        try:
-                            with transaction.atomic():
-                                entry.full_clean()
-                                entry.save()
-                                created_for_subject_section += 1
-                                total_created += 1
-                        except ValidationError as e:
-                            total_skipped += 1
-                            errors.append(
-                                f"{subject.name} ({course.name} / {section.name}) on {day} P{period}: {e}"
-                            )
-                        except Exception as e:
-                            total_skipped += 1
-                            errors.append(
-                                f"{subject.name} ({course.name} / {section.name}) on {day} P{period}: {e}"
-                            )
+    if not extra_slot:
+        if snapshot.taken(snapshot.subject_days, (entry.subject_id, group, day), pk):
+            errors.append(_error(
+                "same_day",
+                "Subject already scheduled for this section on the selected day"
+                if entry.section_id
+                else "Subject already scheduled for this course on the selected day",
+            ))
+        for code, index, key, message in (
+            ("staff_conflict", snapshot.staff_slots, entry.staff_id,
+             "Teacher has another class in the selected time range. "),
+            ("room_conflict", snapshot.room_slots, entry.room_id,
+             "Room is occupied in the selected time range. "),
+            ("group_conflict", snapshot.group_slots, group,
+             "Section already has another class in the selected time range. "
+             if entry.section_id
+             else "Course already has another class in the selected time range. "),
+        ):
+            if any(snapshot.taken(index, (key, day, p), pk) for p in span):
+                errors.append(_error(code, message + alternatives(), suggestions=suggestions))
+        adjacent = [p for p in (period - 1, end_period + 1) if 1 <= p <= PERIODS_PER_DAY]
+        if any(snapshot.taken(snapshot.subject_slots, (entry.subject_id, group, day, p), pk) for p in adjacent):
+            errors.append(_error("consecutive", "No consecutive periods allowed for the same subject"))
+    return errors
 
+
+def validate_entries(session, entries, suggest: bool = True) -> List[List[dict]]:
+    """
+    Validate a batch of proposed timetable entries for ``session``.
+
+    All lookups run against one :class:`SessionSnapshot`, so the cost is a
+    fixed handful of queries however many entries are checked. Entries are
+    checked in order and each valid one is added to the snapshot, so clashes
+    inside the batch are reported too. Returns one list of
+    ``{"code", "message"}`` errors per entry (empty when valid); clash and
+    unavailability errors also carry ranked ``suggestions`` from the
+    snapshot's :class:`FreeSlotIndex`. Pass ``suggest=False`` to skip them.
+    """
+    entries = list(entries)
+    snapshot = SessionSnapshot(
+        session,
+        subject_ids={e.subject_id for e in entries},
+        section_ids={e.section_id for e in entries},
+    )
+    results = []
+    for entry in entries:
+        errors = _entry_errors(entry, snapshot, suggest)
+        if not errors:
+            snapshot.add(entry)
+        results.append(errors)
+    return results
+
+
+def generate_for_session(session: Session, seed: Optional[int] = None, engine: str = ENGINE_GREEDY,
+                         time_budget: float = 10.0, workers: Optional[int] = None,
+                         progress: Optional[Callable[[int, str], None]] = None) -> dict:
+    """
+    Schedule subjects up to their weekly credits for every section they are offered in.
+    Respects:
+    - No consecutive classes for the same subject
+    - Max one class per subject per day
+    - Labs scheduled as 2-hour blocks when detected
+    - Avoids staff/section/room conflicts, staff unavailability and rooms too small for the section
+    Engines:
+    - "greedy": randomized first-fit heuristic
+    - "cp": branch-and-bound constraint search maximising coverage within ``time_budget`` seconds
+    All checks run against in-memory occupancy bitsets loaded once per call.
+    Subjects that share no teacher or section are solved independently on up
+    to ``workers`` processes (default: CPU count, setting TIMETABLE_WORKERS);
+    the partial timetables are merged, room clashes between them resolved,
+    and new entries written with a single bulk insert in one transaction.
+    Pass ``seed`` for a reproducible timetable. ``progress(percent, message)``
+    is called between stages, never inside the write transaction, when given
+    (used by the background job).
+    Returns summary dict with counts, coverage and solve time.
+    """
+    started = time.monotonic()
+    progress = progress or (lambda percent, message: None)
+    rng = random.Random(seed)
+    errors: List[str] = []
+    new_entries: List[TimetableEntry] = []
+
+    demands, occupancy, rooms, required = _build_problem(session, rng)
+    outstanding = sum(d.units for d in demands)
+    progress(10, f"Placing {outstanding} class(es)")
+
+    if workers is None:
+        workers = getattr(settings, "TIMETABLE_WORKERS", None)
+    placements, skipped, optimal = solve_partitioned(
+        demands, occupancy, rooms, engine=engine, time_budget=time_budget,
+        seed=seed if seed is not None else rng.randrange(1 << 30), workers=workers,
+    )
+
+    progress(80, f"Placed {len(placements)} class(es), validating")
+    for placement in placements:
+        demand = demands[placement.demand]
+        new_entries.append(TimetableEntry(
+            session=session,
+            course_id=demand.course_id,
+            section_id=demand.section_id,
+            subject_id=demand.subject_id,
+            staff_id=demand.staff_id,
+            room_id=placement.room_id,
+            day=placement.day,
+            period_number=placement.period,
+            is_lab=demand.is_lab,
+            duration_periods=demand.duration,
+        ))
+
+    with transaction.atomic():
+        # Final check of the batch against the stored timetable before writing
+        rejected = [
+            (entry, errors)
+            for entry, errors in zip(new_entries, validate_entries(session, new_entries, suggest=False))
+            if errors
+        ]
+        if rejected:
+            errors.extend(f"{entry.day} P{entry.period_number}: {errs[0]['message']}" for entry, errs in rejected)
+            rejected_ids = {id(entry) for entry, _ in rejected}
+            new_entries = [entry for entry in new_entries if id(entry) not in rejected_ids]
+
+        try:
+            with transaction.atomic():
+                TimetableEntry.objects.bulk_create(new_entries, batch_size=500)
+                timetable_changed()
+        except IntegrityError as e:
+            # Someone edited the timetable concurrently; keep the session unchanged
+            errors.append(f"Could not save generated timetable: {e}")
+            new_entries = []
+
+    scheduled = required - outstanding + len(new_entries)
     return {
-        "created": total_created,
-        "skipped": total_skipped,
+        "engine": engine,
+        "created": len(new_entries),
+        "skipped": skipped,
         "errors": errors,
-    }
\ No newline at end of file
+        "coverage": {
+            "scheduled": scheduled,
+            "required": required,
+            "percent": round(100.0 * scheduled / required, 1) if required else 100.0,
+        },
+        "optimal": optimal,
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+
+
+# Why an existing entry had to change during repair
+REPAIR_ROOM_REMOVED = "room_removed"
+REPAIR_ROOM_TOO_SMALL = "room_too_small"
+REPAIR_STAFF_UNAVAILABLE = "staff_unavailable"
+REPAIR_CLASH = "clash"
+REPAIR_OVER_CREDITS = "over_credits"
+
+
+@dataclass
+class ChangeSet:
+    """
+    Changes to apply on top of what is stored for the session.
+    Changes already saved (a new unavailability row, an edited credits value)
+    are picked up from the database and need not be repeated here.
+    """
+    # (staff_id, day, period_number, duration_periods)
+    unavailability: List[Tuple[int, str, int, int]] = field(default_factory=list)
+    # Rooms that must be emptied, e.g. before deleting them
+    removed_rooms: Set[int] = field(default_factory=set)
+    # subject_id -> new weekly credits; raised credits are topped up
+    credits: Dict[int, int] = field(default_factory=dict)
+
+
+def _slot(day: str, period: int, room_id: int) -> dict:
+    return {"day": day, "period": period, "room_id": room_id}
+
+
+def repair_session(session: Session, changes: Optional[ChangeSet] = None, seed: Optional[int] = None) -> dict:
+    """
+    Repair the session timetable in place instead of regenerating it.
+
+    Existing entries are checked against the current constraints plus
+    ``changes``. Valid entries stay pinned; an entry that became invalid is
+    moved to the nearest free slot (same day and room when possible), and
+    entries beyond a lowered credits value are removed. Entry ids are kept so
+    references such as extra-class slots survive the repair.
+
+    Returns a diff: ``moved`` and ``removed`` entries with their reason,
+    ``unplaced`` entries that were deleted because no slot was left, and the
+    number of entries ``kept`` and ``created``.
+    """
+    changes = changes or ChangeSet()
+    rng = random.Random(seed)
+    diff = {"moved": [], "removed": [], "unplaced": [], "kept": 0, "created": 0}
+
+    with transaction.atomic():
+        rows = list(
+            TimetableEntry.objects.filter(session=session).values_list(
+                "id", "staff_id", "room_id", "course_id", "section_id", "subject_id",
+                "day", "period_number", "duration_periods", "is_lab", "subject__credits",
+                "subject__name", "course__name", "section__name",
+            )
+        )
+        occupancy = Occupancy()
+        for staff_id, day, period, duration in StaffUnavailability.objects.filter(session=session).values_list(
+            "staff_id", "day", "period_number", "duration_periods"
+        ):
+            occupancy.block_staff(staff_id, day, period, duration or 1)
+        for staff_id, day, period, duration in changes.unavailability:
+            occupancy.block_staff(staff_id, day, period, duration or 1)
+        rooms = [
+            (room_id, capacity)
+            for room_id, capacity in Room.objects.order_by("id").values_list("id", "capacity")
+            if room_id not in changes.removed_rooms
+        ]
+        capacity = dict(rooms)
+        section_sizes = dict(
+            Student.objects.filter(section__isnull=False)
+            .values("section_id")
+            .annotate(n=Count("id"))
+            .values_list("section_id", "n")
+        )
+
+        # Pass 1: which entries can stay where they are
+        entries = []
+        for row in sorted(rows, key=lambda r: (DAY_INDEX.get(r[6], 99), r[7], r[0])):
+            (entry_id, staff_id, room_id, course_id, section_id, subject_id,
+             day, period, duration, is_lab, credits, subject_name, course_name, section_name) = row
+            group = group_key(course_id, section_id)
+            demand = Demand(
+                subject_id=subject_id, course_id=course_id, section_id=section_id, staff_id=staff_id,
+                group=group, units=1, duration=max(1, int(duration or 1)), is_lab=is_lab,
+                size=section_sizes.get(section_id, 0),
+                label=f"{subject_name} ({course_name}" + (f" / {section_name})" if section_name else ")"),
+            )
+            entry = {"id": entry_id, "demand": demand, "day": day, "period": period, "room_id": room_id,
+                     "credits": int(changes.credits.get(subject_id, credits) or 0), "reason": None}
+            entries.append(entry)
+            if day not in DAY_INDEX or not (1 <= int(period) <= PERIODS_PER_DAY - demand.duration + 1):
+                entry["reason"] = REPAIR_CLASH
+                continue
+            mask = span_mask(day, period, demand.duration)
+            if room_id in changes.removed_rooms:
+                entry["reason"] = REPAIR_ROOM_REMOVED
+            elif occupancy.staff_unavailable(staff_id, mask):
+                entry["reason"] = REPAIR_STAFF_UNAVAILABLE
+            elif capacity.get(room_id) and capacity[room_id] < demand.size:
+                entry["reason"] = REPAIR_ROOM_TOO_SMALL
+            elif (occupancy.staff_busy(staff_id, mask) or occupancy.room_busy(room_id, mask)
+                  or occupancy.group_busy(group, mask)):
+                entry["reason"] = REPAIR_CLASH
+            else:
+                occupancy.book(staff_id, room_id, group, subject_id, day, period, demand.duration)
+
+        # Pass 2: enforce credits, dropping entries that need moving first
+        counts: Dict[tuple, int] = {}
+        removed_ids = []
+        for entry in sorted(entries, key=lambda e: e["reason"] is not None):
+            d = entry["demand"]
+            key = (d.subject_id, d.group)
+            if entry["credits"] > 0 and counts.get(key, 0) >= entry["credits"]:
+                if entry["reason"] is None:
+                    occupancy.unbook(d.staff_id, entry["room_id"], d.group, d.subject_id,
+                                     entry["day"], entry["period"], d.duration)
+                entry["reason"] = REPAIR_OVER_CREDITS
+                removed_ids.append(entry["id"])
+                diff["removed"].append({"id": entry["id"], "label": d.label, "reason": REPAIR_OVER_CREDITS,
+                                        "from": _slot(entry["day"], entry["period"], entry["room_id"])})
+                continue
+            counts[key] = counts.get(key, 0) + 1
+
+        # Pass 3: move invalid entries to the nearest free slot
+        moved = []
+        for entry in entries:
+            reason = entry["reason"]
+            if reason is None:
+                diff["kept"] += 1
+                continue
+            if reason == REPAIR_OVER_CREDITS:
+                continue
+            d = entry["demand"]
+            found = nearest_slots(d, occupancy, rooms, entry["day"], entry["period"], entry["room_id"])
+            change = {"id": entry["id"], "label": d.label, "reason": reason,
+                      "from": _slot(entry["day"], entry["period"], entry["room_id"])}
+            if not found:
+                removed_ids.append(entry["id"])
+                diff["unplaced"].append(change)
+                continue
+            day, period, room_id = found[0]
+            occupancy.book(d.staff_id, room_id, d.group, d.subject_id, day, period, d.duration)
+            change["to"] = _slot(day, period, room_id)
+            diff["moved"].append(change)
+            moved.append(TimetableEntry(id=entry["id"], day=day, period_number=period, room_id=room_id))
+
+        # Raised credits: top up the affected subjects only
+        new_entries = []
+        if changes.credits:
+            offerings = Subject.objects.filter(id__in=list(changes.credits)).values_list(
+                "id", "staff_id", "name", "sections__id", "sections__course_id"
+            )
+            demands = []
+            for subject_id, staff_id, name, section_id, course_id in offerings:
+                if section_id is None:
+                    continue
+                group = group_key(course_id, section_id)
+                units = int(changes.credits[subject_id] or 0) - counts.get((subject_id, group), 0)
+                if units > 0:
+                    lab = _is_lab_name(name)
+                    demands.append(Demand(
+                        subject_id=subject_id, course_id=course_id, section_id=section_id,
+                        staff_id=staff_id, group=group, units=units, duration=2 if lab else 1,
+                        is_lab=lab, size=section_sizes.get(section_id, 0),
+                    ))
+            placements, _ = place_greedy(demands, occupancy, rooms, rng)
+            for placement in placements:
+                d = demands[placement.demand]
+                new_entries.append(TimetableEntry(
+                    session=session, course_id=d.course_id, section_id=d.section_id,
+                    subject_id=d.subject_id, staff_id=d.staff_id, room_id=placement.room_id,
+                    day=placement.day, period_number=placement.period, is_lab=d.is_lab,
+                    duration_periods=d.duration,
+                ))
+
+        if removed_ids:
+            TimetableEntry.objects.filter(id__in=removed_ids).delete()
+        if moved:
+            now = timezone.now()
+            # Park moved rows on distinct out-of-grid periods first so the
+            # unique slot constraints never see two rows swapping places
+            parked = [
+                TimetableEntry(id=entry.id, period_number=PERIODS_PER_DAY + 1 + n)
+                for n, entry in enumerate(moved)
+            ]
+            TimetableEntry.objects.bulk_update(parked, ["period_number"], batch_size=500)
+            for entry in moved:
+                entry.updated_at = now
+            TimetableEntry.objects.bulk_update(moved, ["day", "period_number", "room", "updated_at"], batch_size=500)
+        if new_entries:
+            TimetableEntry.objects.bulk_create(new_entries, batch_size=500)
+        if moved or new_entries:
+            timetable_changed()
+        diff["created"] = len(new_entries)
+    return diff
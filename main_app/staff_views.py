@@ -1,4 +1,5 @@
 import json
+import uuid
 
 from django.contrib import messages
 from django.core.files.storage import FileSystemStorage
@@ -7,13 +8,20 @@ from django.shortcuts import (HttpResponseRedirect, get_object_or_404,redirect,
 from django.urls import reverse
 import logging
 from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
+from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
+from django.utils.http import urlencode
 
 from .forms import *
+from .grading import publish_snapshot
 from .models import *
+from .notifications import notify, notify_later
 from . import forms, models
+from .timeseries import bucket_counts
 from datetime import date
 from django.contrib import messages
 from django.urls import reverse
@@ -23,20 +31,16 @@ def staff_home(request):
     staff = get_object_or_404(Staff, admin=request.user)
     total_students = Student.objects.filter(course=staff.course).count()
     total_leave = LeaveReportStaff.objects.filter(staff=staff).count()
-    subjects = Subject.objects.filter(staff=staff)
-    total_subject = subjects.count()
-    attendance_list = Attendance.objects.filter(subject__in=subjects)
-    total_attendance = attendance_list.count()
-    attendance_list = []
-    subject_list = []
-    for subject in subjects:
-        attendance_count = Attendance.objects.filter(subject=subject).count()
-        subject_list.append(subject.name)
-        attendance_list.append(attendance_count)
-    now = timezone.now()
-    days = [now - timedelta(days=i) for i in range(6, -1, -1)]
-    notif_labels = [d.strftime("%b %d") for d in days]
-    staff_notif_counts = [NotificationStaff.objects.filter(staff=staff, created_at__date=d.date()).count() for d in days]
+    # One grouped query for the per-subject attendance counts
+    subjects = list(
+        Subject.objects.filter(staff=staff).order_by("id")
+        .annotate(attendance_count=Count("attendance")).values_list("name", "attendance_count")
+    )
+    total_subject = len(subjects)
+    subject_list = [name for name, _ in subjects]
+    attendance_list = [count for _, count in subjects]
+    total_attendance = sum(attendance_list)
+    notif_labels, staff_notif_counts = bucket_counts(NotificationStaff.objects.filter(staff=staff), "created_at", days=7)
     recent_notifications = NotificationStaff.objects.filter(staff=staff).order_by('-created_at')[:10]
 
     context = {
@@ -55,28 +59,12 @@ def staff_home(request):
 
 
 def staff_timetable(request):
+    from .timetable_cache import grid_response, staff_grid
+
     staff = get_object_or_404(Staff, admin=request.user)
-    # Fetch all entries for this staff across sessions
-    entries = (
-        TimetableEntry.objects.filter(staff=staff)
-        .select_related("session", "course", "section", "subject", "room", "subject__semester")
-    )
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri"]
-    grid = {d: [None] * 6 for d in days}
-    for e in entries:
-        if 1 <= e.period_number <= 6:
-            end_p = min(e.period_number + max(1, int(getattr(e, "duration_periods", 1))) - 1, 6)
-            for p in range(e.period_number, end_p + 1):
-                grid[e.day][p - 1] = e
-    # Build template-friendly rows as list of (day, row_entries)
-    day_rows = [(d, grid[d]) for d in days]
-    context = {
-        "page_title": "My Timetable",
-        "days": days,
-        "day_rows": day_rows,
-        "slot_labels": ["9-10", "10-11", "11-12", "12-1", "1-2", "2-3"],
-    }
-    return render(request, "staff_template/timetable.html", context)
+    # All entries for this staff across sessions
+    grid = staff_grid(staff.id)
+    return grid_response(request, grid, "staff_template/timetable.html", {"page_title": "My Timetable"})
 
 
 logger = logging.getLogger(__name__)
@@ -116,12 +104,10 @@ def staff_mark_unavailability(request):
                     defaults={"created_from": entry},
                 )
             logger.info("Published %s extra slot(s) due to unavailability id=%s", affected.count(), unavail.id)
-            # Notify other staff in the course
-            others = Staff.objects.filter(course=staff.course).exclude(id=staff.id)
+            # Notify other staff in the course from the job worker
             msg = f"Extra slot available: {unavail.day} P{unavail.period_number} for {staff.course}"
-            for s in others:
-                NotificationStaff.objects.create(staff=s, message=msg)
-            logger.debug("Notified %s staff about extra slots", others.count())
+            job = notify_later("staff", msg, course_id=staff.course_id, exclude_ids=[staff.id], user=request.user)
+            logger.debug("Queued job %s to notify staff about extra slots", job.id)
             TimetableAuditLog.objects.create(
                 actor=request.user,
                 action="unavailable",
@@ -163,10 +149,7 @@ def staff_schedule_extra_class(request):
                 sched.full_clean()
                 sched.save()
                 logger.info("Saved extra class schedule id=%s for staff_id=%s", sched.id, staff.id)
-                NotificationStaff.objects.create(
-                    staff=staff,
-                    message=f"Extra class request submitted: {sched.subject} on {sched.start_datetime}"
-                )
+                notify([staff], f"Extra class request submitted: {sched.subject} on {sched.start_datetime}")
                 TimetableAuditLog.objects.create(
                     actor=request.user,
                     action="schedule_extra",
@@ -203,8 +186,7 @@ def staff_extra_class_request(request):
                 f"Extra class requested: {req.subject.name} ({req.session}) in {req.course.name}. "
                 f"Preferred: {req.preferred_day or '-'} P{req.preferred_period or '-'}"
             )
-            for s in others:
-                NotificationStaff.objects.create(staff=s, message=msg)
+            notify(others, msg)
         except Exception:
             # Non-fatal: continue even if notifications fail
             pass
@@ -284,8 +266,7 @@ def staff_claim_extra_slot(request, slot_id: int):
                 except Exception:
                     orig_staff = None
 
-            # Notify students in the course
-            students = Student.objects.filter(course=slot.course)
+            # Notify students in the course (from the job worker)
             base_msg = (
                 f"Extra class claimed: {subject.name} by {staff.admin.get_full_name()} "
                 f"on {slot.day} P{slot.period_number} ({TimetableEntry.SLOT_LABELS.get(slot.period_number, '')})"
@@ -294,30 +275,25 @@ def staff_claim_extra_slot(request, slot_id: int):
                 student_msg = base_msg + f" due to unavailability of {orig_staff.admin.get_full_name()}"
             else:
                 student_msg = base_msg + " due to teacher unavailability"
-            for stu in students:
-                NotificationStudent.objects.create(student=stu, message=student_msg)
+            notify_later("student", student_msg, course_id=slot.course_id, user=request.user)
 
             # Notify the originally unavailable teacher (if known)
             if orig_staff:
-                NotificationStaff.objects.create(
-                    staff=orig_staff,
-                    message=(
-                        f"Your unavailable slot {slot.day} P{slot.period_number} "
-                        f"has been claimed by {staff.admin.get_full_name()} for {subject.name}."
-                    ),
-                )
+                notify([orig_staff], (
+                    f"Your unavailable slot {slot.day} P{slot.period_number} "
+                    f"has been claimed by {staff.admin.get_full_name()} for {subject.name}."
+                ))
 
             # Notify other staff in the course
             try:
-                others = Staff.objects.filter(course=slot.course).exclude(id__in=[staff.id, getattr(orig_staff, 'id', None)])
                 staff_msg = (
                     f"Extra slot claimed for {slot.course.name}: {subject.name} by {staff.admin.get_full_name()} "
                     f"on {slot.day} P{slot.period_number}"
                 )
                 if orig_staff:
                     staff_msg += f" (covering {orig_staff.admin.get_full_name()})"
-                for s in others:
-                    NotificationStaff.objects.create(staff=s, message=staff_msg)
+                notify_later("staff", staff_msg, course_id=slot.course_id,
+                             exclude_ids=[staff.id, getattr(orig_staff, 'id', None)], user=request.user)
             except Exception:
                 pass
         except Exception:
@@ -346,10 +322,13 @@ def staff_course_extra_classes(request):
 
 def proctor_dashboard(request):
     staff = get_object_or_404(Staff, admin=request.user)
-    assignments = ProctorAssignment.objects.filter(proctor=staff, active=True).select_related("student")
-    students = [a.student for a in assignments]
-    fees = FeePayment.objects.filter(student__in=students).select_related("student", "session")
-    leaves = LeaveReportStudent.objects.filter(student__in=students).select_related("student").order_by("-created_at")
+    assignments = ProctorAssignment.objects.filter(proctor=staff, active=True).select_related("student__admin")
+    students = ProctorAssignment.objects.filter(proctor=staff, active=True).values("student_id")
+    fees = FeePayment.objects.filter(student__in=students).select_related("student__admin", "session")
+    leaves = (
+        LeaveReportStudent.objects.filter(student__in=students)
+        .select_related("student__admin").order_by("-created_at")
+    )
     context = {
         "page_title": "Proctor Dashboard",
         "assignments": assignments,
@@ -393,6 +372,8 @@ def staff_take_attendance(request):
     context = {
         'subjects': subjects,
         'sessions': sessions,
+        # Identifies this page's submission so a repeated save is not a second class
+        'submission_token': uuid.uuid4().hex,
         'page_title': 'Take Attendance'
     }
 
@@ -437,7 +418,7 @@ def get_students(request):
                 students = Student.objects.filter(
                     course_id__in=subject.courses.values_list('id', flat=True), session=session)
         student_data = []
-        for student in students:
+        for student in students.select_related("admin"):
             data = {
                     "id": student.id,
                     "name": student.admin.last_name + " " + student.admin.first_name
@@ -450,25 +431,17 @@ def get_students(request):
 
 @csrf_exempt
 def save_attendance(request):
-    student_data = request.POST.get('student_ids')
-    date = request.POST.get('date')
-    subject_id = request.POST.get('subject')
-    session_id = request.POST.get('session')
-    students = json.loads(student_data)
-    try:
-        session = get_object_or_404(Session, id=session_id)
-        subject = get_object_or_404(Subject, id=subject_id)
-        attendance = Attendance(session=session, subject=subject, date=date)
-        attendance.save()
-
-        for student_dict in students:
-            student = get_object_or_404(Student, id=student_dict.get('id'))
-            attendance_report = AttendanceReport(student=student, attendance=attendance, status=student_dict.get('status'))
-            attendance_report.save()
-    except Exception as e:
-        return None
+    from .attendance import parse_statuses, record_attendance
 
-    return HttpResponse("OK")
+    try:
+        statuses = parse_statuses(request.POST.get('student_ids'))
+        session = get_object_or_404(Session, id=request.POST.get('session'))
+        subject = get_object_or_404(Subject, id=request.POST.get('subject'))
+        summary = record_attendance(session, subject, request.POST.get('date'), statuses,
+                                    token=request.POST.get('token') or None)
+    except ValidationError as e:
+        return JsonResponse({"status": "error", "message": "; ".join(e.messages)}, status=400)
+    return JsonResponse(summary)
 
 
 def staff_update_attendance(request):
@@ -503,22 +476,15 @@ def get_student_attendance(request):
 
 @csrf_exempt
 def update_attendance(request):
-    student_data = request.POST.get('student_ids')
-    date = request.POST.get('date')
-    students = json.loads(student_data)
-    try:
-        attendance = get_object_or_404(Attendance, id=date)
-
-        for student_dict in students:
-            student = get_object_or_404(
-                Student, admin_id=student_dict.get('id'))
-            attendance_report = get_object_or_404(AttendanceReport, student=student, attendance=attendance)
-            attendance_report.status = student_dict.get('status')
-            attendance_report.save()
-    except Exception as e:
-        return None
+    from .attendance import parse_statuses, update_attendance_statuses
 
-    return HttpResponse("OK")
+    try:
+        statuses = parse_statuses(request.POST.get('student_ids'))
+        attendance = get_object_or_404(Attendance, id=request.POST.get('date'))
+        summary = update_attendance_statuses(attendance, statuses)
+    except ValidationError as e:
+        return JsonResponse({"status": "error", "message": "; ".join(e.messages)}, status=400)
+    return JsonResponse(summary)
 
 
 def staff_apply_leave(request):
@@ -621,15 +587,36 @@ def staff_fcmtoken(request):
 
 
 def staff_view_notification(request):
+    from .notifications import inbox_page
+
     staff = get_object_or_404(Staff, admin=request.user)
-    notifications = NotificationStaff.objects.filter(staff=staff)
+    cursor = request.GET.get("after")
+    notifications, next_cursor = inbox_page(
+        NotificationStaff.objects.filter(staff=staff), cursor, settings.NOTIFICATIONS_PER_PAGE
+    )
     context = {
         'notifications': notifications,
+        'next_cursor': next_cursor,
+        'cursor': cursor,
         'page_title': "View Notifications"
     }
     return render(request, "staff_template/staff_view_notification.html", context)
 
 
+def staff_mark_notifications_read(request):
+    from .notifications import mark_read
+
+    staff = get_object_or_404(Staff, admin=request.user)
+    if request.method == 'POST':
+        ids = None if request.POST.get('all') else request.POST.getlist('ids')
+        marked = mark_read(NotificationStaff.objects.filter(staff=staff), request.user.id, ids)
+        messages.success(request, f"Marked {marked} notification(s) as read")
+    url = reverse('staff_view_notification')
+    if request.POST.get('after'):
+        url += '?' + urlencode({'after': request.POST['after']})
+    return redirect(url)
+
+
 def staff_add_result(request):
     staff = get_object_or_404(Staff, admin=request.user)
     subjects = Subject.objects.filter(staff=staff)
@@ -677,6 +664,39 @@ def staff_add_result(request):
     return render(request, "staff_template/staff_add_result.html", context)
 
 
+def staff_grade_sheet(request):
+    from .results import HEADER, export_response, grade_sheet, sheet_rows, subject_results
+
+    staff = get_object_or_404(Staff, admin=request.user)
+    subjects = Subject.objects.filter(staff=staff)
+    context = {
+        'page_title': 'Grade Sheet',
+        'subjects': subjects,
+        'sessions': Session.objects.all(),
+    }
+    subject_id = request.GET.get('subject')
+    session_id = request.GET.get('session')
+    if subject_id and session_id:
+        subject = get_object_or_404(subjects, id=subject_id)
+        session = get_object_or_404(Session, id=session_id)
+        sheet = grade_sheet(subject_results(subject.id, session.id))
+        try:
+            response = export_response(sheet, request.GET.get('format'), f"grades-{subject.name}-{session.id}")
+        except ImportError:
+            response = None
+            messages.warning(request, "XLSX export needs openpyxl installed; download the CSV instead")
+        if response is not None:
+            return response
+        context.update({
+            'subject': subject,
+            'session': session,
+            'sheet': sheet,
+            'header': HEADER,
+            'rows': list(sheet_rows(sheet)),
+        })
+    return render(request, "staff_template/staff_grade_sheet.html", context)
+
+
 @csrf_exempt
 def fetch_student_result(request):
     try:
@@ -799,10 +819,27 @@ def staff_toggle_test_active(request, test_id: int):
     if request.method == "POST":
         test.is_active = not test.is_active
         test.save(update_fields=["is_active"])
+        publish_snapshot(test)
         messages.success(request, f"Test '{test.title}' is now {'Active' if test.is_active else 'Inactive'}.")
     return redirect(reverse("staff_manage_tests"))
 
 
+def staff_test_analysis(request, test_id: int):
+    from .item_analysis import analyse_test
+
+    staff = get_object_or_404(Staff, admin=request.user)
+    test = get_object_or_404(MCQTest.objects.select_related("subject"), id=test_id, staff=staff)
+    analysis = analyse_test(test)
+    context = {
+        "page_title": f"Test Analysis - {test.title}",
+        "test": test,
+        "analysis": analysis,
+        "score_labels": json.dumps(list(range(len(analysis["distribution"])))),
+        "score_counts": json.dumps(analysis["distribution"]),
+    }
+    return render(request, "staff_template/staff_test_analysis.html", context)
+
+
 def staff_add_question(request, test_id: int):
     staff = get_object_or_404(Staff, admin=request.user)
     test = get_object_or_404(MCQTest, id=test_id, staff=staff)
@@ -816,7 +853,6 @@ def staff_add_question(request, test_id: int):
     }
     if request.method == "POST":
         if form.is_valid():
-            q = MCQQuestion.objects.create(test=test, text=form.cleaned_data["question_text"]) 
             opts = [
                 form.cleaned_data["option1"],
                 form.cleaned_data["option2"],
@@ -824,8 +860,13 @@ def staff_add_question(request, test_id: int):
                 form.cleaned_data["option4"],
             ]
             correct_index = int(form.cleaned_data["correct_option"]) - 1
-            for idx, text in enumerate(opts):
-                MCQOption.objects.create(question=q, text=text, is_correct=(idx == correct_index))
+            with transaction.atomic():
+                q = MCQQuestion.objects.create(test=test, text=form.cleaned_data["question_text"])
+                MCQOption.objects.bulk_create([
+                    MCQOption(question=q, text=text, is_correct=(idx == correct_index))
+                    for idx, text in enumerate(opts)
+                ])
+                publish_snapshot(test)
             messages.success(request, "Question added")
             return redirect(reverse("staff_add_question", kwargs={"test_id": test.id}))
         else:
@@ -9,20 +9,31 @@ from django.shortcuts import (HttpResponseRedirect, get_object_or_404,
                               redirect, render)
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
+from django.utils.http import urlencode
 
 from .forms import *
+from .grading import get_snapshot, receive_submission
 from .models import *
+from .timeseries import bucket_counts
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Q
+from django.db.models import Q, Sum
 
 
 def student_home(request):
     student = get_object_or_404(Student, admin=request.user)
     # Subject now relates to Course via M2M 'courses'
     total_subject = Subject.objects.filter(courses=student.course).count()
-    total_attendance = AttendanceReport.objects.filter(student=student).count()
-    total_present = AttendanceReport.objects.filter(student=student, status=True).count()
+    # Counters are maintained per (student, subject, session); sum over sessions
+    per_subject = {
+        row["subject_id"]: row
+        for row in StudentSubjectAttendanceSummary.objects.filter(student=student)
+        .values("subject_id")
+        .annotate(present=Sum("present"), absent=Sum("absent"))
+    }
+    total_present = sum(row["present"] for row in per_subject.values())
+    total_attendance = total_present + sum(row["absent"] for row in per_subject.values())
     if total_attendance == 0:  # Don't divide. DivisionByZero
         percent_absent = percent_present = 0
     else:
@@ -33,18 +44,11 @@ def student_home(request):
     data_absent = []
     subjects = Subject.objects.filter(courses=student.course)
     for subject in subjects:
-        attendance = Attendance.objects.filter(subject=subject)
-        present_count = AttendanceReport.objects.filter(
-            attendance__in=attendance, status=True, student=student).count()
-        absent_count = AttendanceReport.objects.filter(
-            attendance__in=attendance, status=False, student=student).count()
+        counts = per_subject.get(subject.id, {})
         subject_name.append(subject.name)
-        data_present.append(present_count)
-        data_absent.append(absent_count)
-    now = timezone.now()
-    days = [now - timedelta(days=i) for i in range(6, -1, -1)]
-    notif_labels = [d.strftime("%b %d") for d in days]
-    notif_counts = [NotificationStudent.objects.filter(student=student, created_at__date=d.date()).count() for d in days]
+        data_present.append(counts.get("present", 0))
+        data_absent.append(counts.get("absent", 0))
+    notif_labels, notif_counts = bucket_counts(NotificationStudent.objects.filter(student=student), "created_at", days=7)
     recent_notifications = NotificationStudent.objects.filter(student=student).order_by('-created_at')[:10]
 
     context = {
@@ -66,29 +70,13 @@ def student_home(request):
 
 
 def student_timetable(request):
+    from .timetable_cache import grid_response, section_grid
+
     student = get_object_or_404(Student, admin=request.user)
     # Filter strictly by the student's section and session so students
     # only see their own section's timetable, not the entire course.
-    entries = (
-        TimetableEntry.objects
-        .filter(session=student.session, section=student.section)
-        .select_related("subject", "staff", "room")
-    )
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri"]
-    grid = {d: [None] * 6 for d in days}
-    for e in entries:
-        if 1 <= e.period_number <= 6:
-            end_p = min(e.period_number + max(1, int(getattr(e, "duration_periods", 1))) - 1, 6)
-            for p in range(e.period_number, end_p + 1):
-                grid[e.day][p - 1] = e
-    day_rows = [(d, grid[d]) for d in days]
-    context = {
-        "page_title": "My Timetable",
-        "days": days,
-        "day_rows": day_rows,
-        "slot_labels": ["9-10", "10-11", "11-12", "12-1", "1-2", "2-3"],
-    }
-    return render(request, "student_template/timetable.html", context)
+    grid = section_grid(student.session_id, student.section_id)
+    return grid_response(request, grid, "student_template/timetable.html", {"page_title": "My Timetable"})
 
 
 def student_extra_classes(request):
@@ -275,18 +263,47 @@ def student_fcmtoken(request):
 
 
 def student_view_notification(request):
+    from .notifications import inbox_page
+
     student = get_object_or_404(Student, admin=request.user)
-    notifications = NotificationStudent.objects.filter(student=student)
+    cursor = request.GET.get("after")
+    notifications, next_cursor = inbox_page(
+        NotificationStudent.objects.filter(student=student), cursor, settings.NOTIFICATIONS_PER_PAGE
+    )
     context = {
         'notifications': notifications,
+        'next_cursor': next_cursor,
+        'cursor': cursor,
         'page_title': "View Notifications"
     }
     return render(request, "student_template/student_view_notification.html", context)
 
 
+def student_mark_notifications_read(request):
+    from .notifications import mark_read
+
+    student = get_object_or_404(Student, admin=request.user)
+    if request.method == 'POST':
+        ids = None if request.POST.get('all') else request.POST.getlist('ids')
+        marked = mark_read(NotificationStudent.objects.filter(student=student), request.user.id, ids)
+        messages.success(request, f"Marked {marked} notification(s) as read")
+    url = reverse('student_view_notification')
+    if request.POST.get('after'):
+        url += '?' + urlencode({'after': request.POST['after']})
+    return redirect(url)
+
+
 def student_view_result(request):
+    from .results import grade_sheet
+
     student = get_object_or_404(Student, admin=request.user)
-    results = StudentResult.objects.filter(student=student)
+    queryset = StudentResult.objects.filter(student=student)
+    results = list(queryset.select_related("subject").order_by("subject__name", "subject_id", "id"))
+    # Same totals and grades as the staff grade sheet, which uses this order
+    sheet = grade_sheet(queryset)
+    for result, total, grade, passed in zip(results, sheet["total"].tolist(), sheet["grade"].tolist(),
+                                            sheet["passed"].tolist()):
+        result.total, result.grade, result.passed = total, grade, passed
     context = {
         'results': results,
         'page_title': "View Results"
@@ -340,44 +357,35 @@ def student_available_tests(request):
 
 def student_take_test(request, test_id: int):
     student = get_object_or_404(Student, admin=request.user)
-    test = get_object_or_404(MCQTest, id=test_id, subject__courses=student.course, is_active=True)
+    test = get_object_or_404(
+        MCQTest.objects.select_related("subject"), id=test_id, subject__courses=student.course, is_active=True
+    )
     # Enforce schedule: block access before scheduled time
     now = timezone.now()
     if test.scheduled_at and test.scheduled_at > now and request.method != "POST":
         messages.info(request, "This test will be available at %s" % test.scheduled_at)
         return redirect(reverse("student_available_tests"))
-    questions = MCQQuestion.objects.filter(test=test).prefetch_related("options")
+    # Questions and answer key come from the cached snapshot, not the database
+    snapshot = get_snapshot(test)
     # Check if already submitted
     existing = MCQSubmission.objects.filter(test=test, student=student).first()
-    if existing and request.method != "POST":
-        messages.info(request, "You have already submitted this test. Score: %d" % existing.score)
     if request.method == "POST":
         if existing:
             messages.info(request, "You already submitted this test.")
             return redirect(reverse("student_available_tests"))
-        # Evaluate answers
-        score = 0
-        submission = MCQSubmission.objects.create(test=test, student=student, score=0)
-        for q in questions:
-            key = f"q_{q.id}"
-            selected_option_id = request.POST.get(key)
-            if not selected_option_id:
-                continue
-            try:
-                opt = MCQOption.objects.get(id=int(selected_option_id), question=q)
-            except MCQOption.DoesNotExist:
-                continue
-            MCQAnswer.objects.create(submission=submission, question=q, selected_option=opt)
-            if opt.is_correct:
-                score += 1
-        submission.score = score
-        submission.save(update_fields=["score"])
-        messages.success(request, f"Submitted! Your score: {score} / {questions.count()}")
+        # Only store the answers here; the grading job scores them in batches
+        receive_submission(test, student, snapshot, request.POST)
+        messages.success(request, "Submission received. Your score will be shown on this test's page shortly.")
         return redirect(reverse("student_available_tests"))
+    if existing:
+        messages.info(request, "You have already submitted this test. Score: %d / %d" % (
+            existing.score, len(snapshot["key"])))
+    elif MCQSubmissionInbox.objects.filter(test=test, student=student).exists():
+        messages.info(request, "Your submission has been received and is being graded.")
     context = {
         "page_title": f"Take Test - {test.title}",
         "test": test,
-        "questions": questions,
+        "questions": snapshot["questions"],
     }
     return render(request, "student_template/student_take_test.html", context)
 
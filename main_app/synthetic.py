@@ -0,0 +1,262 @@
+"""
+Synthetic institution generator used for load testing.
+
+``generate_institution`` fills the database with a parameterised college
+(courses, sections, staff, students, subjects, rooms, weeks of attendance,
+notifications, MCQ tests with submissions and fee payments) using
+``bulk_create`` throughout, so even large datasets are written in a few
+hundred queries. The same seed always produces the same data.
+
+Every generated email and room name carries ``prefix`` so several datasets
+can live side by side and be found again.
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .attendance import rebuild_summaries
+from .models import (
+    Attendance,
+    AttendanceReport,
+    Course,
+    CustomUser,
+    FeePayment,
+    MCQAnswer,
+    MCQOption,
+    MCQQuestion,
+    MCQSubmission,
+    MCQTest,
+    NotificationStaff,
+    NotificationStudent,
+    Room,
+    Section,
+    Session,
+    Staff,
+    Student,
+    Subject,
+)
+from .notifications import recount_unread
+
+BATCH = 2000
+PASSWORD = "synthetic"
+
+
+@dataclass
+class InstitutionSpec:
+    courses: int = 4
+    sections_per_course: int = 2
+    staff: int = 40
+    students: int = 1000
+    subjects_per_course: int = 6
+    rooms: int = 20
+    weeks: int = 4
+    notifications_per_user: int = 5
+    mcq_tests_per_subject: int = 1
+    questions_per_test: int = 5
+    mcq_participation: float = 0.8
+    seed: int = 0
+    prefix: str = "syn"
+
+
+def _create_users(spec, kind, count, user_type, password):
+    CustomUser.objects.bulk_create(
+        [
+            CustomUser(
+                email=f"{spec.prefix}-{kind}{i}@synthetic.local", password=password, user_type=user_type,
+                first_name=f"{kind.title()}{i}", last_name=spec.prefix, gender="MF"[i % 2],
+                address="Synthetic", profile_pic="blank-profile-picture-973460_640.webp",
+            )
+            for i in range(count)
+        ],
+        batch_size=BATCH,
+    )
+    return list(
+        CustomUser.objects.filter(email__startswith=f"{spec.prefix}-{kind}", email__endswith="@synthetic.local")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def _weekdays(weeks, end):
+    start = end - timedelta(days=7 * weeks - 1)
+    return [start + timedelta(days=i) for i in range(7 * weeks) if (start + timedelta(days=i)).weekday() < 5]
+
+
+def generate_institution(spec: InstitutionSpec = None, today: date = None) -> dict:
+    """
+    Write the institution described by ``spec`` and return the number of
+    rows created per model. Users get the password ``"synthetic"``.
+    """
+    spec = spec or InstitutionSpec()
+    rng = random.Random(spec.seed)
+    today = today or date.today()
+    password = make_password(PASSWORD)
+    counts = {}
+
+    with transaction.atomic():
+        session = Session.objects.create(start_year=today - timedelta(days=180), end_year=today + timedelta(days=180))
+
+        Course.objects.bulk_create([Course(name=f"{spec.prefix} Course {i}") for i in range(spec.courses)])
+        courses = list(Course.objects.filter(name__startswith=f"{spec.prefix} Course ").order_by("id"))
+        Section.objects.bulk_create([
+            Section(course=course, name=chr(ord("A") + i))
+            for course in courses for i in range(spec.sections_per_course)
+        ])
+        sections = list(Section.objects.filter(course__in=courses).order_by("id"))
+        sections_by_course = {}
+        for section in sections:
+            sections_by_course.setdefault(section.course_id, []).append(section)
+
+        # bulk_create skips the post_save signal that normally adds the profile rows
+        staff_users = _create_users(spec, "staff", spec.staff, 2, password)
+        Staff.objects.bulk_create([
+            Staff(admin_id=user_id, course=courses[i % len(courses)]) for i, user_id in enumerate(staff_users)
+        ])
+        staff = list(Staff.objects.filter(admin_id__in=staff_users).order_by("id"))
+        staff_by_course = {}
+        for member in staff:
+            staff_by_course.setdefault(member.course_id, []).append(member)
+        Staff.sections.through.objects.bulk_create([
+            Staff.sections.through(staff_id=member.id, section_id=section.id)
+            for member in staff for section in sections_by_course[member.course_id]
+        ], batch_size=BATCH)
+
+        student_users = _create_users(spec, "student", spec.students, 3, password)
+        student_rows = []
+        for i, user_id in enumerate(student_users):
+            course = courses[i % len(courses)]
+            student_rows.append(Student(admin_id=user_id, course=course, session=session,
+                                        section=rng.choice(sections_by_course[course.id])))
+        Student.objects.bulk_create(student_rows, batch_size=BATCH)
+        students = list(Student.objects.filter(admin_id__in=student_users).order_by("id")
+                        .values_list("id", "course_id"))
+        students_by_course = {}
+        for student_id, course_id in students:
+            students_by_course.setdefault(course_id, []).append(student_id)
+
+        subject_rows = []
+        for course in courses:
+            teachers = staff_by_course.get(course.id) or staff
+            for i in range(spec.subjects_per_course):
+                name = f"{spec.prefix} {course.name[len(spec.prefix) + 1:]} Subject {i}"
+                if i == spec.subjects_per_course - 1:
+                    name += " Lab"
+                subject_rows.append(Subject(name=name, staff=teachers[i % len(teachers)], credits=rng.randint(2, 4)))
+        Subject.objects.bulk_create(subject_rows)
+        subjects = list(Subject.objects.filter(name__startswith=f"{spec.prefix} Course ").order_by("id"))
+        subject_course = {}
+        for subject, course in zip(subjects, [c for c in courses for _ in range(spec.subjects_per_course)]):
+            subject_course[subject.id] = course.id
+        Subject.courses.through.objects.bulk_create([
+            Subject.courses.through(subject_id=subject_id, course_id=course_id)
+            for subject_id, course_id in subject_course.items()
+        ], batch_size=BATCH)
+        Subject.sections.through.objects.bulk_create([
+            Subject.sections.through(subject_id=subject_id, section_id=section.id)
+            for subject_id, course_id in subject_course.items() for section in sections_by_course[course_id]
+        ], batch_size=BATCH)
+
+        Room.objects.bulk_create([
+            Room(name=f"{spec.prefix}-R{i}", capacity=rng.choice((40, 60, 80, 120))) for i in range(spec.rooms)
+        ])
+
+        # Attendance: each subject meets ``credits`` times a week over ``weeks`` weeks
+        days = _weekdays(spec.weeks, today)
+        Attendance.objects.bulk_create([
+            Attendance(session=session, subject=subject, date=day)
+            for subject in subjects
+            for week in range(spec.weeks)
+            for day in rng.sample(days[week * 5:week * 5 + 5], min(subject.credits, 5))
+        ], batch_size=BATCH)
+        attendance = list(Attendance.objects.filter(subject__in=subjects).values_list("id", "subject_id"))
+        reports = 0
+        for start in range(0, len(attendance), 50):
+            chunk = [
+                AttendanceReport(student_id=student_id, attendance_id=attendance_id, status=rng.random() < 0.8)
+                for attendance_id, subject_id in attendance[start:start + 50]
+                for student_id in students_by_course.get(subject_course[subject_id], [])
+            ]
+            AttendanceReport.objects.bulk_create(chunk, batch_size=BATCH)
+            reports += len(chunk)
+        rebuild_summaries([student_id for student_id, _ in students])
+
+        NotificationStaff.objects.bulk_create([
+            NotificationStaff(staff=member, message=f"Synthetic notice {n}")
+            for member in staff for n in range(spec.notifications_per_user)
+        ], batch_size=BATCH)
+        NotificationStudent.objects.bulk_create([
+            NotificationStudent(student_id=student_id, message=f"Synthetic notice {n}")
+            for student_id, _ in students for n in range(spec.notifications_per_user)
+        ], batch_size=BATCH)
+        recount_unread([*staff_users, *student_users])
+
+        counts["mcq"] = _generate_mcq(spec, rng, subjects, subject_course, students_by_course, today)
+
+        FeePayment.objects.bulk_create([
+            FeePayment(student_id=student_id, session=session, amount=Decimal(rng.choice((25000, 40000, 55000))),
+                       receipt="fees/synthetic.pdf", status=rng.choice(("pending", "approved", "rejected")))
+            for student_id, _ in students
+        ], batch_size=BATCH)
+
+    counts.update({
+        "session": session.id,
+        "courses": len(courses),
+        "sections": len(sections),
+        "staff": len(staff),
+        "students": len(students),
+        "subjects": len(subjects),
+        "rooms": spec.rooms,
+        "attendance": len(attendance),
+        "attendance_reports": reports,
+        "notifications": spec.notifications_per_user * (len(staff) + len(students)),
+        "fee_payments": len(students),
+    })
+    return counts
+
+
+def _generate_mcq(spec, rng, subjects, subject_course, students_by_course, today) -> dict:
+    """MCQ tests with four options per question and answered submissions."""
+    MCQTest.objects.bulk_create([
+        MCQTest(title=f"{spec.prefix} Test {subject.id}.{n}", subject=subject, staff_id=subject.staff_id,
+                is_active=True)
+        for subject in subjects for n in range(spec.mcq_tests_per_subject)
+    ])
+    tests = list(MCQTest.objects.filter(subject__in=subjects, title__startswith=f"{spec.prefix} Test ").order_by("id"))
+    MCQQuestion.objects.bulk_create([
+        MCQQuestion(test=test, text=f"Question {n}") for test in tests for n in range(spec.questions_per_test)
+    ], batch_size=BATCH)
+    questions = list(MCQQuestion.objects.filter(test__in=tests).order_by("id").values_list("id", "test_id"))
+    MCQOption.objects.bulk_create([
+        MCQOption(question_id=question_id, text=f"Option {n}", is_correct=n == 0)
+        for question_id, _ in questions for n in range(4)
+    ], batch_size=BATCH)
+    options = {}
+    for option_id, question_id in MCQOption.objects.filter(question_id__in=[q for q, _ in questions]) \
+            .order_by("id").values_list("id", "question_id"):
+        options.setdefault(question_id, []).append(option_id)
+    questions_by_test = {}
+    for question_id, test_id in questions:
+        questions_by_test.setdefault(test_id, []).append(question_id)
+
+    picks = {}
+    for test in tests:
+        for student_id in students_by_course.get(subject_course[test.subject_id], []):
+            if rng.random() < spec.mcq_participation:
+                picks[(test.id, student_id)] = [(q, rng.choice(options[q])) for q in questions_by_test.get(test.id, [])]
+    MCQSubmission.objects.bulk_create([
+        MCQSubmission(test_id=test_id, student_id=student_id,
+                      score=sum(1 for q, o in answers if o == options[q][0]))
+        for (test_id, student_id), answers in picks.items()
+    ], batch_size=BATCH)
+    submissions = MCQSubmission.objects.filter(test__in=tests).values_list("id", "test_id", "student_id")
+    answers = [
+        MCQAnswer(submission_id=submission_id, question_id=q, selected_option_id=o)
+        for submission_id, test_id, student_id in submissions.iterator()
+        for q, o in picks.get((test_id, student_id), [])
+    ]
+    MCQAnswer.objects.bulk_create(answers, batch_size=BATCH)
+    return {"tests": len(tests), "questions": len(questions), "submissions": len(picks), "answers": len(answers)}
@@ -0,0 +1,196 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main_app.models import (
+    Attendance,
+    AttendanceReport,
+    Course,
+    CustomUser,
+    Session,
+    StudentSubjectAttendanceSummary,
+    Subject,
+)
+
+
+class AttendanceTestMixin:
+    def setUp(self):
+        self.session = Session.objects.create(start_year="2024-01-01", end_year="2025-01-01")
+        self.course = Course.objects.create(name="CSE")
+        user = CustomUser.objects.create_user(
+            email="staff@example.com", password="pass", user_type=2, gender="M",
+            address="Test", profile_pic="pic.jpg",
+        )
+        self.staff_user = user
+        self.subject = Subject.objects.create(name="Algo", staff=user.staff, credits=3)
+        self.subject.courses.add(self.course)
+        self.students = []
+        self.client.force_login(user)
+
+    def add_students(self, count):
+        for _ in range(count):
+            n = len(self.students)
+            user = CustomUser.objects.create_user(
+                email=f"st{n}@example.com", password="pass", user_type=3, gender="F",
+                address="Test", profile_pic="pic.jpg",
+            )
+            self.students.append(user.student)
+
+    def save(self, statuses, date="2024-03-01", token=""):
+        return self.client.post(reverse("save_attendance"), {
+            "student_ids": json.dumps([{"id": s.id, "status": status} for s, status in statuses]),
+            "date": date,
+            "subject": self.subject.id,
+            "session": self.session.id,
+            "token": token,
+        })
+
+
+class SaveAttendanceTests(AttendanceTestMixin, TestCase):
+    def test_saves_all_reports_with_constant_queries(self):
+        def queries_for(count, date):
+            self.add_students(count)
+            statuses = [(s, i % 2) for i, s in enumerate(self.students)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.save(statuses, date=date)
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(3, "2024-03-01"), queries_for(40, "2024-03-02"))
+        attendance = Attendance.objects.get(date="2024-03-02")
+        self.assertEqual(AttendanceReport.objects.filter(attendance=attendance).count(), 43)
+
+    def test_double_submit_is_idempotent(self):
+        self.add_students(4)
+        statuses = [(s, 1) for s in self.students]
+
+        first = self.save(statuses, token="form-1").json()
+        second = self.save(statuses, token="form-1").json()
+
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(AttendanceReport.objects.count(), 4)
+        self.assertEqual((first["created"], first["duplicate"], first["present"]), (4, False, 4))
+        self.assertEqual((second["created"], second["updated"], second["duplicate"]), (0, 0, True))
+
+    def test_second_class_on_the_same_day_is_kept_apart(self):
+        self.add_students(2)
+        self.save([(s, 1) for s in self.students], token="form-1")
+        second = self.save([(s, 0) for s in self.students], token="form-2").json()
+
+        self.assertFalse(second["duplicate"])
+        self.assertEqual(Attendance.objects.filter(date="2024-03-01").count(), 2)
+        self.assertEqual(AttendanceReport.objects.filter(status=True).count(), 2)
+        summary = StudentSubjectAttendanceSummary.objects.get(student=self.students[0])
+        self.assertEqual((summary.present, summary.absent), (1, 1))
+
+    def test_token_of_another_class_is_rejected(self):
+        self.add_students(1)
+        self.save([(self.students[0], 1)], token="form-1")
+        response = self.save([(self.students[0], 0)], date="2024-03-02", token="form-1")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AttendanceReport.objects.get().status, True)
+
+    def test_unknown_student_writes_nothing(self):
+        self.add_students(2)
+        response = self.client.post(reverse("save_attendance"), {
+            "student_ids": json.dumps([{"id": self.students[0].id, "status": 1}, {"id": 99999, "status": 1}]),
+            "date": "2024-03-01",
+            "subject": self.subject.id,
+            "session": self.session.id,
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["status"], "error")
+        self.assertFalse(Attendance.objects.exists())
+        self.assertFalse(AttendanceReport.objects.exists())
+
+
+class UpdateAttendanceTests(AttendanceTestMixin, TestCase):
+    def update(self, attendance, statuses):
+        return self.client.post(reverse("update_attendance"), {
+            "student_ids": json.dumps([{"id": s.admin_id, "status": status} for s, status in statuses]),
+            "date": attendance.id,
+        })
+
+    def test_updates_only_changed_reports_with_constant_queries(self):
+        def queries_for(count, date):
+            self.students = []
+            self.add_students_offset(count, date)
+            self.save([(s, 0) for s in self.students], date=date)
+            attendance = Attendance.objects.get(date=date)
+            statuses = [(s, 1 if i < 2 else 0) for i, s in enumerate(self.students)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.update(attendance, statuses)
+            self.assertEqual(response.json()["changed"], 2)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(3, "2024-03-01"), queries_for(30, "2024-03-02"))
+        self.assertEqual(AttendanceReport.objects.filter(status=True).count(), 4)
+
+    def add_students_offset(self, count, tag):
+        for n in range(count):
+            user = CustomUser.objects.create_user(
+                email=f"{tag}-{n}@example.com", password="pass", user_type=3, gender="F",
+                address="Test", profile_pic="pic.jpg",
+            )
+            self.students.append(user.student)
+
+    def test_unknown_student_is_rejected(self):
+        self.add_students(2)
+        self.save([(s, 0) for s in self.students])
+        attendance = Attendance.objects.get()
+        outsider = CustomUser.objects.create_user(
+            email="outsider@example.com", password="pass", user_type=3, gender="F",
+            address="Test", profile_pic="pic.jpg",
+        ).student
+
+        response = self.update(attendance, [(self.students[0], 1), (outsider, 1)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AttendanceReport.objects.filter(status=True).exists())
+
+
+class AttendanceSummaryTests(AttendanceTestMixin, TestCase):
+    def summary(self):
+        return sorted(
+            StudentSubjectAttendanceSummary.objects.values_list("student_id", "present", "absent", "total")
+        )
+
+    def test_counters_follow_saves_and_updates_and_match_rebuild(self):
+        self.add_students(3)
+        a, b, c = self.students
+        self.save([(a, 1), (b, 0), (c, 1)], date="2024-03-01", token="form-1")
+        self.save([(a, 1), (b, 1), (c, 0)], date="2024-03-02", token="form-2")
+        self.save([(a, 1), (b, 1), (c, 0)], date="2024-03-02", token="form-2")  # double submit
+        attendance = Attendance.objects.get(date="2024-03-01")
+        self.client.post(reverse("update_attendance"), {
+            "student_ids": json.dumps([{"id": b.admin_id, "status": 1}, {"id": c.admin_id, "status": 0}]),
+            "date": attendance.id,
+        })
+
+        incremental = self.summary()
+        self.assertEqual(incremental, [(a.id, 2, 0, 2), (b.id, 2, 0, 2), (c.id, 0, 2, 2)])
+
+        StudentSubjectAttendanceSummary.objects.update(present=0, absent=0, total=0)
+        call_command("rebuild_attendance_summary", stdout=StringIO())
+        self.assertEqual(self.summary(), incremental)
+
+    def test_deletions_come_off_the_counters(self):
+        self.add_students(3)
+        a, b, c = self.students
+        self.save([(a, 1), (b, 0), (c, 1)], date="2024-03-01", token="form-1")
+        self.save([(a, 0), (b, 1), (c, 1)], date="2024-03-02", token="form-2")
+        self.save([(a, 1), (b, 1), (c, 0)], date="2024-03-03", token="form-3")
+
+        Attendance.objects.get(date="2024-03-01").delete()
+        AttendanceReport.objects.get(attendance__date="2024-03-02", student=c).delete()
+        self.assertEqual(self.summary(), [(a.id, 1, 1, 2), (b.id, 2, 0, 2), (c.id, 0, 1, 1)])
+
+        Attendance.objects.filter(date__gte="2024-03-02").delete()
+        self.assertEqual(self.summary(), [(a.id, 0, 0, 0), (b.id, 0, 0, 0), (c.id, 0, 0, 0)])
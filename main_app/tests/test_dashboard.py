@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from main_app.attendance import rebuild_summaries
+from main_app.dashboard import admin_aggregates, compute_admin_aggregates
+from main_app.models import (
+    Attendance,
+    AttendanceReport,
+    Course,
+    CustomUser,
+    LeaveReportStudent,
+    Session,
+    Subject,
+)
+
+
+class AdminAggregatesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create(start_year="2024-01-01", end_year="2025-01-01")
+        self.course = Course.objects.create(name="CSE")
+        staff_user = CustomUser.objects.create_user(
+            email="staff@example.com", password="pass", user_type=2, gender="M",
+            address="Test", profile_pic="pic.jpg",
+        )
+        self.subject = Subject.objects.create(name="Algorithms", staff=staff_user.staff, credits=3)
+        self.subject.courses.add(self.course)
+        self.students = []
+
+    def add_students(self, count):
+        for _ in range(count):
+            n = len(self.students)
+            user = CustomUser.objects.create_user(
+                email=f"st{n}@example.com", password="pass", user_type=3, gender="F",
+                address="Test", profile_pic="pic.jpg", first_name=f"S{n}",
+            )
+            student = user.student
+            student.course = self.course
+            student.save()
+            self.students.append(student)
+
+    def test_aggregates_match_per_row_counts(self):
+        self.add_students(3)
+        attendance = Attendance.objects.create(session=self.session, subject=self.subject, date=timezone.localdate())
+        AttendanceReport.objects.create(student=self.students[0], attendance=attendance, status=True)
+        AttendanceReport.objects.create(student=self.students[1], attendance=attendance, status=False)
+        LeaveReportStudent.objects.create(student=self.students[1], date="2024-01-01", message="x", status=1)
+        rebuild_summaries()
+
+        data = compute_admin_aggregates()
+
+        self.assertEqual(data["total_students"], 3)
+        self.assertEqual(data["subject_list"], ["Algorithms"])
+        self.assertEqual(data["attendance_list"], [1])
+        self.assertEqual(data["student_count_list_in_subject"], [3])
+        self.assertEqual(data["course_name_list"], ["CSE"])
+        self.assertEqual(data["student_count_list_in_course"], [3])
+        self.assertEqual(data["student_attendance_present_list"], [1, 0, 0])
+        self.assertEqual(data["student_attendance_leave_list"], [0, 2, 0])
+        self.assertEqual(data["att_counts"][-1], 1)
+
+    def test_query_count_does_not_grow_with_students_and_is_cached(self):
+        def queries_for(count):
+            self.add_students(count)
+            with CaptureQueriesContext(connection) as ctx:
+                compute_admin_aggregates()
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(2), queries_for(8))
+
+        admin_aggregates()
+        with CaptureQueriesContext(connection) as ctx:
+            admin_aggregates()
+        self.assertEqual(len(ctx.captured_queries), 0)
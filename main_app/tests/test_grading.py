@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from main_app.grading import AnswerKey, get_snapshot, grade_inbox, receive_submission
+from main_app.jobs import run_pending
+from main_app.models import (
+    Course, CustomUser, Job, MCQAnswer, MCQOption, MCQQuestion, MCQSubmission, MCQSubmissionInbox, MCQTest,
+    Semester, Subject,
+)
+
+
+def make_user(n, user_type):
+    return CustomUser.objects.create_user(
+        email=f"grading{n}@example.com", password=None, user_type=user_type, gender="F",
+        address="Test", profile_pic="pic.jpg", first_name="First", last_name="Last",
+    )
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class GradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(name="CSE")
+        self.staff = staff = make_user(1, 2).staff
+        self.student = make_user(2, 3).student
+        self.student.course = course
+        self.student.save()
+        subject = Subject.objects.create(name="Networks", staff=staff, credits=3,
+                                         semester=Semester.objects.create(number=4))
+        subject.courses.add(course)
+        self.test = MCQTest.objects.create(title="Quiz", subject=subject, staff=staff)
+        self.correct, self.wrong = {}, {}
+        for n in range(3):
+            question = MCQQuestion.objects.create(test=self.test, text=f"Q{n}")
+            self.correct[question.id] = MCQOption.objects.create(question=question, text="yes", is_correct=True).id
+            self.wrong[question.id] = MCQOption.objects.create(question=question, text="no").id
+
+    def key(self):
+        return AnswerKey.from_questions(MCQQuestion.objects.filter(test=self.test).prefetch_related("options"))
+
+    def test_grade(self):
+        q1, q2, q3 = sorted(self.correct)
+        score, picks = self.key().grade({
+            f"q_{q1}": str(self.correct[q1]),
+            f"q_{q2}": str(self.wrong[q2]),
+            # An option of another question, and garbage, are both ignored
+            f"q_{q3}": str(self.correct[q1]),
+            "q_999": "abc",
+        })
+        self.assertEqual(score, 1)
+        self.assertEqual(picks, [(q1, self.correct[q1]), (q2, self.wrong[q2])])
+
+    def test_inbox_is_idempotent_and_graded_in_batches(self):
+        other = make_user(3, 3).student
+        snapshot = get_snapshot(self.test)
+        right = {f"q_{q}": str(o) for q, o in self.correct.items()}
+        for _ in range(2):
+            receive_submission(self.test, self.student, snapshot, right)
+        receive_submission(self.test, other, snapshot, {f"q_{q}": str(o) for q, o in self.wrong.items()})
+        self.assertEqual(MCQSubmissionInbox.objects.count(), 2)
+        self.assertEqual(Job.objects.filter(name="mcq.grade_inbox").count(), 1)
+        self.assertFalse(MCQSubmission.objects.exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(grade_inbox(batch_size=1), {"graded": 2, "skipped": 0})
+        self.assertLess(len(ctx.captured_queries), 25)
+        scores = dict(MCQSubmission.objects.values_list("student_id", "score"))
+        self.assertEqual(scores, {self.student.id: 3, other.id: 0})
+        self.assertEqual(MCQAnswer.objects.count(), 6)
+        self.assertFalse(MCQSubmissionInbox.objects.filter(graded_at__isnull=True).exists())
+        # Nothing left to grade
+        self.assertEqual(grade_inbox(), {"graded": 0, "skipped": 0})
+
+    def test_view_acknowledges_then_job_grades(self):
+        self.client.force_login(self.student.admin)
+        url = reverse("student_take_test", args=[self.test.id])
+        data = {f"q_{q}": str(o) for q, o in self.correct.items()}
+        self.assertContains(self.client.post(url, data, follow=True), "Submission received")
+        self.assertContains(self.client.get(url), "being graded")
+        self.assertContains(self.client.post(url, data, follow=True), "Submission received")
+
+        Job.objects.update(run_at=timezone.now())
+        run_pending("w1")
+        self.assertContains(self.client.get(url), "Score: 3 / 3")
+        self.assertEqual(MCQSubmission.objects.get().score, 3)
+
+    def test_snapshot_matches_key_and_is_served_from_cache(self):
+        snapshot = get_snapshot(self.test)
+        self.assertEqual(snapshot["key"], self.key().options)
+        self.assertEqual([q["id"] for q in snapshot["questions"]], sorted(self.correct))
+
+        self.client.force_login(self.student.admin)
+        url = reverse("student_take_test", args=[self.test.id])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertContains(self.client.get(url), "Q2")
+        self.assertFalse([q for q in ctx.captured_queries if "main_app_mcqquestion" in q["sql"]])
+
+    def test_edits_publish_a_new_snapshot(self):
+        self.client.force_login(self.student.admin)
+        url = reverse("student_take_test", args=[self.test.id])
+        self.client.get(url)
+
+        self.client.force_login(self.staff.admin)
+        self.client.post(reverse("staff_add_question", args=[self.test.id]), {
+            "question_text": "Fresh question", "option1": "a", "option2": "b", "option3": "c", "option4": "d",
+            "correct_option": "2",
+        })
+        self.test.refresh_from_db()
+        self.assertEqual(self.test.snapshot_version, 1)
+
+        self.client.force_login(self.student.admin)
+        self.assertContains(self.client.get(url), "Fresh question")
+        question = MCQQuestion.objects.get(text="Fresh question")
+        self.assertEqual([o for o, ok in get_snapshot(self.test)["key"][question.id].items() if ok],
+                         [question.options.get(text="b").id])
+
+        self.client.force_login(self.staff.admin)
+        self.client.post(reverse("staff_toggle_test_active", args=[self.test.id]))
+        self.test.refresh_from_db()
+        self.assertEqual((self.test.is_active, self.test.snapshot_version), (False, 2))
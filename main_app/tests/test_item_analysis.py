@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main_app.grading import get_snapshot
+from main_app.item_analysis import analyse_test
+from main_app.models import (
+    Course, CustomUser, MCQAnswer, MCQOption, MCQQuestion, MCQSubmission, MCQTest, Semester, Subject,
+)
+
+
+def make_user(n, user_type):
+    return CustomUser.objects.create_user(
+        email=f"analysis{n}@example.com", password=None, user_type=user_type, gender="F",
+        address="Test", profile_pic="pic.jpg", first_name="First", last_name="Last",
+    )
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class ItemAnalysisTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(name="CSE")
+        self.staff_user = make_user(0, 2)
+        subject = Subject.objects.create(name="Networks", staff=self.staff_user.staff, credits=3,
+                                         semester=Semester.objects.create(number=4))
+        self.test = MCQTest.objects.create(title="Quiz", subject=subject, staff=self.staff_user.staff)
+        self.questions = []
+        for n in range(3):
+            question = MCQQuestion.objects.create(test=self.test, text=f"Q{n}")
+            right = MCQOption.objects.create(question=question, text="yes", is_correct=True)
+            wrong = MCQOption.objects.create(question=question, text="no")
+            self.questions.append((question, right, wrong))
+        self.students = 0
+
+    def submit(self, *picks):
+        """One submission; ``picks`` holds "r", "w" or None per question."""
+        self.students += 1
+        student = make_user(self.students, 3).student
+        score = picks.count("r")
+        submission = MCQSubmission.objects.create(test=self.test, student=student, score=score)
+        for (question, right, wrong), pick in zip(self.questions, picks):
+            if pick:
+                MCQAnswer.objects.create(submission=submission, question=question,
+                                         selected_option=right if pick == "r" else wrong)
+
+    def test_statistics(self):
+        # Q0 is answered right by the stronger students, Q1 only by a weak one
+        self.submit("r", "w", "r")
+        self.submit("r", "w", "r")
+        self.submit("r", "w", "w")
+        self.submit("w", "w", None)
+        self.submit("w", "r", "w")
+        report = analyse_test(self.test)
+
+        self.assertEqual(report["submissions"], 5)
+        self.assertEqual(report["distribution"], [1, 2, 2, 0])
+        self.assertEqual(report["mean"], 1.2)
+        self.assertEqual((report["min"], report["max"]), (0, 2))
+        self.assertEqual(report["percentiles"][50], 1)
+        q0, q1, q2 = report["items"]
+        self.assertEqual([q0["difficulty"], q1["difficulty"], q2["difficulty"]], [0.6, 0.2, 0.4])
+        self.assertGreater(q0["discrimination"], 0)
+        self.assertLess(q1["discrimination"], 0)
+        self.assertEqual(q2["omitted"], 1)
+        self.assertEqual([(o["text"], o["correct"], o["count"]) for o in q1["options"]],
+                         [("yes", True, 1), ("no", False, 4)])
+        self.assertEqual(q1["options"][1]["share"], 0.8)
+
+    def test_incremental_update_matches_full_computation(self):
+        self.submit("r", "w", "r")
+        self.submit("w", "w", None)
+        analyse_test(self.test)
+        self.submit("r", "r", "r")
+        with CaptureQueriesContext(connection) as ctx:
+            report = analyse_test(self.test)
+        # Only the submission added since the cached state is read
+        self.assertTrue(any("> %d" % (MCQSubmission.objects.order_by("id")[1].id) in q["sql"]
+                            for q in ctx.captured_queries))
+        cache.delete(f"mcq:analysis:{self.test.pk}")
+        self.assertEqual(report, analyse_test(self.test))
+        self.assertEqual(report["submissions"], 3)
+
+    def test_edit_starts_over(self):
+        self.submit("r", "r", "r")
+        analyse_test(self.test)
+        question = MCQQuestion.objects.create(test=self.test, text="Q3")
+        MCQOption.objects.create(question=question, text="yes", is_correct=True)
+        MCQTest.objects.filter(pk=self.test.pk).update(snapshot_version=self.test.snapshot_version + 1)
+        self.test.refresh_from_db()
+        report = analyse_test(self.test)
+        self.assertEqual(report["questions"], 4)
+        self.assertEqual(report["items"][3]["omitted"], 1)
+        self.assertEqual(len(get_snapshot(self.test)["questions"]), 4)
+
+    def test_view(self):
+        self.submit("r", "w", "r")
+        self.client.force_login(self.staff_user)
+        url = reverse("staff_test_analysis", args=[self.test.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "scoreChart")
+        self.assertEqual(response.context["analysis"]["submissions"], 1)
+
+        other = make_user(99, 2)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,212 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from main_app import jobs
+from main_app.models import (
+    Course, CustomUser, Job, NotificationStudent, Session, StaffUnavailability, TimetableAuditLog,
+)
+from main_app.notifications import notify_later
+
+
+def make_user(n, user_type):
+    return CustomUser.objects.create_user(
+        email=f"jobs{n}@example.com", password=None, user_type=user_type, gender="F",
+        address="Test", profile_pic="pic.jpg", first_name="First", last_name="Last",
+    )
+
+
+class Flaky:
+    """Handler failing the first ``failures`` calls."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, ctx, value):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("boom")
+        ctx.progress(50, "half way")
+        return {"doubled": value * 2}
+
+
+class JobQueueTests(TestCase):
+    def handler(self, failures=0):
+        flaky = Flaky(failures)
+        patcher = mock.patch.dict(jobs.REGISTRY, {"test.flaky": flaky})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return flaky
+
+    def test_enqueue_and_run(self):
+        self.handler()
+        job = jobs.enqueue("test.flaky", {"value": 21})
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+
+        self.assertEqual(jobs.run_pending("w1"), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.result, {"doubled": 42})
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(jobs.run_pending("w1"), 0)
+
+    def test_unknown_name_is_rejected(self):
+        with self.assertRaises(KeyError):
+            jobs.enqueue("test.missing")
+
+    def test_retries_with_backoff_then_fails(self):
+        self.handler(failures=5)
+        job = jobs.enqueue("test.flaky", {"value": 1}, max_attempts=2)
+
+        jobs.run_pending("w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("boom", job.error)
+        # Not due yet
+        self.assertEqual(jobs.run_pending("w1"), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_pending("w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claimed_job_is_not_claimed_again(self):
+        self.handler()
+        job = jobs.enqueue("test.flaky", {"value": 1})
+
+        claimed = jobs.claim_next("w1")
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.locked_by, "w1")
+        self.assertIsNone(jobs.claim_next("w2"))
+
+    def test_stale_running_job_is_requeued(self):
+        self.handler()
+        jobs.enqueue("test.flaky", {"value": 1})
+        claimed = jobs.claim_next("dead-worker")
+        Job.objects.filter(pk=claimed.pk).update(locked_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(jobs.requeue_stale(60), 1)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Job.STATUS_QUEUED)
+        self.assertGreater(claimed.run_at, timezone.now())
+        # Backs off like a failed attempt
+        self.assertEqual(jobs.run_pending("w1"), 0)
+
+        Job.objects.filter(pk=claimed.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.run_pending("w1"), 1)
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.attempts), (Job.STATUS_DONE, 2))
+
+    def test_stale_job_fails_after_its_last_attempt(self):
+        self.handler()
+        job = jobs.enqueue("test.flaky", {"value": 1}, max_attempts=1)
+        jobs.claim_next("hung-worker")
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(jobs.requeue_stale(60), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn("60s", job.error)
+        self.assertEqual(jobs.run_pending("w1"), 0)
+
+    def test_worker_survives_database_errors(self):
+        self.handler()
+        jobs.enqueue("test.flaky", {"value": 1})
+        command = "main_app.management.commands.run_worker"
+        with mock.patch(f"{command}.close_old_connections") as close, \
+                mock.patch(f"{command}.time.sleep") as sleep, \
+                mock.patch(f"{command}.requeue_stale", side_effect=[OperationalError("database is locked"), 0]), \
+                self.assertLogs("main_app.jobs", "ERROR"):
+            call_command("run_worker", "--max-jobs", "1", "--sleep", "0", stdout=StringIO())
+
+        self.assertEqual(Job.objects.get().status, Job.STATUS_DONE)
+        self.assertEqual(sleep.call_count, 1)
+        # Before each poll and after the failure
+        self.assertEqual(close.call_count, 3)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        self.handler()
+        job = jobs.enqueue("test.flaky", {"value": 2})
+        self.assertEqual((job.status, job.result), (Job.STATUS_DONE, {"doubled": 4}))
+
+    def test_notify_later(self):
+        course = Course.objects.create(name="CSE")
+        for n in range(3):
+            student = make_user(n, 3).student
+            student.course = course
+            student.save()
+        excluded = student
+
+        job = notify_later("student", "Exam moved", course_id=course.id, exclude_ids=[excluded.id])
+        self.assertEqual(NotificationStudent.objects.count(), 0)
+        jobs.run_pending("w1")
+
+        job.refresh_from_db()
+        self.assertEqual(job.result, {"notified": 2})
+        self.assertFalse(NotificationStudent.objects.filter(student=excluded).exists())
+
+    def test_maintenance_reset(self):
+        admin = make_user(1, 1)
+        staff = make_user(2, 2).staff
+        session = Session.objects.create(start_year="2030-01-01", end_year="2031-01-01")
+        StaffUnavailability.objects.create(staff=staff, session=session, day="Mon", period_number=1)
+
+        job = jobs.enqueue("maintenance.reset", {"action": "reset_all", "session_id": session.id,
+                                                 "actor_id": admin.id})
+        jobs.run_pending("w1")
+
+        job.refresh_from_db()
+        self.assertEqual(job.result["unavailability"], 1)
+        self.assertFalse(StaffUnavailability.objects.exists())
+        self.assertTrue(TimetableAuditLog.objects.filter(actor=admin, action="admin_reset").exists())
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class JobViewTests(TestCase):
+    def setUp(self):
+        self.admin = make_user(1, 1)
+        Session.objects.create(start_year="2030-01-01", end_year="2031-01-01")
+
+    def test_auto_generate_is_queued(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse("manage_timetable"), {"auto_generate": "1", "engine": "greedy"})
+        self.assertRedirects(response, reverse("manage_timetable"))
+
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.status, job.created_by), ("timetable.generate", Job.STATUS_QUEUED, self.admin))
+        jobs.run_pending("w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertIn("coverage", job.result)
+
+        page = self.client.get(reverse("manage_timetable"))
+        self.assertContains(page, f"#{job.id}")
+
+    def test_status_visible_to_creator_and_admin_only(self):
+        student = make_user(2, 3)
+        other = make_user(3, 3)
+        job = jobs.enqueue("notifications.notify", {"target": "student", "message": "hi"}, user=student)
+        url = reverse("job_status", args=[job.id])
+
+        self.client.force_login(student)
+        data = self.client.get(url).json()
+        self.assertEqual((data["id"], data["status"], data["progress"]), (job.id, "queued", 0))
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
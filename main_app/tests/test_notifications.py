@@ -0,0 +1,196 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from main_app import notifications
+from main_app.models import (
+    Course, CustomUser, NotificationArchive, NotificationStaff, NotificationStudent, Staff, Student,
+)
+from main_app.notifications import inbox_page, notify, recount_unread, unread_count
+
+
+class RecordingSender:
+    def __init__(self):
+        self.calls = []
+
+    def send(self, tokens, message, click_action="", icon=""):
+        self.calls.append((tokens, message, click_action))
+
+
+def make_user(n, user_type, token=""):
+    return CustomUser.objects.create_user(
+        email=f"user{n}@example.com", password=None, user_type=user_type, gender="F",
+        address="Test", profile_pic="pic.jpg", fcm_token=token,
+    )
+
+
+class NotifyTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CSE")
+
+    def add_students(self, count, start=0):
+        for n in range(start, start + count):
+            student = make_user(n, 3).student
+            student.course = self.course
+            student.save()
+
+    def test_writes_one_row_per_recipient_in_constant_queries(self):
+        def queries_for(count, start):
+            self.add_students(count, start)
+            NotificationStudent.objects.all().delete()
+            with CaptureQueriesContext(connection) as ctx:
+                written = notify(Student.objects.filter(course=self.course), "Class moved")
+            self.assertEqual(written, Student.objects.count())
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(3, 0), queries_for(40, 3))
+        self.assertEqual(NotificationStudent.objects.filter(message="Class moved").count(), 43)
+
+    def test_mixed_instances(self):
+        staff = make_user(100, 2).staff
+        self.add_students(2)
+
+        written = notify([staff, None, *Student.objects.all()], "Hello")
+
+        self.assertEqual(written, 3)
+        self.assertEqual(NotificationStaff.objects.get().staff, staff)
+        self.assertEqual(NotificationStudent.objects.count(), 2)
+
+    def test_push_waits_for_commit(self):
+        make_user(1, 2, token="tok")
+        sender = RecordingSender()
+        with mock.patch.object(notifications, "get_sender", return_value=sender):
+            notify(Staff.objects.all(), "Hello")
+        # TestCase never commits, so nothing is sent
+        self.assertEqual(sender.calls, [])
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class NotifyPushTests(TransactionTestCase):
+    def test_push_sent_in_background_to_devices_with_tokens(self):
+        make_user(1, 2, token="tok-1")
+        make_user(2, 2)
+        sender = RecordingSender()
+        with mock.patch.object(notifications, "get_sender", return_value=sender):
+            notify(Staff.objects.all(), "Hello")
+
+        self.assertEqual(sender.calls, [(["tok-1"], "Hello", "/staff/view/notification/")])
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+                   NOTIFICATIONS_PER_PAGE=25)
+class InboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = make_user(1, 3).student
+        self.client.force_login(self.student.admin)
+
+    def add_notifications(self, count, **fields):
+        NotificationStudent.objects.bulk_create(
+            [NotificationStudent(student=self.student, message=f"m{n}") for n in range(count)]
+        )
+        if fields:
+            NotificationStudent.objects.update(**fields)
+        recount_unread([self.student.admin_id])
+
+    def unread(self, user=None):
+        user = user or self.student.admin
+        user.refresh_from_db()
+        return unread_count(user)
+
+    def test_keyset_pages_cover_every_row_once(self):
+        # Same timestamp everywhere, so the id tie-breaker decides the order
+        self.add_notifications(60, created_at=timezone.now())
+        seen, cursor, pages = [], None, 0
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                rows, cursor = inbox_page(NotificationStudent.objects.filter(student=self.student), cursor, 25)
+            self.assertEqual(len(ctx.captured_queries), 1)
+            seen += [row.id for row in rows]
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, sorted(NotificationStudent.objects.values_list("id", flat=True), reverse=True))
+
+    def test_inbox_view_paginates(self):
+        self.add_notifications(30)
+        response = self.client.get(reverse("student_view_notification"))
+        self.assertEqual(len(response.context["notifications"]), 25)
+        older = self.client.get(reverse("student_view_notification"), {"after": response.context["next_cursor"]})
+        self.assertEqual(len(older.context["notifications"]), 5)
+        self.assertIsNone(older.context["next_cursor"])
+        # A malformed cursor falls back to the newest page
+        broken = self.client.get(reverse("student_view_notification"), {"after": "nonsense"})
+        self.assertEqual(len(broken.context["notifications"]), 25)
+
+    def test_unread_counter_follows_changes(self):
+        self.add_notifications(3)
+        user = self.student.admin
+        self.assertEqual(self.unread(), 3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(unread_count(user), 3)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        notify([self.student], "New one")
+        self.assertEqual(self.unread(), 4)
+
+        first = NotificationStudent.objects.order_by("id").first()
+        self.client.post(reverse("student_mark_notifications_read"), {"ids": [first.id]})
+        self.client.post(reverse("student_mark_notifications_read"), {"ids": [first.id]})
+        self.assertEqual(self.unread(), 3)
+        self.assertContains(self.client.get(reverse("student_home")), "badge-danger\">3<")
+
+        self.client.post(reverse("student_mark_notifications_read"), {"all": "1"})
+        self.assertEqual(self.unread(), 0)
+        self.assertFalse(NotificationStudent.objects.filter(read_at__isnull=True).exists())
+
+    def test_recount_repairs_the_counter(self):
+        self.add_notifications(4)
+        NotificationStudent.objects.filter(id=NotificationStudent.objects.order_by("id").first().id).update(
+            read_at=timezone.now()
+        )
+        CustomUser.objects.filter(pk=self.student.admin_id).update(unread_notifications=40)
+        other = make_user(2, 3)
+
+        self.assertEqual(recount_unread(), CustomUser.objects.count())
+
+        self.assertEqual(self.unread(), 3)
+        self.assertEqual(self.unread(other), 0)
+
+    def test_mark_read_only_touches_own_notifications(self):
+        other = make_user(2, 3).student
+        theirs = NotificationStudent.objects.create(student=other, message="private")
+        self.client.post(reverse("student_mark_notifications_read"), {"ids": [theirs.id]})
+        theirs.refresh_from_db()
+        self.assertIsNone(theirs.read_at)
+
+    def test_archive_moves_old_rows(self):
+        staff = make_user(3, 2).staff
+        old = timezone.now() - timedelta(days=400)
+        self.add_notifications(5, created_at=old)
+        self.add_notifications(2)
+        notify([staff], "old")
+        NotificationStaff.objects.update(created_at=old)
+        NotificationStudent.objects.filter(id=NotificationStudent.objects.order_by("id").first().id).update(
+            read_at=timezone.now()
+        )
+        recount_unread()
+        self.assertEqual(self.unread(), 6)
+
+        call_command("archive_notifications", "--days", "180", "--batch-size", "2", stdout=StringIO())
+
+        self.assertEqual(NotificationStudent.objects.count(), 2)
+        self.assertEqual(NotificationStaff.objects.count(), 0)
+        self.assertEqual(NotificationArchive.objects.filter(user=self.student.admin).count(), 5)
+        self.assertEqual(NotificationArchive.objects.get(user=staff.admin).message, "old")
+        self.assertEqual(self.unread(), 2)
+        self.assertEqual(self.unread(staff.admin), 0)
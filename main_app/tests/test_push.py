@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from main_app.push import PushSender
+
+
+class StubFCM:
+    """Local HTTP server standing in for FCM; answers with queued status codes, then 200."""
+
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append((self.headers["Authorization"], body))
+                stub.connections.add(self.client_address)
+                time.sleep(stub.delay)
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                payload = b'{"success": 1}'
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/fcm/send"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class PushSenderTests(SimpleTestCase):
+    def stub(self, **kwargs):
+        stub = StubFCM(**kwargs)
+        self.addCleanup(stub.close)
+        return stub
+
+    def sender(self, stub, **kwargs):
+        options = dict(server_key="secret", batch_size=2, backoff=0.01, workers=1)
+        options.update(kwargs)
+        sender = PushSender(stub.url, **options)
+        self.addCleanup(sender.session.close)
+        return sender
+
+    def test_batches_tokens_over_one_pooled_connection(self):
+        stub = self.stub()
+        sender = self.sender(stub)
+
+        queued = sender.send(["a", "b", "c", "", "d", "e"], "Hello", click_action="/x/")
+        self.assertTrue(sender.flush(timeout=5))
+
+        self.assertEqual(queued, 3)
+        self.assertEqual([body["registration_ids"] for _, body in stub.requests], [["a", "b"], ["c", "d"], ["e"]])
+        self.assertEqual(stub.requests[0][0], "key=secret")
+        self.assertEqual(stub.requests[0][1]["notification"]["click_action"], "/x/")
+        self.assertEqual(len(stub.connections), 1)
+        self.assertEqual(sender.sent, 5)
+
+    def test_retries_transient_errors_with_backoff(self):
+        stub = self.stub(statuses=[503, 429])
+        sender = self.sender(stub)
+
+        self.assertTrue(sender.deliver(["a"], {"body": "Hello"}))
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_gives_up_after_max_retries_and_on_client_errors(self):
+        stub = self.stub(statuses=[500, 500, 500, 400])
+        sender = self.sender(stub, max_retries=2)
+
+        self.assertFalse(sender.deliver(["a"], {"body": "Hello"}))
+        self.assertFalse(sender.deliver(["b"], {"body": "Hello"}))
+        self.assertEqual(len(stub.requests), 4)
+        self.assertEqual(sender.failed, 2)
+
+    def test_timeout_is_retried_and_does_not_hang(self):
+        stub = self.stub(delay=0.5)
+        sender = self.sender(stub, timeout=(1, 0.1), max_retries=1)
+
+        started = time.monotonic()
+        self.assertFalse(sender.deliver(["a"], {"body": "Hello"}))
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        stub = self.stub(delay=0.2)
+        sender = self.sender(stub, queue_size=1, batch_size=1)
+
+        sender.send(["a", "b", "c", "d"], "Hello")
+
+        self.assertGreaterEqual(sender.dropped, 2)
+        self.assertTrue(sender.flush(timeout=5))
@@ -0,0 +1,275 @@
+"""
+Query budgets for the hot views.
+
+Each test renders a view for a user whose data set is small, then for one
+whose data set is three times larger, on top of a medium synthetic
+institution. The query count must stay within the budget and be the same
+at both sizes, so a change that issues queries per row (an N+1) fails here.
+"""
+import itertools
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main_app.models import (
+    Attendance,
+    Course,
+    CustomUser,
+    FeePayment,
+    Job,
+    LeaveReportStudent,
+    MCQOption,
+    MCQQuestion,
+    MCQTest,
+    NotificationStaff,
+    NotificationStudent,
+    ProctorAssignment,
+    Room,
+    Section,
+    Semester,
+    Session,
+    StudentSubjectAttendanceSummary,
+    Subject,
+    TimetableEntry,
+)
+from main_app.synthetic import InstitutionSpec, generate_institution
+
+_seq = itertools.count()
+
+SCALES = (1, 3)
+
+
+def make_user(user_type, **extra):
+    n = next(_seq)
+    return CustomUser.objects.create_user(
+        email=f"budget{n}@example.com", password=None, user_type=user_type, gender="F",
+        address="Test", profile_pic="pic.jpg", first_name=f"First{n}", last_name=f"Last{n}", **extra,
+    )
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_institution(InstitutionSpec(
+            courses=2, sections_per_course=2, staff=8, students=120, subjects_per_course=4, rooms=8, weeks=2,
+            notifications_per_user=3, questions_per_test=4,
+        ))
+        cls.session = Session.objects.create(start_year="2030-01-01", end_year="2031-01-01")
+        cls.semester = Semester.objects.create(number=3)
+        cls.hod = make_user(1)
+
+    def setUp(self):
+        cache.clear()
+
+    def queries(self, user, request):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = request()
+        self.assertLess(response.status_code, 400)
+        return len(ctx.captured_queries)
+
+    def assertFlatBudget(self, budget, build, request):
+        """``build(scale)`` returns the user to log in as; ``request()`` performs the request."""
+        counts = []
+        for scale in SCALES:
+            user = build(scale)
+            counts.append(self.queries(user, request))
+        self.assertLessEqual(max(counts), budget, f"query counts {counts} exceed budget {budget}")
+        self.assertEqual(counts[0], counts[-1], f"query count grows with rows: {counts}")
+
+    # -- fixtures ---------------------------------------------------------
+
+    def course_with_sections(self, sections=1):
+        course = Course.objects.create(name=f"Course {next(_seq)}")
+        return course, [Section.objects.create(course=course, name=f"S{i}") for i in range(sections)]
+
+    def staff_member(self, course=None):
+        staff = make_user(2).staff
+        staff.course = course
+        staff.save()
+        return staff
+
+    def student_in(self, course, section):
+        student = make_user(3).student
+        student.course, student.section, student.session = course, section, self.session
+        student.save()
+        return student
+
+    def subjects_for(self, staff, course, count):
+        subjects = []
+        for i in range(count):
+            subject = Subject.objects.create(name=f"Subject {next(_seq)}", staff=staff, credits=3,
+                                             semester=self.semester)
+            subject.courses.add(course)
+            subjects.append(subject)
+        return subjects
+
+    def timetable(self, course, section, subjects, staff_for, count):
+        rooms = [Room.objects.create(name=f"Room {next(_seq)}") for _ in range(count)]
+        slots = [(day, period) for day in ("Mon", "Tue", "Wed", "Thu", "Fri") for period in range(1, 7)]
+        TimetableEntry.objects.bulk_create([
+            TimetableEntry(session=self.session, course=course, section=section,
+                           subject=subjects[i % len(subjects)], staff=staff_for(i), room=rooms[i],
+                           day=slots[i][0], period_number=slots[i][1])
+            for i in range(count)
+        ])
+
+    # -- views ------------------------------------------------------------
+
+    def test_admin_home(self):
+        def build(scale):
+            cache.clear()
+            generate_institution(InstitutionSpec(
+                courses=scale, staff=4 * scale, students=20 * scale, rooms=2, weeks=1, prefix=f"admin{scale}",
+            ))
+            return self.hod
+
+        # Cold cache: the aggregates are recomputed on every measured request
+        self.assertFlatBudget(18, build, lambda: self.client.get(reverse("admin_home")))
+        # Warm cache: only the session, the user and the recent notifications
+        self.assertLessEqual(self.queries(self.hod, lambda: self.client.get(reverse("admin_home"))), 4)
+
+    def test_staff_home(self):
+        def build(scale):
+            course, _ = self.course_with_sections()
+            staff = self.staff_member(course)
+            for subject in self.subjects_for(staff, course, 3 * scale):
+                Attendance.objects.bulk_create([
+                    Attendance(session=self.session, subject=subject, date=f"2030-02-{d:02d}") for d in range(1, 4)
+                ])
+            NotificationStaff.objects.bulk_create([NotificationStaff(staff=staff, message="n")] * (5 * scale))
+            return staff.admin
+
+        self.assertFlatBudget(12, build, lambda: self.client.get(reverse("staff_home")))
+
+    def test_student_home(self):
+        def build(scale):
+            course, (section,) = self.course_with_sections()
+            student = self.student_in(course, section)
+            subjects = self.subjects_for(self.staff_member(course), course, 3 * scale)
+            StudentSubjectAttendanceSummary.objects.bulk_create([
+                StudentSubjectAttendanceSummary(student=student, subject=s, session=self.session,
+                                                present=3, absent=1, total=4)
+                for s in subjects
+            ])
+            NotificationStudent.objects.bulk_create([NotificationStudent(student=student, message="n")] * (5 * scale))
+            return student.admin
+
+        self.assertFlatBudget(12, build, lambda: self.client.get(reverse("student_home")))
+
+    def test_student_timetable(self):
+        def build(scale):
+            course, (section,) = self.course_with_sections()
+            student = self.student_in(course, section)
+            teachers = [self.staff_member(course) for _ in range(2 * scale)]
+            subjects = self.subjects_for(teachers[0], course, 2 * scale)
+            self.timetable(course, section, subjects, lambda i: teachers[i % len(teachers)], 6 * scale)
+            return student.admin
+
+        self.assertFlatBudget(8, build, lambda: self.client.get(reverse("student_timetable")))
+
+    def test_staff_timetable(self):
+        def build(scale):
+            course, sections = self.course_with_sections(2 * scale)
+            staff = self.staff_member(course)
+            subjects = self.subjects_for(staff, course, 2 * scale)
+            rooms = [Room.objects.create(name=f"Room {next(_seq)}") for _ in range(3 * scale)]
+            TimetableEntry.objects.bulk_create([
+                TimetableEntry(session=self.session, course=course, section=sections[i % len(sections)],
+                               subject=subjects[i % len(subjects)], staff=staff, room=rooms[i % len(rooms)],
+                               day=("Mon", "Tue", "Wed", "Thu", "Fri")[i // 6], period_number=i % 6 + 1)
+                for i in range(6 * scale)
+            ])
+            return staff.admin
+
+        self.assertFlatBudget(8, build, lambda: self.client.get(reverse("staff_timetable")))
+
+    def test_proctor_dashboard(self):
+        def build(scale):
+            course, (section,) = self.course_with_sections()
+            proctor = self.staff_member(course)
+            for _ in range(4 * scale):
+                student = self.student_in(course, section)
+                ProctorAssignment.objects.create(proctor=proctor, student=student)
+                FeePayment.objects.create(student=student, session=self.session, amount=100, receipt="fees/r.pdf")
+                LeaveReportStudent.objects.create(student=student, date="2030-02-01", message="ill")
+            return proctor.admin
+
+        self.assertFlatBudget(8, build, lambda: self.client.get(reverse("proctor_dashboard")))
+
+    def test_get_students(self):
+        state = {}
+
+        def build(scale):
+            course, (section,) = self.course_with_sections()
+            staff = self.staff_member(course)
+            state["subject"] = self.subjects_for(staff, course, 1)[0]
+            state["section"] = section
+            state["expected"] = 10 * scale
+            for _ in range(10 * scale):
+                self.student_in(course, section)
+            return staff.admin
+
+        def request():
+            response = self.client.post(reverse("get_students"), {
+                "subject": state["subject"].id, "session": self.session.id, "section": state["section"].id,
+            })
+            self.assertEqual(len(json.loads(response.json())), state["expected"])
+            return response
+
+        self.assertFlatBudget(6, build, request)
+
+    def test_save_attendance(self):
+        state = {}
+
+        def build(scale):
+            course, (section,) = self.course_with_sections()
+            staff = self.staff_member(course)
+            state["subject"] = self.subjects_for(staff, course, 1)[0]
+            state["students"] = [self.student_in(course, section) for _ in range(10 * scale)]
+            return staff.admin
+
+        def request():
+            return self.client.post(reverse("save_attendance"), {
+                "student_ids": json.dumps([{"id": s.id, "status": 1} for s in state["students"]]),
+                "date": "2030-03-01",
+                "subject": state["subject"].id,
+                "session": self.session.id,
+            })
+
+        self.assertFlatBudget(16, build, request)
+
+    def test_student_take_test(self):
+        state = {}
+
+        def build(scale):
+            course, (section,) = self.course_with_sections()
+            student = self.student_in(course, section)
+            subject = self.subjects_for(self.staff_member(course), course, 1)[0]
+            test = MCQTest.objects.create(title="Quiz", subject=subject, staff=subject.staff)
+            for n in range(4 * scale):
+                question = MCQQuestion.objects.create(test=test, text=f"Q{n}")
+                MCQOption.objects.bulk_create([
+                    MCQOption(question=question, text=f"O{i}", is_correct=i == 0) for i in range(4)
+                ])
+            state["test"] = test
+            state["answers"] = {
+                f"q_{q.id}": q.options.order_by("id").first().id for q in MCQQuestion.objects.filter(test=test)
+            }
+            # Each measured submit queues its own grading job
+            Job.objects.all().delete()
+            return student.admin
+
+        def take():
+            return self.client.get(reverse("student_take_test", args=[state["test"].id]))
+
+        def submit():
+            return self.client.post(reverse("student_take_test", args=[state["test"].id]), state["answers"])
+
+        self.assertFlatBudget(10, build, take)
+        self.assertFlatBudget(14, build, submit)
@@ -0,0 +1,79 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main_app.models import Course, CustomUser, NotificationStaff
+from main_app.request_metrics import MetricsStore, RequestSample, store
+
+STATIC = "django.contrib.staticfiles.storage.StaticFilesStorage"
+
+
+def sample(view, duration_ms, queries=1):
+    return RequestSample(view, "GET", 200, duration_ms, queries, 0.5, 0, 100, 0.0)
+
+
+class MetricsStoreTests(TestCase):
+    def test_percentiles_over_rolling_window(self):
+        metrics = MetricsStore(window=100)
+        for ms in range(1, 201):  # only the last 100 (101..200) are kept
+            metrics.record(sample("a", float(ms)))
+        metrics.record(sample("b", 5.0))
+
+        rows = {row["view"]: row for row in metrics.summary()}
+
+        self.assertEqual(rows["a"]["count"], 100)
+        self.assertEqual((rows["a"]["p50_ms"], rows["a"]["p95_ms"], rows["a"]["p99_ms"]), (150, 195, 199))
+        self.assertEqual(rows["b"]["p99_ms"], 5)
+        self.assertEqual([row["view"] for row in metrics.summary()], ["a", "b"])
+
+
+@override_settings(STATICFILES_STORAGE=STATIC)
+class RequestMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        store.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="hod@example.com", password="pass", user_type=1, gender="M",
+            address="Test", profile_pic="pic.jpg",
+        )
+        staff_user = CustomUser.objects.create_user(
+            email="staff@example.com", password="pass", user_type=2, gender="M", first_name="Ann", last_name="Lee",
+            address="Test", profile_pic="pic.jpg",
+        )
+        self.staff_user = staff_user
+        staff = staff_user.staff
+        staff.course = Course.objects.create(name="CSE")
+        staff.save()
+
+    def test_records_one_sample_per_request(self):
+        self.client.force_login(self.staff_user)
+        NotificationStaff.objects.create(staff=self.staff_user.staff, message="hi")
+
+        self.client.get(reverse("staff_home"))
+        self.client.get(reverse("staff_home"))
+
+        row = next(row for row in store.summary() if row["view"] == "staff_home")
+        self.assertEqual(row["count"], 2)
+        self.assertGreater(row["avg_queries"], 0)
+        self.assertGreater(row["avg_kb"], 0)
+
+    @override_settings(REQUEST_METRICS_SLOW_MS=0)
+    def test_slow_requests_log_their_sql(self):
+        self.client.force_login(self.staff_user)
+        with self.assertLogs("main_app.request_metrics", level="WARNING") as logs:
+            self.client.get(reverse("staff_home"))
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["view"], "staff_home")
+        self.assertEqual(len(record["sql"]), record["queries"])
+
+    def test_metrics_page_is_admin_only(self):
+        self.client.force_login(self.staff_user)
+        self.assertRedirects(self.client.get(reverse("request_metrics")), reverse("staff_home"),
+                             fetch_redirect_response=False)
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse("admin_home"))
+        response = self.client.get(reverse("request_metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "admin_home")
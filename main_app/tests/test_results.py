@@ -0,0 +1,115 @@
+import csv
+import io
+import unittest
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main_app.models import Course, CustomUser, Semester, Session, StudentResult, Subject
+from main_app.results import HEADER, course_results, grade_sheet, subject_results
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+def make_user(n, user_type, last_name="Last"):
+    return CustomUser.objects.create_user(
+        email=f"results{n}@example.com", password=None, user_type=user_type, gender="F",
+        address="Test", profile_pic="pic.jpg", first_name="First", last_name=last_name,
+    )
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class ResultsTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CSE")
+        self.session = Session.objects.create(start_year=date(2024, 1, 1), end_year=date(2024, 12, 31))
+        self.staff_user = make_user(0, 2)
+        semester = Semester.objects.create(number=4)
+        self.networks = Subject.objects.create(name="Networks", staff=self.staff_user.staff, semester=semester)
+        self.compilers = Subject.objects.create(name="Compilers", staff=self.staff_user.staff, semester=semester)
+        self.students = []
+        # Totals out of 180: 162 (90%), 126 (70%), 126, 90 (50%) but SEE 15/60, 36 (20%)
+        for n, marks in enumerate([(36, 36, 18, 18, 54), (28, 28, 14, 14, 42), (30, 30, 10, 14, 42),
+                                   (30, 30, 10, 5, 15), (10, 10, 5, 5, 6)]):
+            student = make_user(n + 1, 3, last_name=f"S{n}").student
+            student.course, student.session = self.course, self.session
+            student.save()
+            self.students.append(student)
+            StudentResult.objects.create(student=student, subject=self.networks, **dict(zip(
+                ("test1", "test2", "quiz", "experiential", "see"), marks)))
+        StudentResult.objects.create(student=self.students[0], subject=self.compilers, test1=10, see=30)
+        StudentResult.objects.create(student=self.students[1], subject=self.compilers, test1=20, see=40)
+
+    def test_subject_sheet(self):
+        with CaptureQueriesContext(connection) as ctx:
+            sheet = grade_sheet(subject_results(self.networks.id, self.session.id))
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(sheet["max_total"], 180)
+        self.assertEqual(sheet["total"].tolist(), [162, 126, 126, 90, 36])
+        self.assertEqual(sheet["percent"].tolist(), [90, 70, 70, 50, 20])
+        self.assertEqual(sheet["grade"].tolist(), ["O", "A", "A", "F", "F"])
+        # The fourth student has 50% overall but is below the SEE minimum
+        self.assertEqual(sheet["passed"].tolist(), [True, True, True, False, False])
+        self.assertEqual(sheet["rank"].tolist(), [1, 2, 2, 4, 5])
+        (stats,) = sheet["subjects"]
+        self.assertEqual((stats["count"], stats["mean"], stats["min"], stats["max"]), (5, 108, 36, 162))
+        self.assertEqual(stats["std"], 42.6)
+        self.assertEqual(stats["pass_rate"], 0.6)
+        self.assertEqual(stats["components"]["SEE"], 31.8)
+
+    @override_settings(RESULT_WEIGHTS={"see": 0}, RESULT_MIN_SEE_PERCENT=0)
+    def test_weights_from_settings(self):
+        sheet = grade_sheet(subject_results(self.networks.id, self.session.id))
+        self.assertEqual(sheet["max_total"], 120)
+        self.assertEqual(sheet["total"].tolist()[:2], [108, 84])
+        self.assertTrue(sheet["passed"][3])
+
+    def test_course_sheet_ranks_within_subject(self):
+        sheet = grade_sheet(course_results(self.course.id, self.session.id))
+        self.assertEqual([s["name"] for s in sheet["subjects"]], ["Compilers", "Networks"])
+        self.assertEqual([s["subject"] for s in sheet["students"]], ["Compilers"] * 2 + ["Networks"] * 5)
+        self.assertEqual(sheet["rank"].tolist(), [2, 1, 1, 2, 2, 4, 5])
+        self.assertEqual(sheet["subjects"][0]["mean"], 50)
+
+    def test_csv_download(self):
+        self.client.force_login(self.staff_user)
+        response = self.client.get(reverse("staff_grade_sheet"), {
+            "subject": self.networks.id, "session": self.session.id, "format": "csv",
+        })
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("grades-networks", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], HEADER)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][0], "S0 First")
+        self.assertEqual(rows[4][-3:], ["0.0", "Fail", "4"])
+
+    @unittest.skipUnless(openpyxl, "openpyxl is not installed")
+    def test_xlsx_download(self):
+        self.client.force_login(make_user(99, 1))
+        response = self.client.get(reverse("admin_grade_sheet"), {"course": self.course.id, "format": "xlsx"})
+        self.assertEqual(response.status_code, 200)
+        workbook = openpyxl.load_workbook(io.BytesIO(response.content))
+        self.assertEqual(workbook.sheetnames, ["Grade Sheet", "Summary"])
+        self.assertEqual(workbook["Grade Sheet"].max_row, 8)
+        self.assertEqual(workbook["Summary"].max_row, 3)
+
+    def test_pages(self):
+        self.client.force_login(self.staff_user)
+        url = reverse("staff_grade_sheet")
+        response = self.client.get(url, {"subject": self.networks.id, "session": self.session.id})
+        self.assertContains(response, "Download CSV")
+        self.assertEqual(len(response.context["rows"]), 5)
+        other = Subject.objects.create(name="Other", staff=make_user(50, 2).staff)
+        self.assertEqual(self.client.get(url, {"subject": other.id, "session": self.session.id}).status_code, 404)
+
+        self.client.force_login(self.students[3].admin)
+        response = self.client.get(reverse("student_view_result"))
+        self.assertEqual([(r.total, r.grade, r.passed) for r in response.context["results"]],
+                         [(90, "F", False)])
@@ -0,0 +1,357 @@
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from main_app.models import (
+    Session,
+    Course,
+    Section,
+    Semester,
+    CustomUser,
+    Subject,
+    Room,
+    TimetableEntry,
+    StaffUnavailability,
+)
+from main_app.scheduling import (
+    ENGINE_CP,
+    ENGINE_GREEDY,
+    REPAIR_STAFF_UNAVAILABLE,
+    ChangeSet,
+    generate_for_session,
+    repair_session,
+)
+from main_app.timetable_grid import Occupancy
+from main_app import timetable_solver
+from main_app.timetable_solver import Demand, solve_cp, solve_partitioned, split_components
+
+
+class GeneratorTestMixin:
+    def make_staff(self, email):
+        pic = SimpleUploadedFile("pic.jpg", b"filecontent", content_type="image/jpeg")
+        user = CustomUser.objects.create_user(
+            email=email,
+            password="pass",
+            user_type=2,
+            gender="M",
+            address="Test",
+            profile_pic=pic,
+        )
+        staff = user.staff
+        staff.course = self.course
+        staff.save()
+        return staff
+
+    def make_subject(self, name, staff, credits=3, sections=None):
+        subject = Subject.objects.create(name=name, staff=staff, semester=self.sem, credits=credits)
+        subject.courses.add(self.course)
+        subject.sections.add(*(sections or self.sections))
+        return subject
+
+    def assert_valid_timetable(self, session):
+        entries = list(TimetableEntry.objects.filter(session=session))
+        staff_slots, room_slots, section_slots, per_day = set(), set(), set(), set()
+        for e in entries:
+            day_key = (e.section_id, e.subject_id, e.day)
+            self.assertNotIn(day_key, per_day, "subject scheduled twice on one day")
+            per_day.add(day_key)
+            for p in range(e.period_number, e.period_number + e.duration_periods):
+                for seen, key in (
+                    (staff_slots, (e.staff_id, e.day, p)),
+                    (room_slots, (e.room_id, e.day, p)),
+                    (section_slots, (e.section_id, e.day, p)),
+                ):
+                    self.assertNotIn(key, seen)
+                    seen.add(key)
+        for e in entries:
+            e.full_clean()
+        return entries
+
+
+class GenerateForSessionTests(GeneratorTestMixin, TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(start_year="2024-01-01", end_year="2025-01-01")
+        self.course = Course.objects.create(name="CSE")
+        self.sem = Semester.objects.create(number=5, label="Semester 5")
+        self.sections = [
+            Section.objects.create(course=self.course, name=name) for name in ("A", "B")
+        ]
+        self.staff1 = self.make_staff("s1@example.com")
+        self.staff2 = self.make_staff("s2@example.com")
+        for i in range(3):
+            Room.objects.create(name=f"R{i}", capacity=60)
+
+    def test_generates_conflict_free_timetable_up_to_credits(self):
+        algo = self.make_subject("Algo", self.staff1, credits=3)
+        self.make_subject("DBMS", self.staff2, credits=4)
+        self.make_subject("Networks Lab", self.staff2, credits=1)
+
+        summary = generate_for_session(self.session, seed=7)
+
+        entries = self.assert_valid_timetable(self.session)
+        self.assertEqual(summary["created"], len(entries))
+        self.assertEqual(summary["errors"], [])
+        for section in self.sections:
+            self.assertEqual(
+                TimetableEntry.objects.filter(session=self.session, subject=algo, section=section).count(), 3
+            )
+        labs = [e for e in entries if e.is_lab]
+        self.assertTrue(labs)
+        self.assertTrue(all(e.duration_periods == 2 for e in labs))
+
+    def test_respects_unavailability_and_existing_entries(self):
+        algo = self.make_subject("Algo", self.staff1, credits=5)
+        for day in ("Mon", "Tue", "Wed"):
+            StaffUnavailability.objects.create(
+                staff=self.staff1, session=self.session, day=day, period_number=1, duration_periods=6
+            )
+        existing = TimetableEntry.objects.create(
+            session=self.session, course=self.course, section=self.sections[0], subject=algo,
+            staff=self.staff1, room=Room.objects.first(), day="Thu", period_number=3,
+        )
+
+        generate_for_session(self.session, seed=1)
+
+        entries = self.assert_valid_timetable(self.session)
+        self.assertIn(existing.id, [e.id for e in entries])
+        self.assertFalse([e for e in entries if e.day in ("Mon", "Tue", "Wed")])
+        # Only Thu/Fri remain, one class per day per section
+        self.assertEqual(
+            TimetableEntry.objects.filter(session=self.session, section=self.sections[0]).count(), 2
+        )
+
+    def test_seed_makes_generation_reproducible(self):
+        self.make_subject("Algo", self.staff1, credits=3)
+        self.make_subject("DBMS", self.staff2, credits=3)
+        generate_for_session(self.session, seed=42)
+        first = sorted(TimetableEntry.objects.values_list("subject_id", "section_id", "day", "period_number", "room_id"))
+        TimetableEntry.objects.all().delete()
+        generate_for_session(self.session, seed=42)
+        second = sorted(TimetableEntry.objects.values_list("subject_id", "section_id", "day", "period_number", "room_id"))
+        self.assertEqual(first, second)
+
+    def test_progress_is_reported_outside_the_write_transaction(self):
+        self.make_subject("Algo", self.staff1, credits=3)
+        depth = len(connection.savepoint_ids)
+        calls = []
+
+        generate_for_session(self.session, seed=3,
+                             progress=lambda percent, message: calls.append((percent, len(connection.savepoint_ids))))
+
+        self.assertEqual(calls, [(10, depth), (80, depth)])
+
+    def test_query_count_does_not_grow_with_subjects(self):
+        def queries_for(subject_count):
+            TimetableEntry.objects.all().delete()
+            Subject.objects.all().delete()
+            for i in range(subject_count):
+                self.make_subject(f"Subject {i}", self.staff1 if i % 2 else self.staff2, credits=2)
+            with CaptureQueriesContext(connection) as ctx:
+                generate_for_session(self.session, seed=3)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(2), queries_for(6))
+
+
+class ConstraintSolverTests(GeneratorTestMixin, TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(start_year="2024-01-01", end_year="2025-01-01")
+        self.course = Course.objects.create(name="CSE")
+        self.sem = Semester.objects.create(number=5, label="Semester 5")
+        self.sections = [
+            Section.objects.create(course=self.course, name=name) for name in ("A", "B", "C")
+        ]
+        self.staff1 = self.make_staff("s1@example.com")
+        self.staff2 = self.make_staff("s2@example.com")
+        self.room = Room.objects.create(name="Big", capacity=60)
+        Room.objects.create(name="Hall", capacity=0)
+
+    def test_cp_engine_reaches_full_coverage_and_is_deterministic(self):
+        self.make_subject("Algo", self.staff1, credits=4)
+        self.make_subject("DBMS", self.staff2, credits=4)
+        self.make_subject("OS Lab", self.staff1, credits=2)
+
+        summary = generate_for_session(self.session, engine=ENGINE_CP, seed=5, time_budget=5)
+
+        self.assert_valid_timetable(self.session)
+        self.assertEqual(summary["coverage"]["scheduled"], summary["coverage"]["required"])
+        self.assertTrue(summary["optimal"])
+        self.assertIn("elapsed", summary)
+        first = sorted(TimetableEntry.objects.values_list("subject_id", "section_id", "day", "period_number"))
+        TimetableEntry.objects.all().delete()
+        generate_for_session(self.session, engine=ENGINE_CP, seed=5, time_budget=5)
+        second = sorted(TimetableEntry.objects.values_list("subject_id", "section_id", "day", "period_number"))
+        self.assertEqual(first, second)
+
+    def test_cp_engine_skips_rooms_below_section_size(self):
+        small = Room.objects.create(name="Tiny", capacity=1)
+        self.make_subject("Algo", self.staff1, credits=2, sections=[self.sections[0]])
+        for i in range(2):
+            self._enrol(i)
+
+        generate_for_session(self.session, engine=ENGINE_CP, seed=1)
+
+        self.assertFalse(TimetableEntry.objects.filter(room=small).exists())
+        self.assertEqual(TimetableEntry.objects.filter(session=self.session).count(), 2)
+
+    def _enrol(self, i):
+        user = CustomUser.objects.create_user(
+            email=f"st{i}@example.com", password="pass", user_type=3, gender="F",
+            address="Test", profile_pic="pic.jpg",
+        )
+        student = user.student
+        student.course = self.course
+        student.section = self.sections[0]
+        student.save()
+
+    def test_solver_proves_optimum_on_overconstrained_week(self):
+        # One teacher, one free period per day, three sections wanting 3 classes each:
+        # only 5 of the 9 classes can ever be placed.
+        occupancy = Occupancy()
+        for day in ("Mon", "Tue", "Wed", "Thu", "Fri"):
+            occupancy.block_staff(1, day, 2, 5)
+        demands = [
+            Demand(subject_id=10, course_id=1, section_id=s, staff_id=1, group=("s", s), units=3)
+            for s in (1, 2, 3)
+        ]
+
+        result = solve_cp(demands, occupancy, [(100, 0)], time_budget=5, seed=0)
+
+        self.assertEqual(len(result.placements), 5)
+        self.assertTrue(result.optimal)
+        self.assertEqual(len({(p.day, p.period) for p in result.placements}), 5)
+
+    def test_solver_branches_on_room_choice(self):
+        # Two labs on Monday only: the first fits P1-P2, the second P2-P3.
+        # The big room is taken at P3, so the first lab must leave the small
+        # room to the second even though the small one is its best fit.
+        occupancy = Occupancy()
+        occupancy.book(99, 2, ("s", 99), 99, "Mon", 3)
+        for day in ("Tue", "Wed", "Thu", "Fri"):
+            occupancy.block_staff(1, day, 1, 6)
+            occupancy.block_staff(2, day, 1, 6)
+        occupancy.block_staff(1, "Mon", 3, 4)
+        occupancy.block_staff(2, "Mon", 1, 1)
+        occupancy.block_staff(2, "Mon", 4, 3)
+        demands = [
+            Demand(subject_id=s, course_id=1, section_id=s, staff_id=s, group=("s", s), units=1,
+                   duration=2, is_lab=True, size=20)
+            for s in (1, 2)
+        ]
+
+        for seed in range(6):
+            result = solve_cp(demands, occupancy, [(1, 30), (2, 60)], time_budget=5, seed=seed)
+            self.assertEqual(len(result.placements), 2)
+            self.assertTrue(result.optimal)
+            self.assertEqual({(p.demand, p.room_id) for p in result.placements}, {(0, 2), (1, 1)})
+
+
+class ParallelGenerationTests(GeneratorTestMixin, TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(start_year="2024-01-01", end_year="2025-01-01")
+        self.sem = Semester.objects.create(number=3, label="Semester 3")
+        self.courses = [Course.objects.create(name=name) for name in ("CSE", "ECE", "ME")]
+        self.room = Room.objects.create(name="Only", capacity=0)
+        for index, course in enumerate(self.courses):
+            self.course = course
+            self.sections = [Section.objects.create(course=course, name="A")]
+            self.make_subject(f"Maths {index}", self.make_staff(f"t{index}@example.com"), credits=4)
+
+    def test_split_components_by_shared_staff_and_section(self):
+        demands = [
+            Demand(subject_id=1, course_id=1, section_id=1, staff_id=1, group=("s", 1), units=1),
+            Demand(subject_id=2, course_id=1, section_id=2, staff_id=1, group=("s", 2), units=1),
+            Demand(subject_id=3, course_id=2, section_id=3, staff_id=2, group=("s", 3), units=1),
+            Demand(subject_id=4, course_id=2, section_id=2, staff_id=3, group=("s", 2), units=1),
+        ]
+        self.assertEqual(split_components(demands), [[0, 1, 3], [2]])
+
+    def test_parallel_components_merge_without_room_clashes(self):
+        # Each course is its own component but all compete for one room
+        for engine in (ENGINE_GREEDY, ENGINE_CP):
+            TimetableEntry.objects.all().delete()
+            summary = generate_for_session(self.session, seed=2, engine=engine, workers=3, time_budget=2)
+            self.assert_valid_timetable(self.session)
+            self.assertEqual(summary["errors"], [])
+            self.assertEqual(summary["coverage"]["scheduled"], 12)
+
+    def test_inline_components_share_the_remaining_budget(self):
+        demands = [
+            Demand(subject_id=n, course_id=n, section_id=n, staff_id=n, group=("s", n), units=1)
+            for n in range(3)
+        ]
+        clock = [100.0]
+        budgets = []
+
+        def solve(engine, component, occupancy, rooms, time_budget, seed):
+            # Each component uses all of the time it is given, plus one second
+            budgets.append(time_budget)
+            clock[0] += time_budget + 1
+            return [], 0, True
+
+        with mock.patch.object(timetable_solver.time, "monotonic", lambda: clock[0]), \
+                mock.patch.object(timetable_solver, "_solve_component", solve):
+            solve_partitioned(demands, Occupancy(), [(1, 0)], engine=ENGINE_CP, time_budget=9, workers=1)
+
+        self.assertEqual(budgets, [3, 2.5, 1.5])
+
+
+class RepairSessionTests(GeneratorTestMixin, TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(start_year="2024-01-01", end_year="2025-01-01")
+        self.course = Course.objects.create(name="CSE")
+        self.sem = Semester.objects.create(number=5, label="Semester 5")
+        self.sections = [
+            Section.objects.create(course=self.course, name=name) for name in ("A", "B")
+        ]
+        self.staff1 = self.make_staff("s1@example.com")
+        self.staff2 = self.make_staff("s2@example.com")
+        self.rooms = [Room.objects.create(name=f"R{i}", capacity=60) for i in range(3)]
+        self.algo = self.make_subject("Algo", self.staff1, credits=3)
+        self.make_subject("DBMS", self.staff2, credits=3)
+        generate_for_session(self.session, seed=11)
+
+    def slots(self):
+        return {
+            e.id: (e.day, e.period_number, e.room_id)
+            for e in TimetableEntry.objects.filter(session=self.session)
+        }
+
+    def test_new_unavailability_moves_only_affected_entries(self):
+        before = self.slots()
+        blocked = TimetableEntry.objects.filter(session=self.session, staff=self.staff1).first()
+        StaffUnavailability.objects.create(
+            staff=self.staff1, session=self.session, day=blocked.day,
+            period_number=blocked.period_number, duration_periods=1,
+        )
+
+        diff = repair_session(self.session)
+
+        after = self.slots()
+        self.assertEqual(set(before), set(after))
+        self.assertEqual([c["id"] for c in diff["moved"]], [blocked.id])
+        self.assertEqual(diff["moved"][0]["reason"], REPAIR_STAFF_UNAVAILABLE)
+        self.assertNotEqual(after[blocked.id], before[blocked.id])
+        self.assertEqual({k: v for k, v in after.items() if k != blocked.id},
+                         {k: v for k, v in before.items() if k != blocked.id})
+        self.assert_valid_timetable(self.session)
+
+    def test_vacating_room_and_lowering_credits(self):
+        room = self.rooms[0]
+        in_room = set(TimetableEntry.objects.filter(session=self.session, room=room).values_list("id", flat=True))
+
+        diff = repair_session(self.session, ChangeSet(removed_rooms={room.id}, credits={self.algo.id: 2}))
+
+        self.assertFalse(TimetableEntry.objects.filter(session=self.session, room=room).exists())
+        self.assertEqual(len(diff["removed"]), 2)
+        self.assertTrue({c["id"] for c in diff["moved"]} <= in_room)
+        for section in self.sections:
+            self.assertEqual(
+                TimetableEntry.objects.filter(session=self.session, subject=self.algo, section=section).count(), 2
+            )
+        # Nothing changes when the timetable is already valid
+        diff = repair_session(self.session)
+        self.assertEqual((diff["moved"], diff["removed"], diff["unplaced"]), ([], [], []))
@@ -0,0 +1,66 @@
+from django.test import TestCase
+
+from main_app.benchmarks import VIEWS, benchmark_views, percentile
+from main_app.models import (
+    AttendanceReport,
+    FeePayment,
+    MCQAnswer,
+    MCQSubmission,
+    Staff,
+    Student,
+    StudentSubjectAttendanceSummary,
+    Subject,
+)
+from main_app.synthetic import InstitutionSpec, generate_institution
+
+
+SMALL = dict(courses=2, sections_per_course=2, staff=6, students=40, subjects_per_course=3, rooms=6, weeks=2,
+             notifications_per_user=2, questions_per_test=3)
+
+
+class GenerateInstitutionTests(TestCase):
+    def test_generates_requested_shape(self):
+        counts = generate_institution(InstitutionSpec(**SMALL))
+
+        self.assertEqual(Student.objects.filter(section__isnull=False).count(), 40)
+        self.assertEqual(Staff.objects.count(), 6)
+        self.assertEqual(Subject.objects.filter(courses__isnull=False).count(), 6)
+        self.assertEqual(AttendanceReport.objects.count(), counts["attendance_reports"])
+        self.assertEqual(FeePayment.objects.count(), 40)
+        self.assertEqual(MCQSubmission.objects.count(), counts["mcq"]["submissions"])
+        self.assertEqual(MCQAnswer.objects.count(), counts["mcq"]["submissions"] * 3)
+        # Summary counters are built for the generated reports
+        self.assertEqual(
+            sum(StudentSubjectAttendanceSummary.objects.values_list("total", flat=True)),
+            counts["attendance_reports"],
+        )
+
+    def test_same_seed_same_data(self):
+        def snapshot(prefix):
+            generate_institution(InstitutionSpec(**SMALL, seed=7, prefix=prefix))
+            return sorted(
+                AttendanceReport.objects.filter(student__admin__email__startswith=f"{prefix}-")
+                .values_list("student__admin__first_name", "attendance__subject__name", "attendance__date", "status")
+            )
+
+        first, second = snapshot("a"), snapshot("b")
+        self.assertEqual([row[0] for row in first], [row[0] for row in second])
+        self.assertEqual([row[2:] for row in first], [row[2:] for row in second])
+
+
+class BenchmarkViewsTests(TestCase):
+    def test_reports_every_view(self):
+        generate_institution(InstitutionSpec(**SMALL))
+
+        results = benchmark_views(iterations=2)
+
+        self.assertEqual(set(results), set(VIEWS))
+        for view, stats in results.items():
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+            self.assertGreater(stats["queries"], 0)
+            self.assertTrue(all(code < 400 for code in stats["status"]), view)
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 95), percentile(values, 99)), (50, 95, 99))
+        self.assertEqual(percentile([3.0], 99), 3.0)
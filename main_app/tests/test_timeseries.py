@@ -0,0 +1,61 @@
+from datetime import date, datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from main_app.models import Attendance, CustomUser, NotificationStaff, Session, Subject
+from main_app.timeseries import WEEK, bucket_counts
+
+
+class BucketCountsTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            email="staff@example.com", password="pass", user_type=2, gender="M",
+            address="Test", profile_pic="pic.jpg",
+        )
+        self.staff = user.staff
+        self.end = date(2024, 3, 31)
+
+    def notify_on(self, day, count=1):
+        at = timezone.make_aware(datetime(day.year, day.month, day.day, 10, 0))
+        for _ in range(count):
+            note = NotificationStaff.objects.create(staff=self.staff, message="hi")
+            NotificationStaff.objects.filter(pk=note.pk).update(created_at=at)
+
+    def test_daily_buckets_are_zero_filled(self):
+        self.notify_on(self.end, 2)
+        self.notify_on(self.end - timedelta(days=3))
+        self.notify_on(self.end - timedelta(days=7))  # outside the window
+
+        labels, counts = bucket_counts(NotificationStaff.objects.all(), "created_at", days=7, end=self.end)
+
+        self.assertEqual(labels[0], "Mar 25")
+        self.assertEqual(labels[-1], "Mar 31")
+        self.assertEqual(counts, [0, 0, 0, 1, 0, 0, 2])
+
+    def test_weekly_buckets_and_long_windows_use_one_query(self):
+        self.notify_on(self.end)
+        self.notify_on(self.end - timedelta(days=6))
+        self.notify_on(self.end - timedelta(days=7))
+        self.notify_on(self.end - timedelta(days=300))
+
+        with CaptureQueriesContext(connection) as ctx:
+            labels, counts = bucket_counts(NotificationStaff.objects.all(), "created_at", days=365,
+                                           bucket=WEEK, end=self.end)
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(len(labels), 53)
+        self.assertEqual(counts[-1], 2)
+        self.assertEqual(counts[-2], 1)
+        self.assertEqual(sum(counts), 4)
+
+    def test_date_fields(self):
+        session = Session.objects.create(start_year="2024-01-01", end_year="2025-01-01")
+        subject = Subject.objects.create(name="Algo", staff=self.staff)
+        Attendance.objects.create(session=session, subject=subject, date=self.end - timedelta(days=1))
+
+        _, counts = bucket_counts(Attendance.objects.all(), "date", days=3, end=self.end)
+
+        self.assertEqual(counts, [0, 1, 0])
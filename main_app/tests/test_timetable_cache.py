@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main_app.models import (
+    Course, CustomUser, Room, Section, Semester, Session, Subject, TimetableEntry, TimetableVersion,
+)
+
+
+def make_user(email, user_type):
+    return CustomUser.objects.create_user(
+        email=email, password=None, user_type=user_type, gender="F", address="Test",
+        profile_pic="pic.jpg", first_name="Ada", last_name="Lovelace",
+    )
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class TimetableCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create(start_year="2030-01-01", end_year="2031-01-01")
+        course = Course.objects.create(name="CSE")
+        self.section = Section.objects.create(course=course, name="A")
+        self.staff = make_user("teacher@example.com", 2).staff
+        self.student = make_user("student@example.com", 3).student
+        self.student.course, self.student.section, self.student.session = course, self.section, self.session
+        self.student.save()
+        self.subject = Subject.objects.create(name="Compilers", staff=self.staff, credits=3,
+                                              semester=Semester.objects.create(number=5))
+        self.room = Room.objects.create(name="R101")
+        self.entry = TimetableEntry.objects.create(
+            session=self.session, course=course, section=self.section, subject=self.subject,
+            staff=self.staff, room=self.room, day="Tue", period_number=2,
+        )
+
+    def get(self, user, url_name, **headers):
+        self.client.force_login(user)
+        return self.client.get(reverse(url_name), **headers)
+
+    def test_grid_is_cached(self):
+        def queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.get(self.student.admin, "student_timetable")
+            self.assertContains(response, "Compilers")
+            return len(ctx.captured_queries)
+
+        cold, warm = queries(), queries()
+        self.assertLess(warm, cold)
+
+    def test_revalidation_returns_304_until_timetable_changes(self):
+        first = self.get(self.student.admin, "student_timetable")
+        etag = first["ETag"]
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        again = self.get(self.student.admin, "student_timetable", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+
+        self.room.name = "Lab 7"
+        self.room.save()
+        changed = self.get(self.student.admin, "student_timetable", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, "Lab 7")
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_etag_is_per_user(self):
+        etag = self.get(self.student.admin, "student_timetable")["ETag"]
+        other = make_user("other@example.com", 3).student
+        other.section, other.session = self.section, self.session
+        other.save()
+        response = self.get(other.admin, "student_timetable", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_staff_grid_follows_entry_and_subject_changes(self):
+        self.assertContains(self.get(self.staff.admin, "staff_timetable"), "Compilers")
+
+        self.subject.name = "Compiler Design"
+        self.subject.save()
+        self.assertContains(self.get(self.staff.admin, "staff_timetable"), "Compiler Design")
+
+        self.entry.delete()
+        self.assertNotContains(self.get(self.staff.admin, "staff_timetable"), "Compiler Design")
+
+    def test_change_made_by_another_process_is_seen(self):
+        etag = self.get(self.student.admin, "student_timetable")["ETag"]
+        # A worker writes through its own connection and cache: only the
+        # database changes here, this process's cache still holds the grid
+        TimetableEntry.objects.filter(pk=self.entry.pk).update(day="Wed")
+        TimetableVersion.objects.update(version=F("version") + 1)
+
+        response = self.get(self.student.admin, "student_timetable", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["day_rows"][2][1][1]["subject"], "Compilers")
@@ -1,5 +1,7 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from main_app.models import (
@@ -14,6 +16,7 @@ from main_app.models import (
     TimetableEntry,
     StaffUnavailability,
 )
+from main_app.scheduling import validate_entries
 
 
 class TimetableConflictTests(TestCase):
@@ -199,4 +202,78 @@ class TimetableConflictTests(TestCase):
         )
         with self.assertRaises(ValidationError) as ctx:
             e4.full_clean()
-        self.assertIn("Weekly credits limit", str(ctx.exception))
\ No newline at end of file
+        self.assertIn("Weekly credits limit", str(ctx.exception))
+
+    def entry(self, section, subject, day, period, room=None):
+        return TimetableEntry(
+            session=self.session,
+            course=self.course,
+            section=section,
+            subject=subject,
+            staff=self.staff,
+            room=room or self.room1,
+            day=day,
+            period_number=period,
+            is_lab=False,
+            duration_periods=1,
+        )
+
+    def test_validate_entries_reports_structured_errors_within_batch(self):
+        batch = [
+            self.entry(self.sec_b, self.sub1, "Mon", 1),
+            self.entry(self.sec_c, self.sub2, "Mon", 1, room=self.room2),  # same teacher
+            self.entry(self.sec_b, self.sub1, "Mon", 3),  # same subject twice a day
+            self.entry(self.sec_b, self.sub1, "Tue", 2),
+        ]
+
+        results = validate_entries(self.session, batch, suggest=False)
+
+        self.assertEqual(results[0], [])
+        self.assertEqual([e["code"] for e in results[1]], ["staff_conflict"])
+        self.assertEqual([e["code"] for e in results[2]], ["same_day"])
+        self.assertEqual(results[3], [])
+
+    def test_validate_entries_query_count_is_constant(self):
+        def queries_for(count):
+            slots = [(day, period) for day in ("Mon", "Tue", "Wed", "Thu", "Fri") for period in (1, 3, 5)]
+            batch = [self.entry(self.sec_b, self.sub1, day, period) for day, period in slots[:count]]
+            with CaptureQueriesContext(connection) as ctx:
+                validate_entries(self.session, batch, suggest=False)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(1), queries_for(15))
+
+    def test_suggestions_are_ranked_and_structured(self):
+        self.entry(self.sec_b, self.sub1, "Tue", 3).save()
+        # Section C is busy on Tue P2 with another teacher
+        other_subject = Subject.objects.create(name="OS", staff=self.make_other_staff(), semester=self.sem, credits=3)
+        other_subject.courses.add(self.course)
+        other_subject.sections.add(self.sec_c)
+        TimetableEntry.objects.create(
+            session=self.session, course=self.course, section=self.sec_c, subject=other_subject,
+            staff=other_subject.staff, room=self.room2, day="Tue", period_number=2,
+        )
+        clash = self.entry(self.sec_c, self.sub2, "Tue", 3, room=self.room2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            errors = validate_entries(self.session, [clash])[0]
+        self.assertLess(len(ctx.captured_queries), 12)
+
+        conflict = errors[0]
+        self.assertEqual(conflict["code"], "staff_conflict")
+        suggestions = conflict["suggestions"]
+        # Closest free periods first, keeping the requested room
+        self.assertEqual(
+            [(s["day"], s["period"], s["room_id"]) for s in suggestions[:3]],
+            [("Tue", 4, self.room2.id), ("Tue", 1, self.room2.id), ("Tue", 5, self.room2.id)],
+        )
+        self.assertEqual(sorted(s["score"] for s in suggestions), [s["score"] for s in suggestions])
+        self.assertIn("Suggested alternatives: Tue P4, Tue P1, Tue P5", conflict["message"])
+
+    def make_other_staff(self):
+        pic = SimpleUploadedFile("pic.jpg", b"filecontent", content_type="image/jpeg")
+        user = CustomUser.objects.create_user(
+            email="other@example.com", password="pass", user_type=2, gender="F",
+            address="Test", profile_pic=pic,
+        )
+        return user.staff
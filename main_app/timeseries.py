@@ -0,0 +1,53 @@
+"""
+Day/week bucketed counts for the dashboard trend charts.
+
+``bucket_counts`` runs one grouped query for the whole window, whatever its
+length, and fills in the buckets that have no rows with zero.
+"""
+from datetime import timedelta
+from typing import List, NamedTuple
+
+from django.db import models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+DAY = "day"
+WEEK = "week"
+
+
+class Series(NamedTuple):
+    labels: List[str]
+    counts: List[int]
+
+
+def bucket_counts(queryset, field: str, days: int = 7, bucket: str = DAY, end=None,
+                  label_format: str = "%b %d") -> Series:
+    """
+    Count rows of ``queryset`` per day (or per week) over the ``days`` days
+    ending on ``end`` (default: today in the current time zone).
+
+    ``field`` is a DateField or DateTimeField on the queryset's model;
+    datetimes are bucketed by their local date. Weekly buckets are 7-day
+    spans ending on ``end`` and are labelled by their first day.
+    """
+    end = end or timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    if isinstance(queryset.model._meta.get_field(field), models.DateTimeField):
+        rows = queryset.filter(**{f"{field}__date__range": (start, end)}).annotate(_day=TruncDate(field))
+    else:
+        rows = queryset.filter(**{f"{field}__range": (start, end)}).annotate(_day=models.F(field))
+    per_day = dict(rows.order_by().values("_day").annotate(_n=Count("pk")).values_list("_day", "_n"))
+
+    dates = [start + timedelta(days=i) for i in range(days)]
+    if bucket == WEEK:
+        # Align spans on ``end`` so the latest bucket is always a full week
+        first = len(dates) % 7 or 7
+        spans = [dates[:first]] + [dates[i:i + 7] for i in range(first, len(dates), 7)]
+    else:
+        spans = [[d] for d in dates]
+    return Series(
+        labels=[span[0].strftime(label_format) for span in spans],
+        counts=[sum(per_day.get(d, 0) for d in span) for span in spans],
+    )
@@ -0,0 +1,162 @@
+"""
+Cached weekly timetable grids for the student and staff timetable pages.
+
+A grid is the Mon-Fri x P1..P6 table of plain dicts (subject, staff, room,
+...) built from ``TimetableEntry`` once and cached per (session, section)
+for students and per staff member for teachers. Keys embed the version
+number of the single ``TimetableVersion`` row, which any save or delete of
+a ``TimetableEntry``, ``Room`` or ``Subject`` bumps in the same
+transaction, so every cached grid is dropped at once without having to
+know which sections a room or subject appears in. Because the version
+lives in the database, a change made by the background worker (timetable
+generation) is seen by every web process on its next request whatever
+cache backend is configured. Bulk writes, which send no signals, call
+``timetable_changed`` themselves.
+
+Each grid carries an ETag (a hash of its contents) and the time of the last
+timetable change, which ``grid_response`` uses to answer revalidations with
+``304 Not Modified``.
+"""
+import hashlib
+import json
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Room, Subject, TimetableEntry, TimetableVersion
+from .timetable_grid import DAYS, PERIODS_PER_DAY
+
+VERSION_ID = 1
+SLOT_LABELS = ["9-10", "10-11", "11-12", "12-1", "1-2", "2-3"]
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "TIMETABLE_CACHE_TIMEOUT", 3600))
+
+
+def grid_version() -> Tuple[int, int]:
+    """Current grid version and the time (epoch seconds) of the last timetable change."""
+    row = TimetableVersion.objects.filter(pk=VERSION_ID).values_list("version", "changed_at").first()
+    if row is None:
+        row = TimetableVersion.objects.get_or_create(pk=VERSION_ID)[0]
+        row = (row.version, row.changed_at)
+    version, changed_at = row
+    return version, int(changed_at.timestamp())
+
+
+def timetable_changed() -> None:
+    """
+    Move every cached grid to a new version. The bump is part of the
+    current transaction, so other requests see it exactly when they see
+    the change itself.
+    """
+    def bump() -> int:
+        return TimetableVersion.objects.filter(pk=VERSION_ID).update(
+            version=F("version") + 1, changed_at=timezone.now()
+        )
+
+    # The row is created on first use; if another request just created it, bump that one
+    if not bump() and not TimetableVersion.objects.get_or_create(pk=VERSION_ID, defaults={"version": 1})[1]:
+        bump()
+
+
+@receiver(post_save, sender=TimetableEntry)
+@receiver(post_delete, sender=TimetableEntry)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def _timetable_changed(sender, **kwargs):
+    timetable_changed()
+
+
+def _cell(entry: TimetableEntry) -> dict:
+    return {
+        "subject": entry.subject.name,
+        "is_lab": entry.is_lab,
+        "staff": f"{entry.staff.admin.first_name} {entry.staff.admin.last_name}",
+        "room": entry.room.name,
+        "course": entry.course.name,
+        "section": entry.section.name if entry.section_id else "",
+        "semester": entry.subject.semester.number if entry.subject.semester_id else None,
+        "session": str(entry.session),
+    }
+
+
+def build_grid(entries) -> list:
+    """``[(day, [cell or None] * 6), ...]``; multi-period entries fill every period they span."""
+    grid = {d: [None] * PERIODS_PER_DAY for d in DAYS}
+    for e in entries:
+        if e.day in grid and 1 <= e.period_number <= PERIODS_PER_DAY:
+            end_p = min(e.period_number + max(1, int(e.duration_periods or 1)) - 1, PERIODS_PER_DAY)
+            cell = _cell(e)
+            for p in range(e.period_number, end_p + 1):
+                grid[e.day][p - 1] = cell
+    return [(d, grid[d]) for d in DAYS]
+
+
+def _cached(key: str, queryset) -> dict:
+    version, changed_at = grid_version()
+    full_key = f"timetable:grid:{version}:{key}"
+    data = cache.get(full_key)
+    if data is None:
+        entries = queryset.select_related(
+            "session", "course", "section", "subject__semester", "staff__admin", "room"
+        )
+        rows = build_grid(entries)
+        data = {
+            "rows": rows,
+            "etag": hashlib.md5(json.dumps(rows, sort_keys=True).encode()).hexdigest(),
+            "last_modified": changed_at,
+        }
+        cache.set(full_key, data, _timeout())
+    return data
+
+
+def section_grid(session_id: Optional[int], section_id: Optional[int]) -> dict:
+    """Grid of one section in one session (what its students see)."""
+    return _cached(
+        f"section:{session_id}:{section_id}",
+        TimetableEntry.objects.filter(session_id=session_id, section_id=section_id),
+    )
+
+
+def staff_grid(staff_id: int) -> dict:
+    """Grid of one teacher's classes, across sessions as on the staff timetable page."""
+    return _cached(f"staff:{staff_id}", TimetableEntry.objects.filter(staff_id=staff_id))
+
+
+def grid_response(request, grid: dict, template: str, context: dict):
+    """
+    Render ``template`` for ``grid``, or answer 304 when the browser already
+    has this page. The ETag also covers the user and unread notification
+    count shown in the header and sidebar; pages with pending flash
+    messages are always rendered.
+    """
+    from .notifications import unread_count
+
+    user = request.user
+    etag = quote_etag(hashlib.md5(
+        f"{grid['etag']}:{user.pk}:{user.first_name}:{user.last_name}:{user.profile_pic}:"
+        f"{unread_count(user)}".encode()
+    ).hexdigest())
+    response = None
+    if not len(messages.get_messages(request)):
+        response = get_conditional_response(request, etag=etag, last_modified=grid["last_modified"])
+    if response is None:
+        context = dict(context, day_rows=grid["rows"], days=list(DAYS), slot_labels=SLOT_LABELS)
+        response = render(request, template, context)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(grid["last_modified"])
+    # Let the browser keep the page but check back every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
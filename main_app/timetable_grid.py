@@ -0,0 +1,125 @@
+"""
+In-memory occupancy bitsets for the weekly timetable grid (Mon-Fri, P1..P6).
+
+Every resource (staff, room, section/course group) is tracked as a single int
+where bit ``day_index * PERIODS_PER_DAY + (period - 1)`` is set when the
+resource is busy in that slot. Conflict checks then become bitwise ANDs
+instead of database queries.
+
+This module intentionally has no Django imports so that it can be used from
+worker processes that never set up the ORM.
+"""
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri")
+PERIODS_PER_DAY = 6
+DAY_INDEX = {day: idx for idx, day in enumerate(DAYS)}
+DAY_MASK = (1 << PERIODS_PER_DAY) - 1
+
+
+def span_mask(day: str, period: int, duration: int = 1) -> int:
+    """Bitmask covering ``duration`` periods starting at ``period`` on ``day``."""
+    offset = DAY_INDEX[day] * PERIODS_PER_DAY + (int(period) - 1)
+    return ((1 << int(duration)) - 1) << offset
+
+
+def day_bits(mask: int, day: str) -> int:
+    """Return the 6-bit slice of ``mask`` for ``day`` (bit 0 is P1)."""
+    return (mask >> (DAY_INDEX[day] * PERIODS_PER_DAY)) & DAY_MASK
+
+
+def group_key(course_id: int, section_id: Optional[int]) -> Tuple[str, int]:
+    """Key of the student group an entry belongs to.
+
+    Mirrors ``TimetableEntry.clean``: entries with a section conflict per
+    section, entries without one conflict per course.
+    """
+    if section_id:
+        return ("s", section_id)
+    return ("c", course_id)
+
+
+class Occupancy:
+    """Busy bitsets per staff, room and student group for one session."""
+
+    def __init__(self):
+        self.staff: Dict[int, int] = {}
+        self.room: Dict[int, int] = {}
+        self.group: Dict[Hashable, int] = {}
+        # Slots a teacher marked unavailable (kept apart from booked classes)
+        self.unavailable: Dict[int, int] = {}
+        # Slots already used by a subject within a group, for the
+        # one-per-day and no-adjacent-periods rules
+        self.subject: Dict[Tuple[int, Hashable], int] = {}
+
+    def copy(self) -> "Occupancy":
+        other = Occupancy()
+        other.staff = dict(self.staff)
+        other.room = dict(self.room)
+        other.group = dict(self.group)
+        other.unavailable = dict(self.unavailable)
+        other.subject = dict(self.subject)
+        return other
+
+    # Recording -----------------------------------------------------------
+
+    def block_staff(self, staff_id: int, day: str, period: int, duration: int = 1) -> None:
+        if day not in DAY_INDEX:
+            return
+        # Unavailability may run past P6; clip to the grid
+        duration = max(0, min(int(duration), PERIODS_PER_DAY - int(period) + 1))
+        if duration:
+            self.unavailable[staff_id] = self.unavailable.get(staff_id, 0) | span_mask(day, period, duration)
+
+    def book(self, staff_id, room_id, group, subject_id, day, period, duration=1) -> None:
+        mask = span_mask(day, period, duration)
+        self.staff[staff_id] = self.staff.get(staff_id, 0) | mask
+        self.room[room_id] = self.room.get(room_id, 0) | mask
+        self.group[group] = self.group.get(group, 0) | mask
+        key = (subject_id, group)
+        self.subject[key] = self.subject.get(key, 0) | mask
+
+    def unbook(self, staff_id, room_id, group, subject_id, day, period, duration=1) -> None:
+        """Undo a previous ``book`` of the same slot."""
+        keep = ~span_mask(day, period, duration)
+        self.staff[staff_id] = self.staff.get(staff_id, 0) & keep
+        self.room[room_id] = self.room.get(room_id, 0) & keep
+        self.group[group] = self.group.get(group, 0) & keep
+        key = (subject_id, group)
+        self.subject[key] = self.subject.get(key, 0) & keep
+
+    # Queries -------------------------------------------------------------
+
+    def staff_unavailable(self, staff_id: int, mask: int) -> bool:
+        return bool(self.unavailable.get(staff_id, 0) & mask)
+
+    def staff_busy(self, staff_id: int, mask: int) -> bool:
+        return bool(self.staff.get(staff_id, 0) & mask)
+
+    def room_busy(self, room_id: int, mask: int) -> bool:
+        return bool(self.room.get(room_id, 0) & mask)
+
+    def group_busy(self, group, mask: int) -> bool:
+        return bool(self.group.get(group, 0) & mask)
+
+    def subject_on_day(self, subject_id: int, group, day: str) -> bool:
+        return bool(day_bits(self.subject.get((subject_id, group), 0), day))
+
+    def subject_adjacent(self, subject_id: int, group, day: str, period: int, duration: int = 1) -> bool:
+        used = day_bits(self.subject.get((subject_id, group), 0), day)
+        start = int(period) - 1
+        end = start + int(duration) - 1
+        neighbours = 0
+        if start - 1 >= 0:
+            neighbours |= 1 << (start - 1)
+        if end + 1 < PERIODS_PER_DAY:
+            neighbours |= 1 << (end + 1)
+        return bool(used & neighbours)
+
+    def free_room(self, rooms: Sequence[int], mask: int) -> Optional[int]:
+        """First room id in ``rooms`` that is free for every bit in ``mask``."""
+        for room_id in rooms:
+            if not self.room.get(room_id, 0) & mask:
+                return room_id
+        return None
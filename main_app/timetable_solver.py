@@ -0,0 +1,497 @@
+"""
+Timetable placement engines operating on plain data (no ORM access).
+
+``scheduling.py`` turns the database into a list of :class:`Demand` records
+and an :class:`~main_app.timetable_grid.Occupancy`, calls one of the engines
+below and persists the returned :class:`Placement` list.
+
+- ``place_greedy``: the randomized first-fit heuristic.
+- ``solve_cp``: a depth-first branch-and-bound search with forward checking
+  that maximises the number of scheduled classes within a time budget.
+- ``solve_partitioned``: splits the demands into independent components and
+  runs either engine on each one in a process pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, replace
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+import os
+import random
+import time
+
+from .timetable_grid import (
+    DAY_INDEX,
+    DAY_MASK,
+    DAYS,
+    PERIODS_PER_DAY,
+    Occupancy,
+    span_mask,
+)
+
+
+ENGINE_GREEDY = "greedy"
+ENGINE_CP = "cp"
+
+
+@dataclass
+class Demand:
+    """Classes still to be scheduled for one subject in one section."""
+    subject_id: int
+    course_id: int
+    section_id: Optional[int]
+    staff_id: int
+    group: Hashable
+    units: int
+    duration: int = 1
+    is_lab: bool = False
+    size: int = 0
+    label: str = ""
+
+
+class Placement(NamedTuple):
+    demand: int
+    day: str
+    period: int
+    room_id: int
+
+
+class SolveResult(NamedTuple):
+    placements: List[Placement]
+    optimal: bool
+    nodes: int
+    elapsed: float
+
+
+def fitting_rooms(rooms: Sequence[Tuple[int, int]], size: int) -> List[int]:
+    """
+    Room ids able to seat ``size`` students, smallest first.
+    A capacity of 0 means "not recorded" and is treated as fitting any group.
+    """
+    fits = [(cap, room_id) for room_id, cap in rooms if not cap or cap >= size]
+    fits.sort(key=lambda item: (item[0] or float("inf"), item[1]))
+    return [room_id for _, room_id in fits]
+
+
+def _slot_blocked(occupancy: Occupancy, demand: Demand, day: str, period: int, mask: int) -> bool:
+    return (
+        occupancy.staff_busy(demand.staff_id, mask)
+        or occupancy.group_busy(demand.group, mask)
+        or occupancy.staff_unavailable(demand.staff_id, mask)
+        or occupancy.subject_adjacent(demand.subject_id, demand.group, day, period, demand.duration)
+    )
+
+
+def place_greedy(demands: Sequence[Demand], occupancy: Occupancy, rooms: Sequence[Tuple[int, int]],
+                 rng: random.Random) -> Tuple[List[Placement], int]:
+    """
+    Place demands in the given order, each on randomly ordered days and periods.
+    Mutates ``occupancy``. Returns the placements and the number of rejected slots.
+    """
+    placements: List[Placement] = []
+    skipped = 0
+    for index, demand in enumerate(demands):
+        candidates = fitting_rooms(rooms, demand.size)
+        # Randomize day order so classes distribute across the week non-linearly
+        day_order = list(DAYS)
+        rng.shuffle(day_order)
+        placed = 0
+        for day in day_order:
+            if placed >= demand.units:
+                break
+            # Max one class per subject per day for a section
+            if occupancy.subject_on_day(demand.subject_id, demand.group, day):
+                continue
+            # Randomize period order so we don't always fill mornings first
+            period_order = list(range(1, PERIODS_PER_DAY - demand.duration + 2))
+            rng.shuffle(period_order)
+            for period in period_order:
+                mask = span_mask(day, period, demand.duration)
+                if _slot_blocked(occupancy, demand, day, period, mask):
+                    skipped += 1
+                    continue
+                # Iterate rooms in random order to avoid always picking the first room
+                rng.shuffle(candidates)
+                room_id = occupancy.free_room(candidates, mask)
+                if room_id is None:
+                    skipped += 1
+                    continue
+                occupancy.book(demand.staff_id, room_id, demand.group, demand.subject_id,
+                               day, period, demand.duration)
+                placements.append(Placement(index, day, period, room_id))
+                placed += 1
+                break
+    return placements, skipped
+
+
+def nearest_slots(demand: Demand, occupancy: Occupancy, rooms: Sequence[Tuple[int, int]],
+                  day: str, period: int, room_id: Optional[int] = None,
+                  limit: int = 1) -> List[Tuple[str, int, int]]:
+    """
+    Free (day, period, room_id) starts for one class of ``demand``, closest to
+    ``day``/``period`` first (same day before other days, then nearest period)
+    and keeping ``room_id`` when it is free and big enough.
+    """
+    candidates = fitting_rooms(rooms, demand.size)
+    if room_id in candidates:
+        candidates.remove(room_id)
+        candidates.insert(0, room_id)
+    origin = DAY_INDEX.get(day, 0)
+    starts = sorted(
+        ((d, p) for d in DAYS for p in range(1, PERIODS_PER_DAY - demand.duration + 2)),
+        key=lambda s: (abs(DAY_INDEX[s[0]] - origin), abs(s[1] - int(period)), DAY_INDEX[s[0]], s[1]),
+    )
+    found: List[Tuple[str, int, int]] = []
+    for d, p in starts:
+        if occupancy.subject_on_day(demand.subject_id, demand.group, d):
+            continue
+        mask = span_mask(d, p, demand.duration)
+        if _slot_blocked(occupancy, demand, d, p, mask):
+            continue
+        free = occupancy.free_room(candidates, mask)
+        if free is not None:
+            found.append((d, p, free))
+            if len(found) >= limit:
+                break
+    return found
+
+
+_SKIP = None
+
+
+def solve_cp(demands: Sequence[Demand], occupancy: Occupancy, rooms: Sequence[Tuple[int, int]],
+             time_budget: float = 10.0, seed: int = 0) -> SolveResult:
+    """
+    Maximise the number of scheduled classes with branch-and-bound search.
+
+    Model: each demand is a sequence of class units; a unit takes a start
+    (day, period) plus a room. Constraints are the same as the greedy engine
+    (staff/section/room clashes, unavailability, one class per subject per
+    day, no adjacent periods, lab double periods) plus room capacity.
+
+    Search: the next unit is taken from the open demand with the fewest
+    feasible days left (MRV). Its values are every free start in the smallest
+    fitting room, then the same starts in each larger free room. After each
+    assignment, the feasible-day counts of every demand sharing the teacher or
+    section are recomputed (forward checking); a demand with no feasible day
+    is closed immediately. Units of one demand are placed on strictly
+    increasing days to break symmetry. The bound
+    ``placed + sum(min(units_left, feasible_days))`` prunes branches that
+    cannot beat the incumbent.
+
+    The search starts from a greedy solution as incumbent, so it never does
+    worse than ``place_greedy``. If the search space is exhausted inside
+    ``time_budget`` seconds the returned solution is optimal; otherwise it is
+    the best one found. Value ordering is shuffled with ``seed`` so results
+    are reproducible.
+    ``occupancy`` is left unchanged.
+    """
+    started = time.monotonic()
+    deadline = started + max(0.0, float(time_budget))
+    rng = random.Random(seed)
+    n = len(demands)
+    occupancy = occupancy.copy()
+
+    rooms_for = [fitting_rooms(rooms, d.size) for d in demands]
+    starts = []
+    for d in demands:
+        options = [(day, p) for day in DAYS for p in range(1, PERIODS_PER_DAY - d.duration + 2)]
+        rng.shuffle(options)
+        starts.append(options)
+
+    by_staff: dict = {}
+    by_group: dict = {}
+    for i, d in enumerate(demands):
+        by_staff.setdefault(d.staff_id, []).append(i)
+        by_group.setdefault(d.group, []).append(i)
+    neighbours = [sorted(set(by_staff[d.staff_id]) | set(by_group[d.group])) for d in demands]
+
+    units_left = [max(0, d.units) for d in demands]
+    last_day = [-1] * n
+    closed = [units_left[i] == 0 or not rooms_for[i] for i in range(n)]
+
+    def feasible_days(i: int) -> int:
+        d = demands[i]
+        busy = (
+            occupancy.staff.get(d.staff_id, 0)
+            | occupancy.unavailable.get(d.staff_id, 0)
+            | occupancy.group.get(d.group, 0)
+        )
+        used = occupancy.subject.get((d.subject_id, d.group), 0)
+        count = 0
+        for day_idx in range(last_day[i] + 1, len(DAYS)):
+            shift = day_idx * PERIODS_PER_DAY
+            if (used >> shift) & DAY_MASK:
+                continue
+            free = ~(busy >> shift) & DAY_MASK
+            for _ in range(d.duration - 1):
+                free &= free >> 1
+            if free:
+                count += 1
+        return count
+
+    feasible = [0 if closed[i] else feasible_days(i) for i in range(n)]
+    contrib = [0 if closed[i] else min(units_left[i], feasible[i]) for i in range(n)]
+    state = {"placed": 0, "rest": sum(contrib), "nodes": 0}
+    current: List[Placement] = []
+    best, _ = place_greedy(demands, occupancy.copy(), rooms, random.Random(seed))
+    target = sum(units_left[i] for i in range(n) if not closed[i])
+
+    def refresh(indices) -> list:
+        changed = []
+        for j in indices:
+            if closed[j]:
+                continue
+            old_f, old_c = feasible[j], contrib[j]
+            feasible[j] = feasible_days(j)
+            contrib[j] = min(units_left[j], feasible[j])
+            state["rest"] += contrib[j] - old_c
+            changed.append((j, old_f, old_c))
+        return changed
+
+    def restore(changed) -> None:
+        for j, old_f, old_c in reversed(changed):
+            state["rest"] += old_c - contrib[j]
+            feasible[j], contrib[j] = old_f, old_c
+
+    def select() -> Optional[int]:
+        choice, key = None, None
+        for i in range(n):
+            if closed[i]:
+                continue
+            k = (feasible[i], -units_left[i], i)
+            if key is None or k < key:
+                choice, key = i, k
+        return choice
+
+    def values_for(i: int) -> list:
+        d = demands[i]
+        values, other_rooms = [], []
+        if feasible[i]:
+            for day, period in starts[i]:
+                if DAY_INDEX[day] <= last_day[i] or occupancy.subject_on_day(d.subject_id, d.group, day):
+                    continue
+                mask = span_mask(day, period, d.duration)
+                if _slot_blocked(occupancy, d, day, period, mask):
+                    continue
+                free = [room_id for room_id in rooms_for[i] if not occupancy.room_busy(room_id, mask)]
+                if free:
+                    values.append((day, period, free[0]))
+                    other_rooms.extend((day, period, room_id) for room_id in free[1:])
+        # Every start in its smallest free room first; larger rooms are
+        # only tried once those are exhausted
+        values.extend(other_rooms)
+        values.append(_SKIP)
+        return values
+
+    def apply(i: int, value):
+        if value is _SKIP:
+            closed[i] = True
+            old_c = contrib[i]
+            contrib[i] = 0
+            state["rest"] -= old_c
+            return ("skip", i, old_c)
+        d = demands[i]
+        day, period, room_id = value
+        occupancy.book(d.staff_id, room_id, d.group, d.subject_id, day, period, d.duration)
+        current.append(Placement(i, day, period, room_id))
+        state["placed"] += 1
+        prev_last = last_day[i]
+        last_day[i] = DAY_INDEX[day]
+        units_left[i] -= 1
+        finished = units_left[i] == 0
+        if finished:
+            closed[i] = True
+            state["rest"] -= contrib[i]
+            old_c, contrib[i] = contrib[i], 0
+        changed = refresh(neighbours[i])
+        return ("place", i, value, prev_last, finished, old_c if finished else None, changed)
+
+    def undo(record) -> None:
+        if record[0] == "skip":
+            _, i, old_c = record
+            closed[i] = False
+            contrib[i] = old_c
+            state["rest"] += old_c
+            return
+        _, i, (day, period, room_id), prev_last, finished, old_c, changed = record
+        d = demands[i]
+        restore(changed)
+        if finished:
+            closed[i] = False
+            contrib[i] = old_c
+            state["rest"] += old_c
+        units_left[i] += 1
+        last_day[i] = prev_last
+        state["placed"] -= 1
+        current.pop()
+        occupancy.unbook(d.staff_id, room_id, d.group, d.subject_id, day, period, d.duration)
+
+    optimal = False
+    root = select()
+    if root is None or len(best) >= target:
+        optimal = True
+    else:
+        # Each frame: [demand index, candidate values, next value index, applied record]
+        stack = [[root, values_for(root), 0, None]]
+        timed_out = False
+        while stack:
+            frame = stack[-1]
+            if frame[3] is not None:
+                undo(frame[3])
+                frame[3] = None
+            if frame[2] >= len(frame[1]):
+                stack.pop()
+                if stack:
+                    continue
+                break
+            value = frame[1][frame[2]]
+            frame[2] += 1
+            state["nodes"] += 1
+            if not state["nodes"] & 0xFF and time.monotonic() > deadline:
+                timed_out = True
+                break
+            frame[3] = apply(frame[0], value)
+            if state["placed"] + state["rest"] <= len(best):
+                continue
+            nxt = select()
+            if nxt is None:
+                if state["placed"] > len(best):
+                    best = list(current)
+                if len(best) >= target:
+                    break
+                continue
+            stack.append([nxt, values_for(nxt), 0, None])
+        optimal = not timed_out
+
+    return SolveResult(best, optimal, state["nodes"], time.monotonic() - started)
+
+
+def split_components(demands: Sequence[Demand]) -> List[List[int]]:
+    """
+    Group demand indices into independent components.
+
+    Two demands are connected when they share a teacher or a student group;
+    rooms are assigned by the engines rather than fixed per demand, so they
+    are reconciled when the component results are merged. Components are
+    returned in order of their first demand for reproducible output.
+    """
+    parent = list(range(len(demands)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner: Dict[Hashable, int] = {}
+    for i, d in enumerate(demands):
+        for key in (("staff", d.staff_id), ("group", d.group)):
+            if key in owner:
+                a, b = find(owner[key]), find(i)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            else:
+                owner[key] = i
+
+    components: Dict[int, List[int]] = {}
+    for i in range(len(demands)):
+        components.setdefault(find(i), []).append(i)
+    return [components[root] for root in sorted(components)]
+
+
+def _solve_component(engine: str, demands: List[Demand], occupancy: Occupancy,
+                     rooms: Sequence[Tuple[int, int]], time_budget: float,
+                     seed: int) -> Tuple[List[Placement], int, Optional[bool]]:
+    # Module-level so it can be pickled for ProcessPoolExecutor workers
+    if engine == ENGINE_CP:
+        result = solve_cp(demands, occupancy, rooms, time_budget=time_budget, seed=seed)
+        return result.placements, 0, result.optimal
+    placements, skipped = place_greedy(demands, occupancy.copy(), rooms, random.Random(seed))
+    return placements, skipped, None
+
+
+def _merge(demands: Sequence[Demand], occupancy: Occupancy, rooms: Sequence[Tuple[int, int]],
+           placements: Sequence[Placement], seed: int) -> Tuple[List[Placement], bool]:
+    """
+    Book component placements into ``occupancy`` one by one.
+    A placement whose room was taken by another component moves to another
+    fitting room in the same slot; if none is free the class is re-placed
+    greedily at the end. Returns the accepted placements and whether every
+    placement was kept unchanged.
+    """
+    merged: List[Placement] = []
+    deferred: Dict[int, int] = {}
+    for placement in placements:
+        d = demands[placement.demand]
+        mask = span_mask(placement.day, placement.period, d.duration)
+        if (_slot_blocked(occupancy, d, placement.day, placement.period, mask)
+                or occupancy.subject_on_day(d.subject_id, d.group, placement.day)):
+            deferred[placement.demand] = deferred.get(placement.demand, 0) + 1
+            continue
+        room_id = placement.room_id
+        if occupancy.room_busy(room_id, mask):
+            room_id = occupancy.free_room(fitting_rooms(rooms, d.size), mask)
+            if room_id is None:
+                deferred[placement.demand] = deferred.get(placement.demand, 0) + 1
+                continue
+        occupancy.book(d.staff_id, room_id, d.group, d.subject_id, placement.day, placement.period, d.duration)
+        merged.append(placement._replace(room_id=room_id))
+
+    if deferred:
+        order = sorted(deferred)
+        retry = [replace(demands[i], units=deferred[i]) for i in order]
+        extra, _ = place_greedy(retry, occupancy, rooms, random.Random(seed))
+        merged.extend(p._replace(demand=order[p.demand]) for p in extra)
+    return merged, not deferred
+
+
+def solve_partitioned(demands: Sequence[Demand], occupancy: Occupancy, rooms: Sequence[Tuple[int, int]],
+                      engine: str = ENGINE_GREEDY, time_budget: float = 10.0, seed: int = 0,
+                      workers: Optional[int] = None) -> Tuple[List[Placement], int, Optional[bool]]:
+    """
+    Solve each independent component of ``demands`` separately, in parallel
+    when ``workers`` > 1, then merge the partial timetables into
+    ``occupancy`` and resolve room clashes between components.
+    Returns (placements, skipped, optimal); ``optimal`` is None for greedy.
+    """
+    deadline = time.monotonic() + max(0.0, float(time_budget))
+    components = [c for c in split_components(demands) if any(demands[i].units for i in c)]
+    workers = max(1, workers if workers is not None else (os.cpu_count() or 1))
+    # With more components than workers, share the time budget between rounds
+    rounds = -(-len(components) // workers) if components else 1
+    budget = time_budget / rounds
+    tasks = [
+        (engine, [demands[i] for i in component], occupancy, rooms, budget, seed + n)
+        for n, component in enumerate(components)
+    ]
+
+    results = None
+    if workers > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                results = list(pool.map(_solve_component, *zip(*tasks)))
+        except (OSError, BrokenProcessPool):
+            # Process pools are unavailable in some sandboxes; fall back to inline
+            results = None
+    if results is None:
+        # One after another: each component gets its share of the time that
+        # is actually left, so the total stays within time_budget
+        results = []
+        for done, (task_engine, task_demands, task_occupancy, task_rooms, _, task_seed) in enumerate(tasks):
+            remaining = max(0.0, deadline - time.monotonic()) / (len(tasks) - done)
+            results.append(_solve_component(task_engine, task_demands, task_occupancy, task_rooms, remaining,
+                                            task_seed))
+
+    placements: List[Placement] = []
+    skipped = 0
+    optimal: Optional[bool] = True if engine == ENGINE_CP else None
+    for component, (partial, component_skipped, component_optimal) in zip(components, results):
+        placements.extend(p._replace(demand=component[p.demand]) for p in partial)
+        skipped += component_skipped
+        if optimal is not None:
+            optimal = optimal and bool(component_optimal)
+
+    merged, clean = _merge(demands, occupancy, rooms, placements, seed)
+    if optimal is not None:
+        optimal = optimal and clean
+    return merged, skipped, optimal
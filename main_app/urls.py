@@ -23,6 +23,7 @@ urlpatterns = [
     path("", views.login_page, name='login_page'),
     path("get_attendance", views.get_attendance, name='get_attendance'),
     path("firebase-messaging-sw.js", views.showFirebaseJS, name='showFirebaseJS'),
+    path("jobs/<int:job_id>/status/", views.job_status, name="job_status"),
     path("doLogin/", views.doLogin, name='user_login'),
     path("logout_user/", views.logout_user, name='user_logout'),
     path("admin/home/", hod_views.admin_home, name='admin_home'),
@@ -53,6 +54,7 @@ urlpatterns = [
     path("staff/view/leave/", hod_views.view_staff_leave, name="view_staff_leave",),
     path("attendance/view/", hod_views.admin_view_attendance,
          name="admin_view_attendance",),
+    path("results/sheet/", hod_views.admin_grade_sheet, name="admin_grade_sheet"),
     path("attendance/fetch/", hod_views.get_admin_attendance,
          name='get_admin_attendance'),
     path("admin/timetable/manage/", hod_views.manage_timetable,
@@ -65,6 +67,7 @@ urlpatterns = [
     path("admin/unavailability/", hod_views.view_staff_unavailability, name='view_staff_unavailability'),
     path("admin/reset/maintenance/", hod_views.admin_reset_maintenance, name='admin_reset_maintenance'),
     path("admin/proctors/manage/", hod_views.manage_proctors, name='manage_proctors'),
+    path("admin/metrics/requests/", hod_views.request_metrics, name='request_metrics'),
     path("student/add/", hod_views.add_student, name='add_student'),
     path("subject/add/", hod_views.add_subject, name='add_subject'),
     path("staff/manage/", hod_views.manage_staff, name='manage_staff'),
@@ -105,6 +108,7 @@ urlpatterns = [
     path("staff/tests/", staff_views.staff_manage_tests, name="staff_manage_tests"),
     path("staff/tests/<int:test_id>/toggle/", staff_views.staff_toggle_test_active, name="staff_toggle_test_active"),
     path("staff/tests/<int:test_id>/questions/", staff_views.staff_add_question, name="staff_add_question"),
+    path("staff/tests/<int:test_id>/analysis/", staff_views.staff_test_analysis, name="staff_test_analysis"),
     path("staff/attendance/take/", staff_views.staff_take_attendance,
          name='staff_take_attendance'),
     path("staff/get_sections/", staff_views.get_sections, name='get_sections'),
@@ -121,16 +125,19 @@ urlpatterns = [
          name='get_student_attendance'),
     path("staff/attendance/save/",
          staff_views.save_attendance, name='save_attendance'),
-    path("staff/attendance/update/",
+    path("staff/attendance/update/save/",
          staff_views.update_attendance, name='update_attendance'),
     path("staff/fcmtoken/", staff_views.staff_fcmtoken, name='staff_fcmtoken'),
     path("staff/view/notification/", staff_views.staff_view_notification,
          name="staff_view_notification"),
+    path("staff/notifications/read/", staff_views.staff_mark_notifications_read,
+         name="staff_mark_notifications_read"),
     path("staff/result/add/", staff_views.staff_add_result, name='staff_add_result'),
     path("staff/result/edit/", EditResultView.as_view(),
          name='edit_student_result'),
     path('staff/result/fetch/', staff_views.fetch_student_result,
          name='fetch_student_result'),
+    path("staff/result/sheet/", staff_views.staff_grade_sheet, name='staff_grade_sheet'),
     path("staff/timetable/", staff_views.staff_timetable, name='staff_timetable'),
     path("staff/proctor/dashboard/", staff_views.proctor_dashboard, name='proctor_dashboard'),
     path("staff/fees/review/<int:fee_id>/", staff_views.staff_review_fee, name='staff_review_fee'),
@@ -167,6 +174,8 @@ urlpatterns = [
 
     path("student/view/notification/", student_views.student_view_notification,
          name="student_view_notification"),
+    path("student/notifications/read/", student_views.student_mark_notifications_read,
+         name="student_mark_notifications_read"),
     path('student/view/result/', student_views.student_view_result,
          name='student_view_result'),
     path("student/timetable/", student_views.student_timetable, name='student_timetable'),
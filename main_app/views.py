@@ -105,3 +105,14 @@ messaging.setBackgroundMessageHandler(function (payload) {
     """
     return HttpResponse(data, content_type='application/javascript')
 
+
+
+def job_status(request, job_id):
+    """Progress of a background job, for the job's creator or an admin."""
+    from .jobs import job_status as describe
+    from .models import Job
+
+    job = get_object_or_404(Job, id=job_id)
+    if request.user.user_type != '1' and job.created_by_id != request.user.id:
+        return JsonResponse({"error": "Not found"}, status=404)
+    return JsonResponse(describe(job))
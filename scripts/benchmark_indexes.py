@@ -0,0 +1,239 @@
+"""
+Compare query plans and timings of the hot queries with and without the
+composite indexes added in migration 0017.
+
+Runs against a throwaway test database (never the configured one), fills it
+with a synthetic dataset, then for each query prints EXPLAIN output and the
+median time, first with the indexes dropped and then with them restored.
+Statistics are refreshed with ``ANALYZE`` after each change, since without
+them SQLite's planner ignores some of the new indexes; each query also
+reports which of its table's indexes the final plan actually uses.
+
+    python scripts/benchmark_indexes.py                      # 5k students, 1M reports
+    python scripts/benchmark_indexes.py --students 500 --reports 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import django
+
+# Ensure project root is on PYTHONPATH when running from scripts/
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'college_management_system.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from main_app.models import (
+    Attendance,
+    AttendanceReport,
+    Course,
+    CustomUser,
+    MCQTest,
+    NotificationStaff,
+    NotificationStudent,
+    Room,
+    Section,
+    Session,
+    Staff,
+    StaffUnavailability,
+    Student,
+    Subject,
+    TimetableEntry,
+)
+
+INDEXED_MODELS = [
+    AttendanceReport, Attendance, NotificationStudent, NotificationStaff,
+    StaffUnavailability, TimetableEntry, MCQTest,
+]
+BATCH = 5000
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri")
+
+
+def _users(prefix, count, user_type):
+    CustomUser.objects.bulk_create(
+        [
+            CustomUser(email=f"{prefix}{i}@bench.local", user_type=user_type, gender="M",
+                       address="-", profile_pic="blank.jpg", password="!")
+            for i in range(count)
+        ],
+        batch_size=BATCH,
+    )
+    return list(CustomUser.objects.filter(email__startswith=prefix).values_list("id", flat=True))
+
+
+def build_dataset(students, reports, seed):
+    rng = random.Random(seed)
+    session = Session.objects.create(start_year=date(2024, 1, 1), end_year=date(2025, 1, 1))
+    course = Course.objects.create(name="Bench")
+    sections = [Section.objects.create(course=course, name=f"S{i}") for i in range(max(1, students // 60))]
+
+    Staff.objects.bulk_create([Staff(admin_id=i, course=course) for i in _users("staff", max(100, len(sections)), 2)])
+    staff_ids = list(Staff.objects.values_list("id", flat=True))
+    Student.objects.bulk_create(
+        [Student(admin_id=i, course=course, session=session, section=rng.choice(sections))
+         for i in _users("student", students, 3)],
+        batch_size=BATCH,
+    )
+    student_ids = list(Student.objects.values_list("id", flat=True))
+
+    Subject.objects.bulk_create([Subject(name=f"Subject {i}", staff_id=staff_ids[i % len(staff_ids)], credits=3)
+                                 for i in range(200)])
+    subject_ids = list(Subject.objects.values_list("id", flat=True))
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(365)]
+    Attendance.objects.bulk_create(
+        [Attendance(session=session, subject_id=s, date=d) for s in subject_ids for d in days[::3]],
+        batch_size=BATCH,
+    )
+    attendance_ids = list(Attendance.objects.values_list("id", flat=True))
+
+    written = 0
+    while written < reports:
+        chunk = min(BATCH, reports - written)
+        AttendanceReport.objects.bulk_create([
+            AttendanceReport(student_id=rng.choice(student_ids), attendance_id=rng.choice(attendance_ids),
+                             status=rng.random() < 0.8)
+            for _ in range(chunk)
+        ])
+        written += chunk
+
+    NotificationStudent.objects.bulk_create(
+        [NotificationStudent(student_id=rng.choice(student_ids), message="n") for _ in range(students * 10)],
+        batch_size=BATCH,
+    )
+    NotificationStaff.objects.bulk_create(
+        [NotificationStaff(staff_id=rng.choice(staff_ids), message="n") for _ in range(5000)],
+        batch_size=BATCH,
+    )
+    StaffUnavailability.objects.bulk_create(
+        [StaffUnavailability(staff_id=rng.choice(staff_ids), session=session, day=rng.choice(DAYS),
+                             period_number=rng.randint(1, 6)) for _ in range(5000)],
+        batch_size=BATCH,
+    )
+    Room.objects.bulk_create([Room(name=f"R{i}", capacity=60) for i in range(len(sections))])
+    room_ids = list(Room.objects.values_list("id", flat=True))
+    # Section i always uses teacher i and room i, so no slot clashes
+    entries = [
+        TimetableEntry(session=session, course=course, section=section,
+                       subject_id=subject_ids[(i + period) % len(subject_ids)],
+                       staff_id=staff_ids[i], room_id=room_ids[i], day=day, period_number=period)
+        for i, section in enumerate(sections)
+        for day in DAYS
+        for period in range(1, 7)
+    ]
+    TimetableEntry.objects.bulk_create(entries, batch_size=BATCH)
+    now = timezone.now()
+    MCQTest.objects.bulk_create(
+        [MCQTest(title=f"T{i}", subject_id=rng.choice(subject_ids), staff_id=rng.choice(staff_ids),
+                 is_active=rng.random() < 0.2, scheduled_at=now - timedelta(days=rng.randint(-30, 300)))
+         for i in range(20000)],
+        batch_size=BATCH,
+    )
+    return session, student_ids, staff_ids, subject_ids, sections
+
+
+def hot_queries(session, student_ids, staff_ids, subject_ids, sections):
+    student, staff, subject, section = student_ids[0], staff_ids[0], subject_ids[0], sections[0]
+    today = timezone.now()
+    return {
+        "AttendanceReport(student, status)":
+            AttendanceReport.objects.filter(student_id=student, status=True),
+        "Attendance(subject, date)":
+            Attendance.objects.filter(subject_id=subject, date=date(2024, 3, 1)),
+        "NotificationStudent(student, created_at)":
+            NotificationStudent.objects.filter(student_id=student).order_by("-created_at")[:10],
+        "NotificationStaff(staff, created_at)":
+            NotificationStaff.objects.filter(staff_id=staff, created_at__gte=today - timedelta(days=7)),
+        "StaffUnavailability(staff, session, day)":
+            StaffUnavailability.objects.filter(staff_id=staff, session=session, day="Mon"),
+        "TimetableEntry(session, subject, section)":
+            TimetableEntry.objects.filter(session=session, subject_id=subject, section=section),
+        "MCQTest(is_active, scheduled_at)":
+            MCQTest.objects.filter(is_active=True, scheduled_at__lte=today),
+    }
+
+
+def measure(queries, repeat):
+    results = {}
+    for name, qs in queries.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(qs._chain())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (qs.explain(), statistics.median(timings))
+    return results
+
+
+def set_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    analyze()
+
+
+def analyze():
+    """Refresh the planner statistics for the benchmarked tables."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "mysql":
+            for model in INDEXED_MODELS:
+                cursor.execute(f"ANALYZE TABLE {connection.ops.quote_name(model._meta.db_table)}")
+        else:
+            cursor.execute("ANALYZE")
+
+
+def indexes_used(model, plan):
+    return [index.name for index in model._meta.indexes if index.name in plan]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--reports", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        started = time.perf_counter()
+        data = build_dataset(args.students, args.reports, args.seed)
+        print(f"Dataset: {args.students} students, {args.reports} attendance reports "
+              f"built in {time.perf_counter() - started:.1f}s")
+        queries = hot_queries(*data)
+
+        set_indexes(False)
+        before = measure(queries, args.repeat)
+        set_indexes(True)
+        after = measure(queries, args.repeat)
+
+        for name in queries:
+            (plan_before, ms_before), (plan_after, ms_after) = before[name], after[name]
+            print(f"\n== {name}")
+            print(f"   without index: {ms_before:8.2f} ms   | {plan_before.replace(chr(10), ' / ')}")
+            print(f"   with index:    {ms_after:8.2f} ms   | {plan_after.replace(chr(10), ' / ')}")
+            used = indexes_used(queries[name].model, plan_after)
+            print(f"   index used:    {', '.join(used) if used else 'none, the planner chose another plan'}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()